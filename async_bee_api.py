@@ -0,0 +1,309 @@
+# async_bee_api.py
+
+import os
+import json
+import time
+import asyncio
+import mimetypes
+import aiohttp
+from config import (
+    BEE_API_URL,
+    BEE_DEFAULT_TIMEOUT,
+    BEE_TIMEOUTS,
+    BEE_TRANSACTION_TIMEOUT,
+    ASYNC_BEE_CONNECTION_LIMIT,
+    TAG_POLL_INTERVAL,
+    WAIT_FOR_BATCH_TIMEOUT,
+    WAIT_FOR_BATCH_RETRY,
+    STAMP_POLL_MIN_INTERVAL,
+    STAMP_POLL_BACKOFF,
+)
+from bee_api import tag_percent
+from metrics import body_size, get_metrics
+from upload import UploadError, next_feed_index, record_feed_index
+
+
+def _client_timeout(timeout):
+    """aiohttp timeout for a config timeout: seconds, or (connect, read) seconds."""
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return aiohttp.ClientTimeout(total=None, sock_connect=connect, sock_read=read)
+    return aiohttp.ClientTimeout(total=timeout)
+
+
+class AsyncBeeClient:
+    """
+    asyncio-native Bee API client.
+
+    One instance shares a single aiohttp connection pool, so one event loop can drive
+    hundreds of uploads and stamp waits without a thread per operation:
+
+        async with AsyncBeeClient() as bee:
+            if await bee.wait_for_stamp_usable(batch_id):
+                results = await bee.upload_files(paths, batch_id, encrypt=False)
+    """
+
+    def __init__(self, base_url=BEE_API_URL, limit=ASYNC_BEE_CONNECTION_LIMIT, timeouts=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeouts = dict(BEE_TIMEOUTS, **(timeouts or {}))
+        self.limit = limit
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def timeout_for(self, path):
+        endpoint = path.lstrip("/").split("?", 1)[0].split("/", 1)[0]
+        return _client_timeout(self.timeouts.get(endpoint, BEE_DEFAULT_TIMEOUT))
+
+    async def request(self, method, path, **kwargs):
+        """
+        Sends a request and reads the whole response.
+
+        Returns:
+            tuple: (status code, parsed JSON body or None, raw text body)
+        """
+        kwargs.setdefault("timeout", self.timeout_for(path))
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        sent = body_size(kwargs.get("data"))
+        start = time.monotonic()
+        try:
+            async with self.session.request(method, url, **kwargs) as response:
+                body = await response.read()
+                encoding = response.get_encoding() if body else None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            get_metrics().observe_request(method, path, type(e).__name__, time.monotonic() - start, sent)
+            raise
+        get_metrics().observe_request(method, path, response.status, time.monotonic() - start, sent, len(body))
+        text = body.decode(encoding, errors="replace") if body else ""
+        try:
+            data = json.loads(text) if text else None
+        except ValueError:
+            data = None
+        return response.status, data, text
+
+    # --- Node status ---
+
+    async def is_connected_to_bee(self):
+        try:
+            status, _, _ = await self.request("GET", "/health")
+            return status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
+
+    async def get_wallet_balance(self):
+        try:
+            status, data, _ = await self.request("GET", "/wallet")
+            if status == 200 and data:
+                return int(data.get("bzzBalance", 0)) / 10**16
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        return 0
+
+    async def get_price_per_block(self):
+        try:
+            status, data, _ = await self.request("GET", "/chainstate")
+            if status == 200 and data:
+                return int(data.get("currentPrice", 0))
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        return 0
+
+    # --- Stamps ---
+
+    async def get_existing_stamps(self):
+        try:
+            status, data, _ = await self.request("GET", "/stamps")
+            if status == 200 and data:
+                return data.get("stamps", [])
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        return []
+
+    async def get_stamp(self, batch_id):
+        status, data, _ = await self.request("GET", f"/stamps/{batch_id}")
+        return data if status == 200 else None
+
+    async def dilute_batch(self, batch_id, new_depth, wait=True):
+        """Requests a dilution and, unless wait=False, waits for the new depth to show."""
+        batch_id = batch_id.replace(" ", "")
+        status, data, text = await self.request("PATCH", f"/stamps/dilute/{batch_id}/{new_depth}",
+                                                timeout=_client_timeout(BEE_TRANSACTION_TIMEOUT))
+        print(f"🛠️ Dilution response: {status} - {text}")
+        if status != 202:
+            return False
+        if not wait:
+            return True
+        batch_id = (data or {}).get("batchID", batch_id).replace(" ", "")
+        return await self.wait_for_depth(batch_id, new_depth)
+
+    async def topup_batch(self, batch_id, amount):
+        status, _, text = await self.request("PATCH", f"/stamps/topup/{batch_id}/{int(amount)}",
+                                           timeout=_client_timeout(BEE_TRANSACTION_TIMEOUT))
+        print(f"🛠️ TTL Top-Up response: {status} - {text}")
+        return status in (200, 202)
+
+    async def _wait_for_stamp(self, batch_id, condition, timeout, retry):
+        """
+        Polls the batch until `condition` holds, on the same schedule as stamp_watcher:
+        fast at first, backing off to `retry` seconds.
+
+        Returns:
+            tuple: (matching stamp record or None, exception type name if polling failed, else None)
+        """
+        start_time = time.monotonic()
+        interval = min(STAMP_POLL_MIN_INTERVAL, retry)
+        with get_metrics().waiting("stamp") as outcome:
+            while time.monotonic() - start_time < timeout:
+                try:
+                    stamp = await self.get_stamp(batch_id)
+                    if stamp is not None and condition(stamp):
+                        return stamp, None
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    outcome["error"] = type(e).__name__
+                    print(f"❌ {outcome['error']} while checking batch {batch_id}: {e}")
+                    return None, outcome["error"]
+                await asyncio.sleep(interval)
+                interval = min(interval * STAMP_POLL_BACKOFF, retry)
+            outcome["ok"] = False
+        return None, None
+
+    async def wait_for_stamp_usable(self, batch_id, timeout=WAIT_FOR_BATCH_TIMEOUT, retry=WAIT_FOR_BATCH_RETRY):
+        stamp, error = await self._wait_for_stamp(batch_id, lambda s: s.get("usable", False), timeout, retry)
+        if stamp is None:
+            if error is None:
+                print(f"❌ Timeout: Batch {batch_id} did not become usable within expected time.")
+            return False
+        return True
+
+    async def wait_for_depth(self, batch_id, depth, timeout=WAIT_FOR_BATCH_TIMEOUT, retry=WAIT_FOR_BATCH_RETRY):
+        stamp, error = await self._wait_for_stamp(batch_id, lambda s: int(s.get("depth", 0)) >= depth, timeout, retry)
+        if stamp is None:
+            if error is None:
+                print(f"⚠️ Dilution of {batch_id} did not reach depth {depth} after timeout.")
+            return False
+        return True
+
+    # --- Tags ---
+
+    async def create_tag(self):
+        try:
+            status, data, _ = await self.request("POST", "/tags")
+            if status == 201 and data:
+                return data.get("uid")
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        return None
+
+    async def get_tag(self, tag_uid):
+        status, data, _ = await self.request("GET", f"/tags/{tag_uid}")
+        return data if status == 200 else None
+
+    async def get_tag_progress(self, tag_uid):
+        try:
+            tag = await self.get_tag(tag_uid)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+        return tag_percent(tag) if tag else None
+
+    async def wait_for_tag(self, tag_uid, interval=TAG_POLL_INTERVAL, timeout=WAIT_FOR_BATCH_TIMEOUT):
+        """Waits until the tag reports 100% progress. Returns False on timeout."""
+        start_time = time.monotonic()
+        with get_metrics().waiting("tag") as outcome:
+            while time.monotonic() - start_time < timeout:
+                percent = await self.get_tag_progress(tag_uid)
+                if percent is not None and percent >= 100:
+                    return True
+                await asyncio.sleep(interval)
+            outcome["ok"] = False
+        return False
+
+    # --- Uploads ---
+
+    async def upload_file(self, file_path, batch_id, encrypt, topic_name=None):
+        """
+        Async counterpart of upload.send_file.
+
+        Returns:
+            dict: {"reference", "tag", "bytes", "feed_index"} for the uploaded file.
+        Raises:
+            UploadError: If the tag cannot be created or the upload is rejected.
+        """
+        feed_index = None
+        if topic_name:
+            # Local store and /feeds lookups are blocking, so they run in the default executor
+            loop = asyncio.get_running_loop()
+            feed_index = await loop.run_in_executor(None, next_feed_index, batch_id, topic_name)
+
+        tag_uid = await self.create_tag()
+        if not tag_uid:
+            raise UploadError("Failed to create a tag.")
+
+        content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+        headers = {
+            "Swarm-Postage-Batch-Id": batch_id,
+            "Swarm-Tag": str(tag_uid),
+            "Content-Type": content_type,
+            "Swarm-Encrypt": "true" if encrypt else "false"
+        }
+        if topic_name:
+            headers["Swarm-Feed-Name"] = topic_name
+            headers["Swarm-Feed-Type"] = "sequence"
+            headers["Swarm-Feed-Index"] = str(feed_index)
+
+        # aiohttp reads file objects in the default executor, so the loop is never blocked on disk
+        with open(file_path, "rb") as f:
+            status, data, text = await self.request(
+                "POST", f"/bzz?tag={tag_uid}", headers=headers, data=f
+            )
+
+        if status != 201:
+            raise UploadError(f"Upload failed: {status} {text}", status_code=status)
+        swarm_hash = (data or {}).get("reference")
+        if not swarm_hash:
+            raise UploadError("Upload finished but no swarm hash found!", status_code=status)
+
+        if topic_name:
+            await asyncio.get_running_loop().run_in_executor(
+                None, record_feed_index, batch_id, topic_name, feed_index, swarm_hash)
+        return {"reference": swarm_hash, "tag": tag_uid, "bytes": os.path.getsize(file_path), "feed_index": feed_index}
+
+    async def upload_files(self, file_paths, batch_id, encrypt=False, topic_names=None, concurrency=None):
+        """
+        Uploads many files on this event loop, at most `concurrency` at a time.
+
+        Returns:
+            list: Result dicts in the same shape as upload_engine.upload_many.
+        """
+        topic_names = topic_names or {}
+        semaphore = asyncio.Semaphore(concurrency or self.limit)
+
+        async def upload_one(path):
+            result = {"file": path, "reference": None, "bytes": 0, "feed_index": None, "duration": 0.0, "error": None}
+            start = time.perf_counter()
+            async with semaphore:
+                try:
+                    sent = await self.upload_file(path, batch_id, encrypt, topic_names.get(path))
+                    result["reference"] = sent["reference"]
+                    result["bytes"] = sent["bytes"]
+                    result["feed_index"] = sent["feed_index"]
+                except Exception as e:
+                    result["error"] = str(e)
+            result["duration"] = time.perf_counter() - start
+            return result
+
+        return await asyncio.gather(*(upload_one(path) for path in file_paths))
@@ -1,90 +1,154 @@
 # bee_api.py
 
-import requests
-import time
-from config import BEE_API_URL, WAIT_FOR_BATCH_TIMEOUT, WAIT_FOR_BATCH_RETRY
+from requests import RequestException
+from bee_client import get_bee_client
+from config import WAIT_FOR_BATCH_TIMEOUT
+from stamp_watcher import get_stamp_watcher
 from utils import play_notification_sound
 
 
 def is_connected_to_bee():
     try:
-        response = requests.get(f"{BEE_API_URL}/health")
+        response = get_bee_client().get("/health")
         return response.status_code == 200
-    except:
+    except RequestException as e:
+        print(f"⚠️ Bee health check failed: {e}")
         return False
 
 
 def get_wallet_balance():
     try:
-        response = requests.get(f"{BEE_API_URL}/wallet")
+        response = get_bee_client().get("/wallet")
         if response.status_code == 200:
             return int(response.json().get("bzzBalance", 0)) / 10**16
-    except:
-        return 0
+    except (RequestException, ValueError) as e:
+        print(f"⚠️ Could not read wallet balance: {e}")
+    return 0
 
 
 def get_existing_stamps():
     try:
-        response = requests.get(f"{BEE_API_URL}/stamps")
+        response = get_bee_client().get("/stamps")
         if response.status_code == 200:
             return response.json().get("stamps", [])
-    except:
-        return []
+    except (RequestException, ValueError) as e:
+        print(f"⚠️ Could not list stamps: {e}")
+    return []
 
 
 def get_price_per_block():
     try:
-        response = requests.get(f"{BEE_API_URL}/chainstate")
+        response = get_bee_client().get("/chainstate")
         if response.status_code == 200:
             return int(response.json().get("currentPrice", 0))
-    except:
-        return 0
+    except (RequestException, ValueError) as e:
+        print(f"⚠️ Could not read chainstate price: {e}")
+    return 0
 
 
-def create_tag():
+def create_tag(batch_id=None):
+    """Create a tag; pass the upload's batch so a multi-node pool creates it on that batch's node."""
     try:
-        response = requests.post(f"{BEE_API_URL}/tags")
+        response = get_bee_client(batch_id).post("/tags")
         if response.status_code == 201:
             return response.json().get("uid")
-    except:
-        return None
+    except (RequestException, ValueError) as e:
+        print(f"⚠️ Could not create tag: {e}")
+    return None
 
 
-def get_tag_progress(tag_uid):
+def get_tag(tag_uid):
+    """Return the full tag record (split, seen, stored, sent, synced, ...) or None."""
     try:
-        response = requests.get(f"{BEE_API_URL}/tags/{tag_uid}")
+        response = get_bee_client().get(f"/tags/{tag_uid}")
         if response.status_code == 200:
-            split = response.json().get("split")
-            total = response.json().get("total")
-            if total:
-                return round(split / total * 100)
-    except:
+            return response.json()
+    except (RequestException, ValueError) as e:
+        print(f"⚠️ Could not read tag {tag_uid}: {e}")
+    return None
+
+
+def tag_percent(tag):
+    """
+    Progress of a tag record as a whole percentage, or None if nothing was split yet.
+    Uses split/total where the node reports a total, otherwise processed (synced + seen)/split.
+    """
+    split = tag.get("split") or 0
+    total = tag.get("total")
+    if total:
+        return round(split / total * 100)
+    if split:
+        processed = (tag.get("synced") or 0) + (tag.get("seen") or 0)
+        return min(100, round(processed / split * 100))
+    return None
+
+
+def get_tag_progress(tag_uid):
+    tag = get_tag(tag_uid)
+    return tag_percent(tag) if tag else None
+
+
+def feed_topic(feed_name):
+    """Topic of a named feed: the keccak256 hash of its name, as bee-js derives it."""
+    from eth_hash.auto import keccak  # Already loaded by chunker for any upload
+    return keccak(feed_name.encode()).hex()
+
+
+_feed_owners = {}  # batch ID (None: default node) -> Ethereum address of the node
+
+
+def get_feed_owner(batch_id=None):
+    """Ethereum address (hex, no 0x) of the node that signs feed updates for this batch, or None."""
+    if batch_id not in _feed_owners:
+        try:
+            response = get_bee_client(batch_id).get("/addresses")
+            if response.status_code != 200:
+                print(f"⚠️ Unexpected status while reading node addresses: {response.status_code}")
+                return None
+            address = response.json()["ethereum"].lower()
+            _feed_owners[batch_id] = address[2:] if address.startswith("0x") else address
+        except (RequestException, ValueError, KeyError) as e:
+            print(f"⚠️ Could not read node addresses: {e}")
+            return None
+    return _feed_owners[batch_id]
+
+
+def lookup_feed_index(feed_name, batch_id=None):
+    """
+    Next sequence index of a named feed according to the node (GET /feeds).
+
+    Returns:
+        int | None: The next index (0 for a feed with no updates), or None if the node
+            could not be asked.
+    """
+    owner = get_feed_owner(batch_id)
+    if owner is None:
         return None
+    try:
+        response = get_bee_client(batch_id).get(f"/feeds/{owner}/{feed_topic(feed_name)}?type=sequence")
+        if response.status_code == 404:
+            return 0
+        if response.status_code == 200:
+            next_index = response.headers.get("Swarm-Feed-Index-Next")
+            if next_index is not None:
+                return int(next_index, 16)
+            return int(response.headers["Swarm-Feed-Index"], 16) + 1
+        print(f"⚠️ Unexpected status while looking up feed {feed_name}: {response.status_code}")
+    except (RequestException, ValueError, KeyError) as e:
+        print(f"⚠️ Could not look up feed {feed_name}: {e}")
+    return None
 
 
 def wait_for_stamp_usable(batch_id):
     """
     Waits for a batch to become usable, with timeout and connectivity checks.
+    Polling is shared with every other waiter through the stamp watcher.
     """
     print("⏳ Waiting for batch to become usable...")
-    start_time = time.time()
-
-    while time.time() - start_time < WAIT_FOR_BATCH_TIMEOUT:
-        try:
-            response = requests.get(f"{BEE_API_URL}/stamps/{batch_id}")
-            if response.status_code == 200:
-                if response.json().get("usable", False):
-                    print("✅ Batch is now usable.")
-                    play_notification_sound()
-                    return True
-                else:
-                    print("...still waiting...")
-            else:
-                print(f"⚠️ Unexpected status while checking stamp: {response.status_code}")
-        except Exception as e:
-            print(f"❌ Connection error while checking batch usability: {e}")
-            return False
-        time.sleep(WAIT_FOR_BATCH_RETRY)
+    if get_stamp_watcher().wait_until_usable(batch_id, WAIT_FOR_BATCH_TIMEOUT):
+        print("✅ Batch is now usable.")
+        play_notification_sound()
+        return True
 
     print("❌ Timeout: Batch did not become usable within expected time.")
     return False
@@ -0,0 +1,132 @@
+# bee_client.py
+
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from config import (
+    BEE_API_URLS,
+    BEE_POOL_CONNECTIONS,
+    BEE_POOL_MAXSIZE,
+    BEE_DEFAULT_TIMEOUT,
+    BEE_TIMEOUTS,
+    BEE_GET_RETRIES,
+    BEE_RETRY_BACKOFF,
+)
+from metrics import body_size, endpoint_of, get_metrics
+
+RETRY_STATUSES = (502, 503, 504)
+
+
+class BeeClient:
+    """
+    HTTP client for a Bee node with a shared keep-alive connection pool.
+
+    All Bee calls should go through one instance (see get_bee_client) so TCP
+    connections are reused instead of opened per request. Every request is recorded
+    in metrics, and GETs are retried on connection errors and 502/503/504.
+    """
+
+    def __init__(self, base_url=BEE_API_URLS[0], pool_maxsize=BEE_POOL_MAXSIZE, timeouts=None,
+                 get_retries=BEE_GET_RETRIES):
+        self.base_url = base_url.rstrip("/")
+        self.timeouts = dict(BEE_TIMEOUTS, **(timeouts or {}))
+        self.get_retries = get_retries
+
+        adapter = HTTPAdapter(
+            pool_connections=BEE_POOL_CONNECTIONS,
+            pool_maxsize=pool_maxsize,
+            pool_block=True,  # Wait for a free connection instead of opening throwaway ones
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def timeout_for(self, path):
+        """Return the configured timeout for an endpoint, keyed on its first path segment."""
+        return self.timeouts.get(endpoint_of(path), BEE_DEFAULT_TIMEOUT)
+
+    def _send(self, method, path, timeout, **kwargs):
+        sent = body_size(kwargs.get("data"))
+        start = time.monotonic()
+        try:
+            response = self.session.request(method, self.url(path), timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            get_metrics().observe_request(method, path, type(e).__name__, time.monotonic() - start, sent)
+            raise
+        received = len(response.content) if not kwargs.get("stream") else 0
+        get_metrics().observe_request(method, path, response.status_code, time.monotonic() - start, sent, received)
+        return response
+
+    def request(self, method, path, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = self.timeout_for(path)
+        retries = self.get_retries if method == "GET" else 0
+        delay = BEE_RETRY_BACKOFF
+        for attempt in range(retries + 1):
+            try:
+                response = self._send(method, path, timeout, **kwargs)
+                if response.status_code not in RETRY_STATUSES or attempt == retries:
+                    return response
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == retries:
+                    raise
+            get_metrics().count_retry(path)
+            time.sleep(delay)
+            delay *= 2
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request("PATCH", path, **kwargs)
+
+    def for_batch(self, batch_id):
+        """A client for work on one batch; a single node holds every batch, so this client."""
+        return self
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _new_client(urls):
+    if len(urls) > 1:
+        from bee_pool import BeePool  # bee_pool builds on BeeClient
+        return BeePool(urls).start()
+    return BeeClient(urls[0])
+
+
+def get_bee_client(batch_id=None):
+    """
+    Return the process-wide Bee client, creating it on first use.
+
+    With several nodes in BEE_API_URLS this is a bee_pool.BeePool, and passing batch_id
+    binds the client to the node holding that batch (tags created through it included).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _new_client(BEE_API_URLS)
+    return _client.for_batch(batch_id) if batch_id else _client
+
+
+def set_bee_node(base_url):
+    """Point the process-wide client at another node, or a list of nodes, closing the old one."""
+    global _client
+    urls = [base_url] if isinstance(base_url, str) else list(base_url)
+    with _client_lock:
+        old, _client = _client, _new_client(urls)
+    if old is not None:
+        old.close()
+    return _client
@@ -0,0 +1,368 @@
+# bee_pool.py
+
+import re
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from urllib3.exceptions import NewConnectionError
+from bee_client import BeeClient, RETRY_STATUSES
+from config import (
+    BEE_API_URLS,
+    BEE_GET_RETRIES,
+    BEE_RETRY_BACKOFF,
+    BEE_NODE_CHECK_INTERVAL,
+    BEE_NODE_EJECT_SECONDS,
+    BEE_NODE_LATENCY_ALPHA,
+    BEE_NODE_MAX_TAGS,
+)
+from metrics import endpoint_of, get_metrics
+
+_BATCH_PATH = re.compile(r"^/?stamps/(?:dilute/|topup/)?([0-9a-fA-F]{64})")
+_TAG_PATH = re.compile(r"^/?tags/(\d+)")
+
+
+def _batch_of(path, headers):
+    """Batch ID a request is bound to, from its stamp header or a /stamps/{id} path."""
+    if headers and headers.get("Swarm-Postage-Batch-Id"):
+        return headers["Swarm-Postage-Batch-Id"]
+    match = _BATCH_PATH.match(path)
+    return match.group(1) if match else None
+
+
+def _tag_of(path, headers):
+    """Tag UID a request is bound to, from a /tags/{uid} path or its Swarm-Tag header."""
+    match = _TAG_PATH.match(path)
+    if match:
+        return int(match.group(1))
+    if headers and headers.get("Swarm-Tag"):
+        return int(headers["Swarm-Tag"])
+    return None
+
+
+def _replayable(data):
+    """Whether a request body can be sent again after a failed attempt."""
+    return data is None or isinstance(data, (bytes, bytearray, memoryview, str))
+
+
+def _not_sent(error):
+    """Whether a failed request never reached the node: a connect timeout, or refused/unresolvable."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class BeeNode:
+    """One node in the pool and what the pool knows about it."""
+
+    def __init__(self, url):
+        self.client = BeeClient(url, get_retries=0)  # The pool retries, preferably on another node
+        self.url = self.client.base_url
+        self.healthy = True
+        self.latency = None       # Moving average of /health round trips, seconds
+        self.in_flight = 0
+        self.down_until = 0.0     # Ejected until this monotonic time
+        self.failures = 0
+        self.last_error = None
+        self.batches = set()      # Batch IDs this node holds, from its /stamps
+
+    def available(self, now):
+        return self.healthy and now >= self.down_until
+
+    def score(self):
+        """Lower is better: expected latency scaled by the queue already waiting on the node."""
+        return (self.latency or 0.001) * (1 + self.in_flight)
+
+
+class BeePool:
+    """
+    Spreads Bee calls over several nodes by health, latency and load.
+
+    Works like a BeeClient (request/get/post/patch), so it stands in for the process-wide
+    client when BEE_API_URLS lists more than one node. Each request goes to:
+
+    - a node holding the batch, for anything that names one (Swarm-Postage-Batch-Id,
+      /stamps/{id} paths, or a client from for_batch);
+    - the node that created the tag, for /tags/{uid} and uploads with a Swarm-Tag;
+    - otherwise the available node with the lowest latency x (1 + requests in flight).
+
+    A node that refuses connections, times out or answers 502/503/504 is ejected for
+    eject_seconds, and the request moves to the next candidate when that is safe: GETs
+    always; other methods only when the connection could not be made (so nothing was
+    sent) or on 503, with a body that can be re-sent, and never for /stamps (a repeated purchase costs money). GET /stamps is
+    asked of every node and merged, which is also how the pool learns who holds which
+    batch. A background thread re-checks every node each check_interval seconds.
+    """
+
+    def __init__(self, urls=BEE_API_URLS, check_interval=BEE_NODE_CHECK_INTERVAL,
+                 eject_seconds=BEE_NODE_EJECT_SECONDS):
+        if not urls:
+            raise ValueError("A Bee pool needs at least one node URL.")
+        self.nodes = [BeeNode(url) for url in urls]
+        self.check_interval = check_interval
+        self.eject_seconds = eject_seconds
+        self._tags = OrderedDict()   # tag UID -> node that created it, oldest first
+        self._lock = threading.Lock()
+        self._stamps_checked = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=len(self.nodes), thread_name_prefix="bee-pool")
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Routing ---
+
+    def _candidates(self, batch_id, tag_uid):
+        """Nodes to try in order: the bound node(s) if known, otherwise every node by score."""
+        if batch_id and not any(batch_id in node.batches for node in self.nodes) \
+                and time.monotonic() - self._stamps_checked > 1:
+            try:
+                self._list_stamps()  # A batch we have not seen yet, e.g. bought a moment ago
+            except requests.RequestException:
+                pass
+        now = time.monotonic()
+        with self._lock:
+            nodes = [node for node in self.nodes if batch_id in node.batches] if batch_id else []
+            if not nodes and tag_uid in self._tags:
+                nodes = [self._tags[tag_uid]]
+            nodes = nodes or self.nodes
+            return sorted(nodes, key=lambda node: (not node.available(now), node.score()))
+
+    def _eject(self, node, error):
+        with self._lock:
+            node.down_until = time.monotonic() + self.eject_seconds
+            node.failures += 1
+            node.last_error = str(error)
+        print(f"⚠️ Bee node {node.url} ejected for {self.eject_seconds}s: {error}")
+
+    def _remember_tag(self, uid, node):
+        with self._lock:
+            self._tags[uid] = node
+            self._tags.move_to_end(uid)
+            while len(self._tags) > BEE_NODE_MAX_TAGS:
+                self._tags.popitem(last=False)
+
+    def _learn(self, node, method, path, response):
+        """Records which node owns tags and batches created through it."""
+        tag = response.headers.get("Swarm-Tag")
+        if tag and tag.isdigit():
+            self._remember_tag(int(tag), node)
+        if method != "POST" or response.status_code != 201:
+            return
+        endpoint = endpoint_of(path)
+        try:
+            if endpoint == "tags":
+                self._remember_tag(int(response.json()["uid"]), node)
+            elif endpoint == "stamps":
+                with self._lock:
+                    node.batches.add(response.json()["batchID"])
+        except (ValueError, KeyError, TypeError):
+            pass
+
+    def _send(self, node, method, path, timeout, **kwargs):
+        with self._lock:
+            node.in_flight += 1
+        try:
+            return node.client.request(method, path, timeout=timeout, **kwargs)
+        finally:
+            with self._lock:
+                node.in_flight -= 1
+
+    def request(self, method, path, timeout=None, batch_id=None, **kwargs):
+        headers = kwargs.get("headers")
+        if method == "GET" and path.split("?", 1)[0].strip("/") == "stamps":
+            return self._list_stamps(timeout)
+
+        candidates = self._candidates(batch_id or _batch_of(path, headers), _tag_of(path, headers))
+        is_get = method == "GET"
+        failover = is_get or (endpoint_of(path) != "stamps" and _replayable(kwargs.get("data")))
+        attempts = len(candidates) if failover else 1
+        if is_get:
+            attempts = max(attempts, BEE_GET_RETRIES + 1)
+        delay = BEE_RETRY_BACKOFF
+        for attempt in range(attempts):
+            if attempt and attempt % len(candidates) == 0:
+                time.sleep(delay)  # Every candidate failed once; back off before going round again
+                delay *= 2
+            node = candidates[attempt % len(candidates)]
+            last = attempt == attempts - 1
+            try:
+                response = self._send(node, method, path, timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._eject(node, e)
+                if last or not (is_get or _not_sent(e)):
+                    raise  # A reset or read timeout on an upload may have landed; never send it twice
+                get_metrics().count_retry(path)
+                continue
+            if response.status_code in RETRY_STATUSES:
+                self._eject(node, f"HTTP {response.status_code}")
+                if not last and (is_get or response.status_code == 503):
+                    get_metrics().count_retry(path)
+                    continue
+            self._learn(node, method, path, response)
+            return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request("PATCH", path, **kwargs)
+
+    def for_batch(self, batch_id):
+        """A client that sends everything, tag creation included, to a node holding batch_id."""
+        return _BatchClient(self, batch_id)
+
+    def url(self, path, batch_id=None):
+        """Full URL on the node a request would go to now, e.g. for a websocket."""
+        return self._candidates(batch_id, None)[0].client.url(path)
+
+    # --- Stamps and health ---
+
+    def _list_stamps(self, timeout=None):
+        """GET /stamps on every node, merged into one response; refreshes batch ownership."""
+        def fetch(node):
+            try:
+                return node, self._send(node, "GET", "/stamps", timeout), None
+            except requests.RequestException as e:
+                return node, None, e
+
+        merged, refused, error = None, None, None
+        stamps = {}
+        for node, response, e in self._executor.map(fetch, self.nodes):
+            if response is None:
+                error = e
+                continue
+            if response.status_code != 200:
+                refused = refused if refused is not None else response
+                continue
+            try:
+                records = response.json().get("stamps", [])
+            except ValueError as e:
+                error = e
+                continue
+            with self._lock:
+                node.batches = {s["batchID"] for s in records}
+            for stamp in records:
+                stamps.setdefault(stamp["batchID"], stamp)
+            merged = merged if merged is not None else response
+        self._stamps_checked = time.monotonic()
+
+        if merged is None:
+            if refused is not None:
+                return refused
+            raise error or requests.ConnectionError("No Bee node answered /stamps.")
+        merged._content = json.dumps({"stamps": list(stamps.values())}).encode()
+        return merged
+
+    def _check(self, node):
+        start = time.monotonic()
+        try:
+            response = node.client.get("/health")
+            healthy = response.status_code == 200 and response.json().get("status", "ok") == "ok"
+            error = None if healthy else f"health: {response.status_code} {response.text[:100]}"
+        except (requests.RequestException, ValueError) as e:
+            healthy, error = False, e
+        elapsed = time.monotonic() - start
+        with self._lock:
+            if healthy:
+                alpha = BEE_NODE_LATENCY_ALPHA
+                node.latency = elapsed if node.latency is None else alpha * elapsed + (1 - alpha) * node.latency
+            else:
+                node.last_error = str(error)
+            if healthy != node.healthy:
+                print(f"{'✅' if healthy else '⚠️'} Bee node {node.url} is {'back' if healthy else 'down'}")
+            node.healthy = healthy
+
+    def refresh(self):
+        """Checks every node's health and latency, then relearns batch ownership."""
+        list(self._executor.map(self._check, self.nodes))
+        try:
+            self._list_stamps()
+        except requests.RequestException as e:
+            print(f"⚠️ Could not list stamps on any Bee node: {e}")
+
+    def status(self):
+        """
+        Returns:
+            list: {"url", "healthy", "available", "latency", "in_flight", "batches", "failures",
+                "last_error"} per node.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "url": node.url,
+                "healthy": node.healthy,
+                "available": node.available(now),
+                "latency": node.latency,
+                "in_flight": node.in_flight,
+                "batches": len(node.batches),
+                "failures": node.failures,
+                "last_error": node.last_error,
+            } for node in self.nodes]
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"❌ Bee pool check failed: {e}")
+
+    def start(self):
+        """Checks every node once, then keeps checking in the background."""
+        if self._thread is None:
+            self.refresh()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="bee-pool", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown()
+        for node in self.nodes:
+            node.client.close()
+
+
+class _BatchClient:
+    """A view of a BeePool bound to the node(s) holding one batch."""
+
+    def __init__(self, pool, batch_id):
+        self.pool = pool
+        self.batch_id = batch_id
+
+    def url(self, path):
+        return self.pool.url(path, self.batch_id)
+
+    def request(self, method, path, **kwargs):
+        return self.pool.request(method, path, batch_id=self.batch_id, **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request("PATCH", path, **kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the health of every node in the Bee pool.")
+    parser.add_argument("urls", nargs="*", default=BEE_API_URLS, help="Node URLs (default: BEE_API_URLS)")
+    args = parser.parse_args()
+
+    pool = BeePool(args.urls).start()
+    for node in pool.status():
+        icon = "✅" if node["available"] else "❌"
+        latency = f"{node['latency'] * 1000:.0f}ms" if node["latency"] is not None else "-"
+        print(f"{icon} {node['url']}  latency {latency}  batches {node['batches']}"
+              + (f"  ({node['last_error']})" if node["last_error"] else ""))
+    pool.close()
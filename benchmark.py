@@ -0,0 +1,264 @@
+# benchmark.py
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import contextlib
+import platform
+import tempfile
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import local_store
+from bee_client import set_bee_node
+from mock_bee import MockBee
+from quote import quote, quote_matrix
+from stamp_watcher import StampWatcher
+from tag_monitor import TagMonitor
+from upload import send_file
+from upload_engine import upload_many
+
+DEFAULT_TOLERANCE = 0.2   # Relative slowdown allowed before --compare reports a regression
+
+
+def _metric(value, unit, better):
+    return {"value": round(value, 6), "unit": unit, "better": better}
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def _best_of(fn, repeat=5):
+    """Fastest of several runs, for CPU-bound micro benchmarks where noise only adds time."""
+    return min(_timed(fn)[1] for _ in range(repeat))
+
+
+def bench_upload(bee, quick=False):
+    """Upload throughput through upload_many, and single-file latency, over a throttled link."""
+    files, size = (8, 256 * 1024) if quick else (32, 1024 * 1024)
+    bee.configure(latency=0.005, throughput=200 * 1024 ** 2, sync_delay=0)
+    batch_id = bee.add_stamp(depth=22)
+    directory = tempfile.mkdtemp(prefix="swarm-bench-")
+    try:
+        paths = []
+        for i in range(files):
+            path = os.path.join(directory, f"file-{i:04d}.bin")
+            with open(path, "wb") as f:
+                f.write(os.urandom(size))
+            paths.append(path)
+
+        results, seconds = _timed(lambda: upload_many(paths, batch_id))
+        failed = sum(1 for r in results if r["error"])
+        single = [_timed(lambda: send_file(paths[0], batch_id, False))[1] for _ in range(5 if quick else 20)]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return {
+        "upload_many_mb_per_second": _metric(files * size / 1024 ** 2 / seconds, "MB/s", "higher"),
+        "upload_many_files_per_second": _metric(files / seconds, "files/s", "higher"),
+        "upload_many_failed": _metric(failed, "files", "lower"),
+        "send_file_median_seconds": _metric(statistics.median(single), "s", "lower"),
+    }
+
+
+def bench_polling(bee, quick=False):
+    """Requests and overshoot when many waiters wait on batches and tags at once."""
+    delay = 1.0 if quick else 2.0
+    waiters = 4 if quick else 16
+    bee.configure(latency=0.002, throughput=None, stamp_usable_delay=delay, sync_delay=delay)
+    client = set_bee_node(bee.url)
+
+    batch_ids = [client.post(f"/stamps/{10 ** 9}/20").json()["batchID"] for _ in range(waiters)]
+    watcher = StampWatcher()
+    bee.reset_stats()
+    with ThreadPoolExecutor(max_workers=waiters) as pool:
+        (_, stamp_seconds) = _timed(lambda: list(pool.map(watcher.wait_until_usable, batch_ids)))
+    stamp_requests = bee.stats().get("GET stamps", 0)
+
+    batch_id = bee.add_stamp()
+    tags = []
+    for _ in range(waiters):
+        uid = client.post("/tags").json()["uid"]
+        client.post("/bytes", data=os.urandom(64 * 1024),
+                    headers={"Swarm-Postage-Batch-Id": batch_id, "Swarm-Tag": str(uid)})
+        tags.append(uid)
+    monitor = TagMonitor()
+    bee.reset_stats()
+    with ThreadPoolExecutor(max_workers=waiters) as pool:
+        (_, tag_seconds) = _timed(lambda: list(pool.map(lambda uid: monitor.wait(uid, timeout=60), tags)))
+    tag_requests = bee.stats().get("GET tags", 0)
+    return {
+        "stamp_wait_overshoot_seconds": _metric(stamp_seconds - delay, "s", "lower"),
+        "stamp_requests_per_waiter": _metric(stamp_requests / waiters, "requests", "lower"),
+        "tag_wait_overshoot_seconds": _metric(tag_seconds - delay, "s", "lower"),
+        "tag_requests_per_waiter": _metric(tag_requests / waiters, "requests", "lower"),
+    }
+
+
+def bench_startup(bee, quick=False):
+    """Interpreter start + imports + node probes of main.py, in a fresh process each run."""
+    bee.configure(latency=0.002, throughput=None)
+    code = "import json, main; main.probe_node(); print(json.dumps(main.STARTUP_TIMINGS))"
+    env = dict(os.environ, BEE_API_URL=bee.url)
+    here = os.path.dirname(os.path.abspath(__file__))
+    runs = []
+    for _ in range(3 if quick else 7):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", code], cwd=here, env=env, capture_output=True, text=True,
+                             check=True)
+        timings = json.loads(out.stdout.strip().splitlines()[-1])
+        timings["process"] = time.perf_counter() - start
+        runs.append(timings)
+    return {
+        "process_seconds": _metric(statistics.median(r["process"] for r in runs), "s", "lower"),
+        "import_seconds": _metric(statistics.median(r["imports"] for r in runs), "s", "lower"),
+        "probe_seconds": _metric(statistics.median(r["probes"] for r in runs), "s", "lower"),
+    }
+
+
+def bench_local_store(bee, quick=False):
+    """Bulk and single-row write cost of the SQLite feed store, in a scratch database."""
+    rows = 5000 if quick else 50000
+    singles = 200 if quick else 1000
+    directory = tempfile.mkdtemp(prefix="swarm-bench-")
+    saved = local_store.LOCAL_FEED_DB, local_store.LOCAL_FEED_FILE
+    local_store.LOCAL_FEED_DB = os.path.join(directory, "bench.db")
+    local_store.LOCAL_FEED_FILE = os.path.join(directory, "absent.json")
+    try:
+        entries = [(f"batch-{i % 16}", f"file-{i}", f"{i:064x}") for i in range(rows)]
+        with contextlib.redirect_stdout(io.StringIO()):  # Each save prints a confirmation
+            _, bulk_seconds = _timed(lambda: local_store.save_local_feeds(entries))
+            _, single_seconds = _timed(
+                lambda: [local_store.save_local_feed("single", f"file-{i}", f"{i:064x}") for i in range(singles)]
+            )
+        lookup_seconds = _best_of(lambda: [local_store.find_by_name(f"file-{i}") for i in range(singles)])
+        local_store.close_connections()
+    finally:
+        local_store.LOCAL_FEED_DB, local_store.LOCAL_FEED_FILE = saved
+        shutil.rmtree(directory, ignore_errors=True)
+    return {
+        "bulk_rows_per_second": _metric(rows / bulk_seconds, "rows/s", "higher"),
+        "single_save_ms": _metric(single_seconds / singles * 1000, "ms", "lower"),
+        "lookup_ms": _metric(lookup_seconds / singles * 1000, "ms", "lower"),
+    }
+
+
+def bench_quote(bee, quick=False):
+    """Quote matrix over many sizes, and single quotes, at a fixed price."""
+    rng = random.Random(0)
+    sizes = [rng.randrange(1, 50 * 1024 ** 3) for _ in range(20000 if quick else 200000)]
+    ttls = [d * 86400 for d in (1, 7, 30, 90, 180, 365)]
+    matrix_seconds = _best_of(lambda: quote_matrix(ttls, sizes, price_per_block=24000))
+    singles = sizes[:10000]
+    single_seconds = _best_of(lambda: [quote(s, ttls[1], price_per_block=24000) for s in singles])
+    return {
+        "matrix_sizes_per_second": _metric(len(sizes) / matrix_seconds, "sizes/s", "higher"),
+        "single_quotes_per_second": _metric(len(singles) / single_seconds, "quotes/s", "higher"),
+    }
+
+
+BENCHMARKS = {
+    "upload": bench_upload,
+    "polling": bench_polling,
+    "startup": bench_startup,
+    "local_store": bench_local_store,
+    "quote": bench_quote,
+}
+
+
+def run_benchmarks(names=None, quick=False):
+    """
+    Runs benchmarks against a fresh in-process MockBee.
+
+    Returns:
+        dict: {"meta": {...}, "results": {benchmark: {metric: {"value", "unit", "better"}}}}
+    """
+    names = names or list(BENCHMARKS)
+    results = {}
+    with MockBee() as bee:
+        set_bee_node(bee.url)
+        for name in names:
+            print(f"⏱️ Running {name}...")
+            results[name] = BENCHMARKS[name](bee, quick)
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares two benchmark reports metric by metric.
+
+    Returns:
+        list: (benchmark, metric, baseline value, current value, relative change, regressed) rows
+            for every metric present in both reports.
+    """
+    rows = []
+    for bench, metrics in current["results"].items():
+        for metric, entry in metrics.items():
+            old = baseline.get("results", {}).get(bench, {}).get(metric)
+            if old is None:
+                continue
+            new_value, old_value = entry["value"], old["value"]
+            change = (new_value - old_value) / old_value if old_value else 0.0
+            worse = -change if entry["better"] == "higher" else change
+            # Absolute floor so near-zero metrics (e.g. 0 failures) do not flap
+            regressed = worse > tolerance and abs(new_value - old_value) > 1e-3
+            rows.append((bench, metric, old_value, new_value, change, regressed))
+    return rows
+
+
+def print_results(report):
+    for bench, metrics in report["results"].items():
+        print(f"\n📊 {bench}")
+        for metric, entry in metrics.items():
+            print(f"   {metric:32} {entry['value']:>14.4f} {entry['unit']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark hot paths against a local mock Bee node.")
+    parser.add_argument("--only", help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--quick", action="store_true", help="Smaller workloads for a fast check")
+    parser.add_argument("--save", metavar="FILE", help="Write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="Compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Relative slowdown counted as a regression (default 0.2)")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else None
+    unknown = set(names or []) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    report = run_benchmarks(names, args.quick)
+    print_results(report)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.tolerance)
+        print(f"\n🔍 Compared with {args.compare}:")
+        for bench, metric, old, new, change, regressed in rows:
+            flag = "❌" if regressed else "✅"
+            print(f"   {flag} {bench}.{metric}: {old:.4f} → {new:.4f} ({change:+.1%})")
+        if any(row[-1] for row in rows):
+            print("❌ Regressions found.")
+            sys.exit(1)
@@ -0,0 +1,114 @@
+# capacity.py
+
+import numpy as np
+from bee_client import get_bee_client
+from chunker import REF_SIZE, chunk_file
+from storage import BUCKET_DEPTH, MIN_DEPTH, MAX_DEPTH
+
+NUM_BUCKETS = 2 ** BUCKET_DEPTH
+
+# A single-file /bzz upload also stores its manifest: three mantaray node chunks (the
+# root, the "/" entry holding the index document, and the file's entry). Their addresses
+# are not known in advance, so the fullest bucket keeps room for all three.
+MANIFEST_RESERVE_CHUNKS = 3
+
+
+def bucket_histogram(addresses):
+    """
+    Counts how many chunk addresses fall into each postage bucket.
+
+    The bucket of a chunk is the first BUCKET_DEPTH bits of its address.
+
+    Args:
+        addresses (list): 32-byte chunk addresses.
+    Returns:
+        numpy.ndarray: int64 array of length 2^BUCKET_DEPTH.
+    """
+    if not addresses:
+        return np.zeros(NUM_BUCKETS, dtype=np.int64)
+    raw = np.frombuffer(b"".join(addresses), dtype=np.uint8).reshape(-1, REF_SIZE)
+    prefixes = raw[:, :4].copy().view(">u4").ravel()
+    buckets = prefixes >> np.uint32(32 - BUCKET_DEPTH)
+    return np.bincount(buckets, minlength=NUM_BUCKETS).astype(np.int64)
+
+
+def get_batch_bucket_fill(batch_id):
+    """
+    Reads a batch's current per-bucket fill from /stamps/{batch_id}/buckets.
+
+    Returns:
+        numpy.ndarray | None: Collisions per bucket, or None if the node did not answer.
+    """
+    try:
+        response = get_bee_client().get(f"/stamps/{batch_id}/buckets")
+        if response.status_code != 200:
+            print(f"⚠️ Could not read buckets for batch {batch_id}: {response.status_code}")
+            return None
+        fill = np.zeros(NUM_BUCKETS, dtype=np.int64)
+        buckets = response.json().get("buckets", [])
+        if buckets:
+            ids = np.fromiter((b["bucketID"] for b in buckets), dtype=np.int64, count=len(buckets))
+            counts = np.fromiter((b["collisions"] for b in buckets), dtype=np.int64, count=len(buckets))
+            fill[ids] = counts
+        return fill
+    except Exception as e:
+        print(f"❌ Error reading bucket fill for batch {batch_id}: {e}")
+        return None
+
+
+def required_depth_for_fill(fill, reserve=MANIFEST_RESERVE_CHUNKS):
+    """
+    Smallest depth at which no bucket overflows.
+
+    Each bucket holds 2^(depth - BUCKET_DEPTH) chunks, so the depth is set by the
+    fullest bucket.
+
+    Returns:
+        int | None: The depth, or None if even MAX_DEPTH is too small.
+    """
+    max_fill = int(fill.max()) + reserve
+    depth = max(MIN_DEPTH, BUCKET_DEPTH + (max_fill - 1).bit_length())
+    return depth if depth <= MAX_DEPTH else None
+
+
+def plan_depth(addresses, batch_id=None, reserve=MANIFEST_RESERVE_CHUNKS):
+    """
+    Plans the exact depth needed for a set of chunk addresses, optionally on top of
+    an existing batch's current fill.
+
+    Returns:
+        dict: {"depth", "chunk_count", "max_bucket_fill", "existing_max_fill"}.
+            "depth" is None if nothing up to MAX_DEPTH fits.
+    """
+    fill = bucket_histogram(addresses)
+    existing_max = 0
+    if batch_id:
+        existing = get_batch_bucket_fill(batch_id)
+        if existing is not None:
+            existing_max = int(existing.max())
+            fill += existing
+    return {
+        "depth": required_depth_for_fill(fill, reserve),
+        "chunk_count": len(addresses),
+        "max_bucket_fill": int(fill.max()),
+        "existing_max_fill": existing_max,
+    }
+
+
+def plan_depth_for_file(file_path, batch_id=None):
+    """Chunks a file locally and plans its exact depth (see plan_depth). Unencrypted only."""
+    chunks = chunk_file(file_path)
+    plan = plan_depth(chunks["addresses"], batch_id)
+    plan["reference"] = chunks["reference"]
+    return plan
+
+
+def plan_depth_for_files(file_paths, batch_id=None):
+    """
+    Plans the exact depth for several files uploaded to the same batch, each with its
+    own manifest; the reserve assumes every manifest chunk may land in the fullest bucket.
+    """
+    addresses = []
+    for path in file_paths:
+        addresses.extend(chunk_file(path)["addresses"])
+    return plan_depth(addresses, batch_id, reserve=MANIFEST_RESERVE_CHUNKS * len(file_paths))
@@ -0,0 +1,260 @@
+# capacity_manager.py
+
+import time
+import argparse
+import threading
+from collections import deque
+from decimal import Decimal
+from bee_api import get_existing_stamps
+from config import (
+    PLUR_PER_xBZZ,
+    CAPACITY_CHECK_INTERVAL,
+    CAPACITY_HISTORY,
+    CAPACITY_HORIZON,
+    CAPACITY_FILL_THRESHOLD,
+    CAPACITY_MIN_TTL,
+    CAPACITY_TOPUP_TTL,
+    CAPACITY_BUDGET_XBZZ,
+    WAIT_FOR_BATCH_TIMEOUT,
+)
+from quote import amount_per_chunk, get_cached_price_per_block
+from storage import MAX_DEPTH, request_dilution, request_topup, stamp_fill_ratio
+
+
+def _slope(samples, field):
+    """Least-squares rate of change of samples[i][field] per second, or None with too few samples."""
+    if len(samples) < 2:
+        return None
+    t0 = samples[0][0]
+    xs = [s[0] - t0 for s in samples]
+    ys = [s[field] for s in samples]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    var = sum((x - mean_x) ** 2 for x in xs)
+    if var == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var
+
+
+class CapacityManager:
+    """
+    Background manager that dilutes or tops up batches before they run out.
+
+    Every `interval` seconds it samples /stamps and keeps a short history of each
+    batch's fill and TTL. From the trend it projects when the batch will be full and
+    when it will expire, and acts ahead of time:
+
+    - Dilute one depth step when the batch is at fill_threshold or projected full
+      within `horizon`. If the halved TTL would fall below min_ttl, a top-up follows
+      once the new depth shows.
+    - Top up by topup_ttl when the TTL is projected below min_ttl within `horizon`.
+
+    Spending is capped by budget_plur across the manager's lifetime; actions that do
+    not fit are reported and skipped. With a zero budget it only reports: nothing is
+    sent, not even a dilution that needs no top-up (dilutions cannot be undone and
+    halve the TTL). Actions are sent without waiting for them to land, so nothing
+    here blocks an upload; a batch with an action in flight is left alone until it
+    lands or times out.
+    """
+
+    def __init__(self, budget_plur=None, batch_ids=None, interval=CAPACITY_CHECK_INTERVAL,
+                 horizon=CAPACITY_HORIZON, fill_threshold=CAPACITY_FILL_THRESHOLD, min_ttl=CAPACITY_MIN_TTL,
+                 topup_ttl=CAPACITY_TOPUP_TTL, history=CAPACITY_HISTORY):
+        if budget_plur is None:
+            budget_plur = int(CAPACITY_BUDGET_XBZZ * PLUR_PER_xBZZ)
+        self.budget_plur = int(budget_plur)
+        self.batch_ids = set(batch_ids) if batch_ids else None
+        self.interval = interval
+        self.horizon = horizon
+        self.fill_threshold = fill_threshold
+        self.min_ttl = int(min_ttl)
+        self.topup_ttl = int(topup_ttl)
+        self.history = history
+        self.spent_plur = 0
+        self.actions = []      # Every action taken or skipped, newest last
+        self._samples = {}     # batch ID -> deque of (time, fill, ttl)
+        self._stamps = {}      # batch ID -> latest stamp record
+        self._pending = {}     # batch ID -> {"action", "to_depth", "topup", "amount", "since"} for actions in flight
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, batch_id):
+        """Adds a batch to manage (when the manager was limited to specific batches)."""
+        with self._lock:
+            if self.batch_ids is not None:
+                self.batch_ids.add(batch_id)
+
+    def observe(self, stamps, now=None):
+        """Records one /stamps sample."""
+        now = time.time() if now is None else now
+        with self._lock:
+            for stamp in stamps:
+                batch_id = stamp["batchID"]
+                if not stamp.get("usable", False):
+                    continue
+                if self.batch_ids is not None and batch_id not in self.batch_ids:
+                    continue
+                samples = self._samples.setdefault(batch_id, deque(maxlen=self.history))
+                if samples and int(stamp["depth"]) != self._stamps[batch_id]["depth"]:
+                    samples.clear()  # Fill is relative to depth; a new depth starts a new trend
+                samples.append((now, stamp_fill_ratio(stamp), int(stamp.get("batchTTL", 0))))
+                self._stamps[batch_id] = dict(stamp, depth=int(stamp["depth"]))
+
+    def projection(self, batch_id):
+        """
+        Returns:
+            dict | None: {"depth", "fill", "fill_rate" (per hour), "full_in", "ttl", "expires_in"}
+                with times in seconds (None when there is no trend yet).
+        """
+        with self._lock:
+            samples = list(self._samples.get(batch_id, ()))
+            stamp = self._stamps.get(batch_id)
+        if not samples:
+            return None
+        _, fill, ttl = samples[-1]
+        fill_rate = _slope(samples, 1)
+        ttl_rate = _slope(samples, 2)
+        full_in = (1.0 - fill) / fill_rate if fill_rate and fill_rate > 0 else None
+        # TTL falls one second per second at a steady price; price changes bend the trend
+        expires_in = ttl / -ttl_rate if ttl_rate and ttl_rate < 0 else ttl
+        return {
+            "depth": stamp["depth"],
+            "fill": fill,
+            "fill_rate": fill_rate * 3600 if fill_rate is not None else None,
+            "full_in": full_in,
+            "ttl": ttl,
+            "expires_in": expires_in,
+        }
+
+    def plan(self, price_per_block):
+        """
+        Decides this round's actions without sending anything.
+
+        Returns:
+            list: {"batch_id", "action" ("dilute" | "topup"), "to_depth", "amount_per_chunk",
+                "plur", "reason"} dicts. A dilution's plur covers its follow-up top-up.
+        """
+        actions = []
+        for batch_id in list(self._samples):
+            if batch_id in self._pending:
+                continue
+            p = self.projection(batch_id)
+            depth = p["depth"]
+            full_soon = p["fill"] >= self.fill_threshold or (p["full_in"] is not None and p["full_in"] < self.horizon)
+            if full_soon and depth < MAX_DEPTH:
+                ttl_after = p["ttl"] // 2
+                amount = amount_per_chunk(price_per_block, self.topup_ttl) if ttl_after < self.min_ttl else 0
+                reason = (f"fill {p['fill']:.0%}" if p["full_in"] is None
+                          else f"fill {p['fill']:.0%}, full in {p['full_in'] / 3600:.1f}h")
+                actions.append({"batch_id": batch_id, "action": "dilute", "to_depth": depth + 1,
+                                "amount_per_chunk": amount, "plur": amount << (depth + 1), "reason": reason})
+            elif p["expires_in"] - self.horizon < self.min_ttl:
+                amount = amount_per_chunk(price_per_block, self.topup_ttl)
+                actions.append({"batch_id": batch_id, "action": "topup", "to_depth": depth,
+                                "amount_per_chunk": amount, "plur": amount << depth,
+                                "reason": f"expires in {p['expires_in'] / 86400:.1f} days"})
+        return actions
+
+    def _record(self, action, status):
+        action = dict(action, status=status, ts=time.time())
+        self.actions.append(action)
+        icon = {"sent": "🛠️", "skipped": "⚠️", "failed": "❌"}[status]
+        print(f"{icon} Capacity {action['action']} {action['batch_id'][:12]}… ({action['reason']}): {status}")
+
+    def _fits_budget(self, action):
+        """Whether an action may be sent: never in report-only mode, else if its plur fits what is left."""
+        return self.budget_plur > 0 and self.spent_plur + action["plur"] <= self.budget_plur
+
+    def _send_topup(self, batch_id, amount):
+        """Sends a top-up and marks the batch pending until its amount grows."""
+        sent = request_topup(batch_id, amount)
+        if sent:
+            stamp = self._stamps.get(batch_id) or {}
+            self._pending[batch_id] = {"action": "topup", "amount": int(stamp.get("amount", 0)), "since": time.time()}
+        return sent
+
+    def _execute(self, action):
+        if not self._fits_budget(action):
+            self._record(action, "skipped")  # Over budget (or report-only)
+            return
+        batch_id = action["batch_id"]
+        if action["action"] == "dilute":
+            sent = request_dilution(batch_id, action["to_depth"])
+            if sent:
+                self._pending[batch_id] = {"action": "dilute", "to_depth": action["to_depth"],
+                                           "topup": action["amount_per_chunk"], "since": time.time()}
+        else:
+            sent = self._send_topup(batch_id, action["amount_per_chunk"])
+        if sent:
+            self.spent_plur += action["plur"]
+        self._record(action, "sent" if sent else "failed")
+
+    def _settle_pending(self):
+        """
+        Clears actions that have landed (new depth, or a larger amount for top-ups) and
+        sends follow-up top-ups for landed dilutions; drops ones that timed out.
+        """
+        for batch_id, pending in list(self._pending.items()):
+            stamp = self._stamps.get(batch_id)
+            if pending["action"] == "dilute":
+                landed = stamp is not None and stamp["depth"] >= pending["to_depth"]
+            else:
+                landed = stamp is not None and int(stamp.get("amount", 0)) > pending["amount"]
+            if landed:
+                del self._pending[batch_id]
+                if pending["action"] == "dilute" and pending["topup"]:
+                    self._send_topup(batch_id, pending["topup"])  # Paid for with the dilution
+            elif time.time() - pending["since"] > WAIT_FOR_BATCH_TIMEOUT:
+                del self._pending[batch_id]
+                print(f"⚠️ {pending['action'].capitalize()} of {batch_id[:12]}… did not land; will re-evaluate.")
+
+    def tick(self):
+        """One round: sample, settle dilutions in flight, plan, act. Returns the planned actions."""
+        stamps = get_existing_stamps()
+        if not stamps:
+            return []
+        self.observe(stamps)
+        self._settle_pending()
+        actions = self.plan(get_cached_price_per_block())
+        for action in actions:
+            self._execute(action)
+        return actions
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"❌ Capacity manager error: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="capacity-manager", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dilute and top up batches ahead of time.")
+    parser.add_argument("--budget", type=Decimal, default=CAPACITY_BUDGET_XBZZ, help="Spend cap in xBZZ (0 = report only)")
+    parser.add_argument("--interval", type=float, default=CAPACITY_CHECK_INTERVAL, help="Seconds between checks")
+    parser.add_argument("--batch", action="append", help="Only manage this batch (repeatable)")
+    args = parser.parse_args()
+
+    manager = CapacityManager(int(args.budget * PLUR_PER_xBZZ), args.batch, interval=args.interval)
+    print(f"📈 Managing capacity every {args.interval:.0f}s with a budget of {args.budget} xBZZ")
+    manager.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        manager.stop()
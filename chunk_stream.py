@@ -0,0 +1,151 @@
+# chunk_stream.py
+
+import os
+import time
+import asyncio
+import threading
+import aiohttp
+from bee_api import create_tag
+from bee_client import get_bee_client
+from chunker import SPAN_SIZE, iter_chunks
+from config import CHUNK_STREAM_WINDOW, CHUNK_STREAM_BATCH, CHUNK_STREAM_ACK_TIMEOUT
+from metrics import get_metrics
+from upload import UploadError
+from utils import play_notification_sound
+
+_DONE = object()
+
+
+def _produce(file_path, loop, queue, stop):
+    """Thread: chunks and hashes the file, handing CHUNK_STREAM_BATCH chunks at a time to the loop."""
+    try:
+        with open(file_path, "rb") as f:
+            batch = []
+            for address, span, payload in iter_chunks(f):
+                batch.append((address, span.to_bytes(SPAN_SIZE, "little") + payload))
+                if len(batch) == CHUNK_STREAM_BATCH:
+                    asyncio.run_coroutine_threadsafe(queue.put(batch), loop).result()
+                    batch = []
+                if stop.is_set():
+                    return
+            asyncio.run_coroutine_threadsafe(queue.put(batch), loop).result()
+        item = _DONE
+    except BaseException as e:
+        item = e
+    asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+
+async def _acknowledge(ws):
+    """Waits for the node's empty binary message that confirms the oldest unacknowledged chunk."""
+    msg = await ws.receive(timeout=CHUNK_STREAM_ACK_TIMEOUT)
+    if msg.type == aiohttp.WSMsgType.BINARY and not msg.data:
+        return
+    if msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.CLOSED):
+        raise UploadError(f"Chunk stream closed by the node: {msg.extra or ws.close_code}")
+    raise UploadError(f"Chunk stream error: {msg.data}")
+
+
+async def _send_chunk(ws, data):
+    try:
+        await ws.send_bytes(data)
+    except (ConnectionResetError, aiohttp.ClientConnectionError):
+        while True:
+            await _acknowledge(ws)  # Drain acknowledgements already received, then raise the node's reason
+
+
+async def stream_file(file_path, batch_id, window=CHUNK_STREAM_WINDOW):
+    """
+    Uploads a file as chunks over the /chunks/stream websocket (async version).
+
+    The file is chunked and hashed locally in a background thread while earlier chunks
+    are on the wire. Up to `window` chunks are sent ahead of the node's acknowledgements;
+    the root chunk is sent last, once everything under it is acknowledged, so the
+    reference only resolves when the whole tree is stored.
+
+    The result is a /bytes reference (no manifest), like stream_upload.send_file_resumable.
+    Unencrypted uploads only.
+
+    Returns:
+        dict: {"reference", "tag", "bytes", "chunks", "seconds"}
+    Raises:
+        UploadError: If the tag cannot be created or the node rejects or stops acknowledging chunks.
+    """
+    size = os.path.getsize(file_path)
+    loop = asyncio.get_running_loop()
+    tag_uid = await loop.run_in_executor(None, create_tag, batch_id)
+    if not tag_uid:
+        raise UploadError("Failed to create a tag.")
+    url = get_bee_client(batch_id).url("/chunks/stream")
+    headers = {"Swarm-Postage-Batch-Id": batch_id, "Swarm-Tag": str(tag_uid)}
+
+    queue = asyncio.Queue(maxsize=max(2, window // CHUNK_STREAM_BATCH))
+    stop = threading.Event()
+    producer = threading.Thread(target=_produce, args=(file_path, loop, queue, stop), name="chunk-stream", daemon=True)
+    start = time.monotonic()
+    status = None
+    count = 0
+    root = None  # Held back one chunk, so the last one (the root) goes alone
+    try:
+        async with aiohttp.ClientSession() as session:
+            try:
+                ws = await session.ws_connect(url, headers=headers, max_msg_size=0, autoping=True)
+            except aiohttp.WSServerHandshakeError as e:
+                raise UploadError(f"Chunk stream refused with status {e.status}", status_code=e.status)
+            async with ws:
+                producer.start()
+                unacked = 0
+                while True:
+                    batch = await queue.get()
+                    if batch is _DONE:
+                        break
+                    if isinstance(batch, BaseException):
+                        raise batch
+                    for chunk in batch:
+                        if root is not None:
+                            if unacked >= window:
+                                await _acknowledge(ws)
+                                unacked -= 1
+                            await _send_chunk(ws, root[1])
+                            unacked += 1
+                        root = chunk
+                        count += 1
+                for _ in range(unacked):
+                    await _acknowledge(ws)
+                await _send_chunk(ws, root[1])
+                await _acknowledge(ws)
+                status = 101
+    except Exception as e:
+        status = type(e).__name__
+        raise
+    finally:
+        get_metrics().observe_request("WS", "/chunks/stream", status, time.monotonic() - start,
+                                      size if status == 101 else 0)
+        stop.set()
+        while producer.is_alive():
+            if queue.empty():
+                await asyncio.sleep(0.01)
+            else:
+                queue.get_nowait()  # Unblock a producer waiting on a full queue
+    seconds = time.monotonic() - start
+    return {"reference": root[0].hex(), "tag": tag_uid, "bytes": size, "chunks": count, "seconds": seconds}
+
+
+def send_file_streamed(file_path, batch_id, window=CHUNK_STREAM_WINDOW):
+    """Blocking wrapper around stream_file."""
+    return asyncio.run(stream_file(file_path, batch_id, window))
+
+
+def upload_file_streamed(file_path, batch_id, notify=True):
+    try:
+        print("\n📤 Streaming chunks...")
+        result = send_file_streamed(file_path, batch_id)
+        mb_per_second = result["bytes"] / 1024 ** 2 / result["seconds"] if result["seconds"] else 0
+        print(f"\n✅ File uploaded successfully. Swarm Hash: {result['reference']}")
+        print(f"ℹ️ {result['chunks']} chunks in {result['seconds']:.1f}s ({mb_per_second:.1f} MB/s). "
+              f"Retrieve with /bytes/{result['reference']}.")
+        if notify:
+            play_notification_sound()
+        return result["reference"]
+    except Exception as e:
+        print(f"\n❌ Upload failed: {e}")
+        return None
@@ -0,0 +1,212 @@
+# chunker.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from eth_hash.auto import keccak
+from config import CHUNK_SIZE_BYTES, CHUNKER_WORKERS, CHUNKER_PARALLEL_MIN_BYTES, CHUNKER_CHUNKS_PER_TASK
+
+# Swarm content-addressed chunk layout (unencrypted)
+CHUNK_SIZE = int(CHUNK_SIZE_BYTES)   # Payload bytes per chunk
+SPAN_SIZE = 8                        # Little-endian length prefix of every chunk
+SEGMENT_SIZE = 32                    # BMT leaf size
+REF_SIZE = 32                        # Size of a chunk address
+BRANCHES = CHUNK_SIZE // REF_SIZE    # References per intermediate chunk (128)
+
+
+def chunk_count(size):
+    """Chunks (data + intermediate) Swarm stores for `size` bytes of unencrypted content."""
+    count = max(1, -(-size // CHUNK_SIZE))
+    total = count
+    while count > 1:
+        full, rest = divmod(count, BRANCHES)
+        parents = full + (1 if rest > 1 else 0)  # A lone leftover reference is carried up, not wrapped
+        total += parents
+        count = parents + (1 if rest == 1 else 0)
+    return total
+
+
+def bmt_root(payload):
+    """Binary Merkle tree root of a chunk payload, zero-padded to CHUNK_SIZE."""
+    if len(payload) < CHUNK_SIZE:
+        payload = bytes(payload) + bytes(CHUNK_SIZE - len(payload))
+    nodes = [keccak(payload[i:i + 2 * SEGMENT_SIZE]) for i in range(0, CHUNK_SIZE, 2 * SEGMENT_SIZE)]
+    while len(nodes) > 1:
+        nodes = [keccak(nodes[i] + nodes[i + 1]) for i in range(0, len(nodes), 2)]
+    return nodes[0]
+
+
+def chunk_address(span, payload):
+    """Swarm address of a content-addressed chunk: keccak256(span || BMT root)."""
+    return keccak(span.to_bytes(SPAN_SIZE, "little") + bmt_root(payload))
+
+
+class ChunkTree:
+    """
+    Incremental Swarm chunk tree, built the same way as Bee's hash trie.
+
+    Data chunk addresses are added in file order. Every BRANCHES references at a level
+    are wrapped into an intermediate chunk one level up. finish() wraps the partial
+    levels, carrying a lone reference up instead of wrapping it, and returns the root.
+    """
+
+    def __init__(self):
+        self.levels = [[]]  # Per level: list of (address, span)
+
+    def _wrap(self, level):
+        refs = self.levels[level]
+        self.levels[level] = []
+        payload = b"".join(address for address, _ in refs)
+        span = sum(span for _, span in refs)
+        return chunk_address(span, payload), span, payload
+
+    def _push(self, level, address, span):
+        while len(self.levels) <= level:
+            self.levels.append([])
+        self.levels[level].append((address, span))
+
+    def add(self, address, span):
+        """
+        Adds the address of the next data chunk.
+
+        Returns:
+            list: Intermediate chunks completed by this addition, as (address, span, payload).
+        """
+        emitted = []
+        level = 0
+        self._push(level, address, span)
+        while len(self.levels[level]) == BRANCHES:
+            chunk = self._wrap(level)
+            emitted.append(chunk)
+            level += 1
+            self._push(level, chunk[0], chunk[1])
+        return emitted
+
+    def finish(self):
+        """
+        Closes the tree.
+
+        Returns:
+            tuple: (root address, list of intermediate chunks emitted while closing).
+        """
+        emitted = []
+        level = 0
+        while True:
+            entries = self.levels[level]
+            is_top = not any(self.levels[level + 1:])
+            if is_top and len(entries) == 1:
+                return entries[0][0], emitted
+            if len(entries) == 1:
+                # A single reference is carried up rather than wrapped on its own
+                self.levels[level] = []
+                self._push(level + 1, *entries[0])
+            elif entries:
+                chunk = self._wrap(level)
+                emitted.append(chunk)
+                self._push(level + 1, chunk[0], chunk[1])
+            level += 1
+
+
+def _read_full(stream, size):
+    """Read exactly `size` bytes unless the stream ends first."""
+    data = stream.read(size)
+    if not data or len(data) == size:
+        return data
+    parts = [data]
+    remaining = size - len(data)
+    while remaining:
+        more = stream.read(remaining)
+        if not more:
+            break
+        parts.append(more)
+        remaining -= len(more)
+    return b"".join(parts)
+
+
+def iter_chunks(stream):
+    """
+    Streams a binary file object through the chunker.
+
+    Yields:
+        tuple: (address, span, payload) for every data and intermediate chunk, in the
+            order they are produced. The last chunk yielded is always the root.
+    Memory use is bounded by one chunk per tree level.
+    """
+    tree = ChunkTree()
+    data = _read_full(stream, CHUNK_SIZE)
+    if not data:
+        data = b""  # Empty content is still one (empty) chunk
+    while True:
+        address = chunk_address(len(data), data)
+        yield address, len(data), data
+        yield from tree.add(address, len(data))
+        data = _read_full(stream, CHUNK_SIZE)
+        if not data:
+            break
+    _, emitted = tree.finish()
+    yield from emitted
+
+
+def _hash_chunk_range(file_path, first_chunk, count):
+    """Worker: hash `count` data chunks starting at chunk index `first_chunk`."""
+    results = []
+    with open(file_path, "rb") as f:
+        f.seek(first_chunk * CHUNK_SIZE)
+        for _ in range(count):
+            data = f.read(CHUNK_SIZE)
+            if not data:
+                break
+            results.append((chunk_address(len(data), data), len(data)))
+    return results
+
+
+def _iter_data_addresses_parallel(file_path, size, workers):
+    total_chunks = -(-size // CHUNK_SIZE)
+    starts = range(0, total_chunks, CHUNKER_CHUNKS_PER_TASK)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() preserves order, which the tree depends on
+        for results in pool.map(_hash_chunk_range, [file_path] * len(starts), starts,
+                                [CHUNKER_CHUNKS_PER_TASK] * len(starts)):
+            yield from results
+
+
+def chunk_file(file_path, workers=CHUNKER_WORKERS, keep_addresses=True):
+    """
+    Computes a file's Swarm content reference and chunk addresses locally.
+
+    The reference is the root of the file's chunk tree, i.e. what POST /bytes would
+    return for the same content. /bzz wraps that root in a manifest, so its reference
+    differs, but the chunk count differs only by the few manifest chunks.
+    Files of at least CHUNKER_PARALLEL_MIN_BYTES are hashed across `workers` processes.
+
+    Returns:
+        dict: {"reference": hex root, "size": bytes, "chunk_count": data + intermediate
+            chunks, "addresses": list of 32-byte addresses (empty if keep_addresses=False)}
+    """
+    size = os.path.getsize(file_path)
+    addresses = []
+    chunk_count = 0
+
+    if workers > 1 and size > CHUNK_SIZE and size >= CHUNKER_PARALLEL_MIN_BYTES:
+        tree = ChunkTree()
+        for address, span in _iter_data_addresses_parallel(file_path, size, workers):
+            chunk_count += 1
+            if keep_addresses:
+                addresses.append(address)
+            for intermediate in tree.add(address, span):
+                chunk_count += 1
+                if keep_addresses:
+                    addresses.append(intermediate[0])
+        root, emitted = tree.finish()
+        chunk_count += len(emitted)
+        if keep_addresses:
+            addresses.extend(chunk[0] for chunk in emitted)
+    else:
+        root = None
+        with open(file_path, "rb") as f:
+            for address, _, _ in iter_chunks(f):
+                chunk_count += 1
+                root = address
+                if keep_addresses:
+                    addresses.append(address)
+
+    return {"reference": root.hex(), "size": size, "chunk_count": chunk_count, "addresses": addresses}
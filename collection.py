@@ -0,0 +1,124 @@
+# collection.py
+
+import os
+import tarfile
+from bee_api import create_tag
+from bee_client import get_bee_client
+from upload import UploadError
+from utils import play_notification_sound
+
+TAR_BLOCK = 512
+TAR_END = bytes(2 * TAR_BLOCK)   # Two zero blocks close the archive
+READ_SIZE = 64 * 1024            # Bytes read from a file per chunk of the request body
+
+
+def _padding(size):
+    return bytes(-size % TAR_BLOCK)
+
+
+def _header(rel_path, size, mtime):
+    info = tarfile.TarInfo(rel_path)
+    info.size = size
+    info.mtime = int(mtime)
+    info.mode = 0o644
+    return info.tobuf(format=tarfile.PAX_FORMAT, encoding="utf-8", errors="surrogateescape")
+
+
+class TarStream:
+    """
+    A directory as a tar archive, generated on the fly while it is iterated.
+
+    Only file metadata is held in memory; file contents are read in READ_SIZE pieces
+    as the request body is sent, and nothing is written to disk. len() is the exact
+    archive size, so requests sends it with a Content-Length instead of chunked encoding.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = []   # (archive path, absolute path, size, mtime)
+        self.length = len(TAR_END)
+        for root, dirs, names in os.walk(directory):
+            dirs.sort()
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                if not os.path.isfile(path):
+                    continue
+                stat = os.stat(path)
+                rel_path = os.path.relpath(path, directory).replace(os.sep, "/")
+                self.entries.append((rel_path, path, stat.st_size, stat.st_mtime))
+                self.length += len(_header(rel_path, stat.st_size, stat.st_mtime))
+                self.length += stat.st_size + len(_padding(stat.st_size))
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for rel_path, path, size, mtime in self.entries:
+            yield _header(rel_path, size, mtime)
+            remaining = size
+            with open(path, "rb") as f:
+                while remaining:
+                    data = f.read(min(READ_SIZE, remaining))
+                    if not data:
+                        # The file shrank since the walk; pad so the archive length still holds
+                        print(f"⚠️ {rel_path} changed during upload; padding to its original size.")
+                        data = bytes(remaining)
+                    remaining -= len(data)
+                    yield data
+            yield _padding(size)
+        yield TAR_END
+
+
+def send_directory(directory, batch_id, encrypt=False, index_document=None, error_document=None):
+    """
+    Uploads a directory as a Swarm collection, streaming the tar straight into POST /bzz.
+
+    Returns:
+        dict: {"reference", "tag", "bytes" (archive size), "files"}
+    Raises:
+        UploadError: If the tag cannot be created or the upload is rejected.
+    """
+    if not os.path.isdir(directory):
+        raise UploadError(f"Not a directory: {directory}")
+
+    tag_uid = create_tag(batch_id)
+    if not tag_uid:
+        raise UploadError("Failed to create a tag.")
+
+    stream = TarStream(directory)
+    headers = {
+        "Swarm-Postage-Batch-Id": batch_id,
+        "Swarm-Tag": str(tag_uid),
+        "Content-Type": "application/x-tar",
+        "Swarm-Collection": "true",
+        "Swarm-Encrypt": "true" if encrypt else "false"
+    }
+    if index_document:
+        headers["Swarm-Index-Document"] = index_document
+    if error_document:
+        headers["Swarm-Error-Document"] = error_document
+
+    response = get_bee_client(batch_id).post(f"/bzz?tag={tag_uid}", headers=headers, data=stream)
+    if response.status_code != 201:
+        raise UploadError(f"Upload failed: {response.status_code} {response.text}", status_code=response.status_code)
+    reference = response.json().get("reference")
+    if not reference:
+        raise UploadError("Upload finished but no swarm hash found!", status_code=response.status_code)
+
+    return {"reference": reference, "tag": tag_uid, "bytes": len(stream), "files": len(stream.entries)}
+
+
+def upload_directory(directory, batch_id, encrypt=False, index_document=None, error_document=None, notify=True):
+    try:
+        print(f"\n📤 Uploading {directory} as a collection...")
+        result = send_directory(directory, batch_id, encrypt, index_document, error_document)
+        print(f"\n✅ Collection uploaded ({result['files']} files). Swarm Hash: {result['reference']}")
+        if notify:
+            play_notification_sound()
+        return result["reference"]
+    except UploadError as e:
+        print(f"❌ {e}")
+        return None
+    except Exception as e:
+        print(f"❌ Exception during collection upload: {e}")
+        return None
@@ -0,0 +1,111 @@
+# compression.py
+
+import os
+import zlib
+import mimetypes
+from config import GZIP_LEVEL, ZSTD_LEVEL
+
+CODECS = ("gzip", "zstd")
+READ_SIZE = 256 * 1024
+
+CODEC_CONTENT_TYPES = {"gzip": "application/gzip", "zstd": "application/zstd"}
+
+# Content that is already compressed; compressing it again costs CPU and saves nothing
+_COMPRESSED_TYPES = {
+    "application/zip", "application/gzip", "application/x-gzip", "application/x-bzip2", "application/x-xz",
+    "application/x-7z-compressed", "application/x-rar-compressed", "application/vnd.rar", "application/zstd",
+    "application/x-lzip", "application/pdf", "application/epub+zip", "application/java-archive",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "font/woff", "font/woff2",
+}
+_COMPRESSED_EXTENSIONS = {".zst", ".zstd", ".lz4", ".br", ".sz", ".tgz", ".txz", ".tbz2", ".apk", ".jar"}
+
+
+def is_compressible(file_path):
+    """False for media and archive types (by mimetypes) that are already compressed."""
+    content_type, encoding = mimetypes.guess_type(file_path)
+    if encoding:
+        return False  # e.g. .gz, .bz2, .xz
+    if os.path.splitext(file_path)[1].lower() in _COMPRESSED_EXTENSIONS:
+        return False
+    if content_type is None:
+        return True
+    major = content_type.split("/", 1)[0]
+    if major in ("video", "audio"):
+        return False
+    if major == "image":
+        return content_type in ("image/svg+xml", "image/bmp", "image/x-ms-bmp", "image/tiff")
+    return content_type not in _COMPRESSED_TYPES
+
+
+def _compressor(codec):
+    if codec == "gzip":
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip header and trailer
+    if codec == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd compression needs the `zstandard` package (pip install zstandard)")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    raise ValueError(f"Unknown codec: {codec} (expected one of {', '.join(CODECS)})")
+
+
+def _decompressor(codec):
+    if codec == "gzip":
+        return zlib.decompressobj(31)
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+class CompressedStream:
+    """
+    A file compressed on the fly while it is iterated, READ_SIZE bytes at a time.
+
+    Used as a request body (sent chunked); `size` is the number of compressed bytes
+    produced so far, i.e. the stored size once iteration has finished.
+    """
+
+    def __init__(self, file_path, codec):
+        self.file_path = file_path
+        self.codec = codec
+        self.size = 0
+        _compressor(codec)  # Fail before the upload starts if the codec is unavailable
+
+    def __iter__(self):
+        compressor = _compressor(self.codec)
+        self.size = 0
+        with open(self.file_path, "rb") as f:
+            while True:
+                block = f.read(READ_SIZE)
+                if not block:
+                    break
+                out = compressor.compress(block)
+                if out:
+                    self.size += len(out)
+                    yield out
+        out = compressor.flush()
+        if out:
+            self.size += len(out)
+            yield out
+
+
+def decompress_stream(src, dst, codec):
+    """Streams compressed bytes from one open binary file to another, restoring the original bytes."""
+    decompressor = _decompressor(codec)
+    while True:
+        block = src.read(READ_SIZE)
+        if not block:
+            break
+        dst.write(decompressor.decompress(block))
+    dst.write(decompressor.flush())
+
+
+def decompress_file(source_path, dest_path, codec):
+    """Streams a downloaded compressed file back to its original bytes."""
+    with open(source_path, "rb") as src, open(dest_path, "wb") as dst:
+        decompress_stream(src, dst, codec)
+    return dest_path
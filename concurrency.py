@@ -0,0 +1,198 @@
+# concurrency.py
+
+import time
+import threading
+from collections import deque
+from bee_api import get_tag
+from config import (
+    UPLOAD_WORKERS,
+    ADAPTIVE_MAX_UPLOADS,
+    ADAPTIVE_DECREASE,
+    ADAPTIVE_LATENCY_TOLERANCE,
+    ADAPTIVE_LATENCY_UNIT,
+    ADAPTIVE_BASELINE_SAMPLES,
+    ADAPTIVE_RATE_STEP,
+    ADAPTIVE_MIN_RATE,
+    ADAPTIVE_MAX_SYNC_LAG,
+    ADAPTIVE_LAG_INTERVAL,
+    ADAPTIVE_LAG_TAGS,
+)
+
+BACKPRESSURE_STATUSES = (429, 503)
+LATENCY_SMOOTHING = 0.3  # Weight of the newest upload in the smoothed latency
+
+
+class AdaptiveLimiter:
+    """
+    AIMD (additive increase, multiplicative decrease) limit on uploads in flight.
+
+    Every upload that completes on time raises the limit by 1/limit, i.e. about one
+    more upload in flight per round trip. The limit is multiplied by `decrease` (at
+    most once per round trip) when the node pushes back:
+
+    - a 429/503 or a connection error. A 429 also paces new uploads to a start rate
+      below the throughput seen so far, which then grows back by ADAPTIVE_RATE_STEP
+      per second and is dropped once it exceeds limit / round trip;
+    - smoothed /bzz latency, per (1 + bytes / ADAPTIVE_LATENCY_UNIT), above
+      latency_tolerance times the best recent value;
+    - the recent upload tags' split - (synced + seen) lag above max_sync_lag and still
+      growing, i.e. the node accepts data faster than it can push it to the network.
+
+        limiter = AdaptiveLimiter()
+        limiter.acquire()
+        ...upload...
+        limiter.release(seconds, size, status=status_code, error=failed, tag_uid=tag)
+    """
+
+    def __init__(self, initial=UPLOAD_WORKERS, min_limit=1, max_limit=ADAPTIVE_MAX_UPLOADS,
+                 decrease=ADAPTIVE_DECREASE, latency_tolerance=ADAPTIVE_LATENCY_TOLERANCE,
+                 max_sync_lag=ADAPTIVE_MAX_SYNC_LAG, lag_interval=ADAPTIVE_LAG_INTERVAL):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.rate = None            # Max uploads started per second; None = not paced
+        self.in_flight = 0
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.max_sync_lag = max_sync_lag
+        self.lag_interval = lag_interval
+        self.decreases = 0
+        self.sync_lag = 0
+        self._cond = threading.Condition()
+        self._next_start = 0.0
+        self._latencies = deque(maxlen=ADAPTIVE_BASELINE_SAMPLES)  # Normalised seconds per upload
+        self._smoothed = None
+        self._round_trip = 0.0      # Smoothed raw upload time; the decrease cooldown
+        self._last_decrease = 0.0
+        self._completions = deque(maxlen=50)  # Monotonic completion times, for throughput
+        self._tags = deque(maxlen=ADAPTIVE_LAG_TAGS)
+        self._lag_checked = 0.0
+        self._lag_checking = False
+
+    def acquire(self):
+        """Blocks until another upload fits under the limit and the start rate."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self.in_flight >= int(self.limit):
+                    self._cond.wait()
+                    continue
+                if self.rate and now < self._next_start:
+                    self._cond.wait(self._next_start - now)
+                    continue
+                self.in_flight += 1
+                if self.rate:
+                    self._next_start = now + 1.0 / self.rate
+                return
+
+    def release(self, seconds, size, status=None, error=False, tag_uid=None):
+        """
+        Records one finished upload and adjusts the limit.
+
+        Args:
+            seconds (float): Time the upload took, without waiting in acquire().
+            size (int): Bytes uploaded.
+            status (int): Bee's status code for a failed upload (UploadError.status_code).
+            error (bool): Whether the upload failed.
+            tag_uid (int): The upload's tag, to follow its sync lag.
+        """
+        now = time.monotonic()
+        with self._cond:
+            self.in_flight -= 1
+            self._completions.append(now)
+            if status in BACKPRESSURE_STATUSES or (error and status is None):
+                self._decrease(now, pace=status == 429)
+            elif not error:
+                self._round_trip += LATENCY_SMOOTHING * (seconds - self._round_trip)
+                normalised = seconds / (1 + size / ADAPTIVE_LATENCY_UNIT)
+                self._latencies.append(normalised)
+                if self._smoothed is None:
+                    self._smoothed = normalised
+                self._smoothed += LATENCY_SMOOTHING * (normalised - self._smoothed)
+                if len(self._latencies) >= 5 and self._smoothed > min(self._latencies) * self.latency_tolerance:
+                    self._decrease(now, pace=False)
+                else:
+                    self._increase()
+                if tag_uid is not None:
+                    self._tags.append(tag_uid)
+            self._cond.notify_all()
+        self._check_lag()
+
+    def _throughput(self):
+        """Completed uploads per second over the recent completions, or None."""
+        if len(self._completions) < 2:
+            return None
+        span = self._completions[-1] - self._completions[0]
+        return (len(self._completions) - 1) / span if span > 0 else None
+
+    def _increase(self):
+        self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        if self.rate:
+            self.rate += ADAPTIVE_RATE_STEP / self.rate
+            if self._round_trip and self.rate > self.limit / self._round_trip:
+                self.rate = None  # Faster than the limit allows anyway
+
+    def _decrease(self, now, pace):
+        if now - self._last_decrease < self._round_trip:
+            return  # Uploads started before the last cut are still finishing
+        self._last_decrease = now
+        self.decreases += 1
+        self.limit = max(self.min_limit, self.limit * self.decrease)
+        if pace:
+            current = self.rate or self._throughput() or self.limit
+            self.rate = max(ADAPTIVE_MIN_RATE, current * self.decrease)
+
+    def _check_lag(self):
+        """At most every lag_interval seconds, starts a lag check off the caller's thread."""
+        with self._cond:
+            if self._lag_checking or not self._tags or time.monotonic() - self._lag_checked < self.lag_interval:
+                return
+            self._lag_checking = True
+            tags = list(self._tags)
+        threading.Thread(target=self._measure_lag, args=(tags,), name="sync-lag", daemon=True).start()
+
+    def _measure_lag(self, tags):
+        """Sums split - (synced + seen) over recent tags and backs off if it keeps growing."""
+        try:
+            lag, finished = 0, []
+            for tag_uid in tags:
+                tag = get_tag(tag_uid)
+                if tag is None:
+                    continue
+                behind = (tag.get("split") or 0) - (tag.get("synced") or 0) - (tag.get("seen") or 0)
+                if behind <= 0:
+                    finished.append(tag_uid)
+                lag += max(0, behind)
+
+            with self._cond:
+                for tag_uid in finished:
+                    if tag_uid in self._tags:
+                        self._tags.remove(tag_uid)
+                growing = lag > self.sync_lag
+                self.sync_lag = lag
+                if lag > self.max_sync_lag and growing:
+                    self._decrease(time.monotonic(), pace=True)
+        except Exception as e:
+            print(f"⚠️ Sync lag check failed: {e}")
+        finally:
+            with self._cond:
+                self._lag_checked = time.monotonic()
+                self._lag_checking = False
+                self._cond.notify_all()
+
+    def stats(self):
+        """
+        Returns:
+            dict: {"limit", "rate", "in_flight", "latency", "baseline", "sync_lag", "decreases"}
+                with latencies in normalised seconds.
+        """
+        with self._cond:
+            return {
+                "limit": int(self.limit),
+                "rate": self.rate,
+                "in_flight": self.in_flight,
+                "latency": self._smoothed,
+                "baseline": min(self._latencies) if self._latencies else None,
+                "sync_lag": self.sync_lag,
+                "decreases": self.decreases,
+            }
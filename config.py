@@ -1,11 +1,14 @@
 # config.py
 
+import os
+import threading
 from decimal import Decimal
-from web3 import Web3
 
 # Bee & Web3 RPC
 WEB3_RPC_URL = "https://rpc.gnosischain.com"
-BEE_API_URL = "http://bee.swarm.public.dappnode:1633"
+BEE_API_URL = os.environ.get("BEE_API_URL", "http://bee.swarm.public.dappnode:1633")  # Env override, e.g. for mock_bee.py
+BEE_API_URLS = [url.strip() for url in os.environ.get("BEE_API_URLS", "").split(",") if url.strip()] or [BEE_API_URL]
+BEE_API_URL = BEE_API_URLS[0]  # Comma-separated BEE_API_URLS spreads work over several nodes (bee_pool.py)
 
 # Swarm Postage Contract (for future on-chain price reads)
 POSTAGE_CONTRACT_ADDRESS = "0x45a1502382541Cd610CC9068e88727426b696293"
@@ -28,14 +31,134 @@ BLOCK_TIME_SECONDS = Decimal(5)           # Gnosis block time
 STORAGE_TIME_SECONDS = Decimal(7 * 24 * 60 * 60)       # ⏳ 1 week TTL for new batches
 DILUTION_TOPUP_TTL = Decimal(7 * 24 * 60 * 60)         # ⏳ 1 week TTL for dilution top-ups
 
+# Predictive capacity manager (capacity_manager.py)
+CAPACITY_CHECK_INTERVAL = 300                  # Seconds between /stamps samples
+CAPACITY_HISTORY = 48                          # Samples kept per batch for the trend
+CAPACITY_HORIZON = 6 * 60 * 60                 # Act when a batch is projected full/expired within this
+CAPACITY_FILL_THRESHOLD = 0.8                  # Dilute at this fill even without a trend
+CAPACITY_MIN_TTL = 2 * 24 * 60 * 60            # Top up when TTL would drop below this
+CAPACITY_TOPUP_TTL = DILUTION_TOPUP_TTL        # TTL bought by each top-up
+CAPACITY_BUDGET_XBZZ = Decimal(os.environ.get("SWARM_CAPACITY_BUDGET_XBZZ", "0"))  # 0 = report only
+
+# Cost quoting (quote.py)
+CHAINSTATE_CACHE_TTL = 60       # Seconds a /chainstate price is reused for quotes
+
 # Stamp readiness wait config
 WAIT_FOR_BATCH_TIMEOUT = 3600   # 1 hour
-WAIT_FOR_BATCH_RETRY = 15       # 15 seconds between checks
+WAIT_FOR_BATCH_RETRY = 15       # Slowest interval between checks (seconds)
+STAMP_POLL_MIN_INTERVAL = 1     # First check interval; grows by STAMP_POLL_BACKOFF up to WAIT_FOR_BATCH_RETRY
+STAMP_POLL_BACKOFF = 1.5
+
+# Concurrent upload engine
+UPLOAD_WORKERS = 8              # Files uploaded in parallel against one batch
+
+# Adaptive upload concurrency (concurrency.py), for upload_many(adaptive=True)
+ADAPTIVE_MAX_UPLOADS = UPLOAD_WORKERS * 4   # Ceiling for uploads in flight
+ADAPTIVE_DECREASE = 0.5                     # Multiplicative cut of the limit (and start rate) on backpressure
+ADAPTIVE_LATENCY_TOLERANCE = 2.0            # Back off once latency exceeds the best recent latency by this factor
+ADAPTIVE_LATENCY_UNIT = 1024 * 1024         # Latency is compared per (1 + bytes / unit), so big files are not "slow"
+ADAPTIVE_BASELINE_SAMPLES = 200             # Recent uploads the best latency is taken from
+ADAPTIVE_RATE_STEP = 1.0                    # Uploads/s the start rate regains per second of good responses
+ADAPTIVE_MIN_RATE = 0.2                     # Slowest start rate (uploads/s)
+ADAPTIVE_MAX_SYNC_LAG = 20000               # Chunks split but not yet synced before backing off
+ADAPTIVE_LAG_INTERVAL = 2                   # Seconds between sync-lag checks
+ADAPTIVE_LAG_TAGS = 16                      # Most recent upload tags included in the lag
+
+# Optional compression before upload (compression.py)
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10                             # Needs the optional `zstandard` package
+
+# Feed update pipeline (feeds.py)
+FEED_UPDATE_WORKERS = UPLOAD_WORKERS        # Feeds published in parallel
+FEED_COALESCE_WINDOW = 0.5                  # Seconds a feed update waits for a newer one to replace it
+
+# Retrievability checks and downloads (verify.py)
+VERIFY_WORKERS = UPLOAD_WORKERS * 2         # References checked in parallel
+DOWNLOAD_WORKERS = 8                        # Range requests in flight per download
+DOWNLOAD_RANGE_SIZE = 4 * 1024 * 1024       # Bytes per range request
+CONTENT_CACHE_DIR = ".swarm_cache"          # On-disk cache of downloaded content
+CONTENT_CACHE_MAX_BYTES = 1024 ** 3         # Least recently used content is evicted above this
+CONTENT_CACHE_STALE_PART = 24 * 3600        # Seconds before an abandoned .part download is deleted
+
+# Bee HTTP client (shared keep-alive connection pool)
+BEE_POOL_CONNECTIONS = 4                    # Distinct hosts kept in the pool
+BEE_POOL_MAXSIZE = UPLOAD_WORKERS * 2       # Keep-alive connections per host
+BEE_DEFAULT_TIMEOUT = 30                    # Seconds, for endpoints not listed below
+BEE_TIMEOUTS = {                            # (connect, read) seconds per endpoint
+    "health": (3, 5),
+    "wallet": (3, 10),
+    "chainstate": (3, 10),
+    "stamps": (3, 30),
+    "tags": (3, 10),
+    "bzz": (5, 600),
+    "chunks": (3, 30),
+}
+BEE_TRANSACTION_TIMEOUT = (3, 600)          # Stamp purchase/dilute/top-up: Bee answers once the transaction is mined
+BEE_GET_RETRIES = 2                         # Extra attempts for GETs on connection errors / 502-504
+BEE_RETRY_BACKOFF = 0.5                     # Seconds before the first retry, doubling after
+
+# Multi-node Bee pool (bee_pool.py), used when BEE_API_URLS lists more than one node
+BEE_NODE_CHECK_INTERVAL = 10                # Seconds between health/stamp checks of every node
+BEE_NODE_EJECT_SECONDS = 30                 # A failing node takes no new work for this long
+BEE_NODE_LATENCY_ALPHA = 0.3                # Weight of the newest health-check latency in the average
+BEE_NODE_MAX_TAGS = 10000                   # Tag UIDs remembered for routing /tags polls to their node
+
+# Metrics (metrics.py); files/port come from the environment so production runs can opt in
+METRICS_FILE = os.environ.get("SWARM_METRICS_FILE")               # Prometheus text written on exit
+METRICS_PORT = int(os.environ.get("SWARM_METRICS_PORT") or 0)     # Serve /metrics on this port (0 = off)
+METRICS_TRACE_FILE = os.environ.get("SWARM_TRACE_FILE")           # JSON-lines log of every Bee request
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Async Bee client (async_bee_api.py) and tag monitor (tag_monitor.py)
+ASYNC_BEE_CONNECTION_LIMIT = 100            # Concurrent connections shared by one event loop
+TAG_POLL_INTERVAL = 1                       # Seconds between progress checks of one tag
+TAG_POLL_RATE = 20                          # Max /tags requests per second across all tracked tags
+
+# Local chunker (chunker.py)
+CHUNKER_WORKERS = os.cpu_count() or 1             # Processes used to hash large files
+CHUNKER_PARALLEL_MIN_BYTES = 64 * 1024 * 1024     # Files below this are hashed in-process
+CHUNKER_CHUNKS_PER_TASK = 1024                    # Data chunks (4 MB) handed to a worker at once
+
+# Resumable streaming uploads (stream_upload.py)
+STREAM_CHECKPOINT_DIR = ".swarm_checkpoints"      # Where upload checkpoints are kept
+STREAM_CHECKPOINT_EVERY = 256                     # Chunks between checkpoint writes
+STREAM_IN_FLIGHT = 16                             # Chunk uploads in flight per file
+
+# Incremental directory sync (sync.py)
+SYNC_POLL_INTERVAL = 60                           # Seconds between rescans when inotify is unavailable
+SYNC_DEBOUNCE = 2                                 # Seconds without changes before a watched tree is synced
+SYNC_HASH_WORKERS = os.cpu_count() or 1           # Changed files hashed in parallel
+
+# Websocket chunk streaming (chunk_stream.py)
+CHUNK_STREAM_WINDOW = 512                         # Chunks sent but not yet acknowledged
+CHUNK_STREAM_BATCH = 64                           # Chunks hashed per hand-off to the event loop
+CHUNK_STREAM_ACK_TIMEOUT = 60                     # Seconds to wait for the node to acknowledge a chunk
 
 # Local feed file
 LOCAL_FEED_FILE = "local_feeds.json"
 
-# Web3 init
-web3 = Web3(Web3.HTTPProvider(WEB3_RPC_URL))
-if not web3.is_connected():
-    raise ConnectionError(f"❌ Failed to connect to Web3 at {WEB3_RPC_URL}")
+# Web3 init (lazy: importing config must not open an RPC connection)
+_web3 = None
+_web3_lock = threading.Lock()
+
+
+def get_web3():
+    """Return the Web3 connection to WEB3_RPC_URL, connecting on first use."""
+    global _web3
+    if _web3 is None:
+        with _web3_lock:
+            if _web3 is None:
+                from web3 import Web3
+
+                web3 = Web3(Web3.HTTPProvider(WEB3_RPC_URL))
+                if not web3.is_connected():
+                    raise ConnectionError(f"❌ Failed to connect to Web3 at {WEB3_RPC_URL}")
+                _web3 = web3
+    return _web3
+
+
+def __getattr__(name):
+    # Keeps `config.web3` working for existing callers
+    if name == "web3":
+        return get_web3()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,152 @@
+# feeds.py
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import FEED_UPDATE_WORKERS, FEED_COALESCE_WINDOW
+from local_store import save_local_feeds
+from upload import send_file
+
+
+class FeedUpdatePipeline:
+    """
+    Publishes sequence feed updates for many feeds in parallel.
+
+    Updates are keyed by (batch ID, feed name). An update waits `window` seconds before
+    it is sent; a newer update to the same feed in that time replaces it, so a burst of
+    changes publishes only the last file. Updates to one feed name are never in flight
+    together, and each goes out with the next sequence index from the local cache,
+    which send_file moves forward after every successful upload. Results are not saved
+    to the local feeds table; republish_feeds does that.
+
+        with FeedUpdatePipeline() as feeds:
+            for batch_id, name, path in changes:
+                feeds.submit(batch_id, name, path)
+        results = feeds.results
+    """
+
+    def __init__(self, encrypt=False, max_workers=FEED_UPDATE_WORKERS, window=FEED_COALESCE_WINDOW,
+                 on_result=None):
+        self.encrypt = encrypt
+        self.window = window
+        self.on_result = on_result
+        self.results = []
+        self._cond = threading.Condition()
+        self._pending = {}    # (batch ID, feed name) -> {"file", "due", "replaced"}
+        self._active = set()  # Feed names with an upload in flight (batches of one owner share feeds)
+        self._closed = False
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._thread = threading.Thread(target=self._dispatch, name="feed-updates", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, batch_id, feed_name, file_path):
+        """Queues a feed update, replacing any queued update to the same feed."""
+        key = (batch_id, feed_name)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Feed pipeline is closed.")
+            queued = self._pending.get(key)
+            self._pending[key] = {
+                "file": file_path,
+                "due": time.monotonic() + self.window,
+                "replaced": queued["replaced"] + 1 if queued else 0,
+            }
+            self._cond.notify_all()
+
+    def submit_many(self, updates):
+        """Queues (batch ID, feed name, file path) updates together, so duplicates coalesce."""
+        with self._cond:
+            for batch_id, feed_name, file_path in updates:
+                self.submit(batch_id, feed_name, file_path)
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                ready = [k for k, e in self._pending.items() if k[1] not in self._active and e["due"] <= now]
+                if not ready:
+                    if self._closed and not self._pending and not self._active:
+                        return
+                    waiting = [e["due"] for k, e in self._pending.items() if k[1] not in self._active]
+                    self._cond.wait(min(waiting) - now if waiting else None)
+                    continue
+                for key in ready:
+                    if key[1] in self._active:
+                        continue  # Same feed name queued for another batch; it goes next round
+                    self._active.add(key[1])
+                    self._pool.submit(self._publish, key, self._pending.pop(key))
+
+    def _publish(self, key, entry):
+        batch_id, feed_name = key
+        result = {
+            "batch_id": batch_id,
+            "feed": feed_name,
+            "file": entry["file"],
+            "reference": None,
+            "feed_index": None,
+            "bytes": 0,
+            "duration": 0.0,
+            "replaced": entry["replaced"],
+            "error": None,
+        }
+        start = time.perf_counter()
+        try:
+            sent = send_file(entry["file"], batch_id, self.encrypt, feed_name)
+            result["reference"] = sent["reference"]
+            result["bytes"] = sent["bytes"]
+            result["feed_index"] = sent["feed_index"]
+        except Exception as e:
+            result["error"] = str(e)
+        result["duration"] = time.perf_counter() - start
+
+        with self._cond:
+            self._active.discard(feed_name)
+            self.results.append(result)
+            self._cond.notify_all()
+        if self.on_result:
+            self.on_result(result)
+
+    def flush(self):
+        """Sends every queued update now and waits until nothing is queued or in flight."""
+        with self._cond:
+            for entry in self._pending.values():
+                entry["due"] = 0
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: not self._pending and not self._active)
+
+    def close(self):
+        """Flushes and stops the pipeline. Further submits raise RuntimeError."""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._pool.shutdown()
+
+
+def republish_feeds(updates, encrypt=False, max_workers=FEED_UPDATE_WORKERS):
+    """
+    Publishes a batch of feed updates at once, e.g. a periodic republish cycle, and
+    saves every published reference in the local store.
+
+    Args:
+        updates (list): (batch ID, feed name, file path) tuples. Later entries for the same
+            feed replace earlier ones.
+    Returns:
+        list: One result per feed actually published, with "batch_id", "feed", "file",
+            "reference", "feed_index", "bytes", "duration", "replaced" and "error".
+    """
+    with FeedUpdatePipeline(encrypt, max_workers, window=0) as pipeline:
+        pipeline.submit_many(updates)
+    published = [(r["batch_id"], r["feed"], r["reference"]) for r in pipeline.results if not r["error"]]
+    if published:
+        save_local_feeds(published)
+    failed = sum(1 for r in pipeline.results if r["error"])
+    print(f"🗘️ Feeds: {len(pipeline.results) - failed} published, {failed} failed.")
+    return pipeline.results
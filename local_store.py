@@ -1,24 +1,211 @@
 import os
 import json
+import time
+import sqlite3
+import threading
 
-# Local JSON file that stores feed (file) names and corresponding Swarm hashes per batch
+# Local JSON file that stores feed (file) names and corresponding Swarm hashes per batch.
+# Kept as the legacy format: it is imported into the database once, then left untouched.
 LOCAL_FEED_FILE = "local_feeds.json"
 
+# Indexed SQLite store that replaces rewriting the JSON file on every save
+LOCAL_FEED_DB = "local_feeds.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feeds (
+    batch_id    TEXT NOT NULL,
+    file_name   TEXT NOT NULL,
+    swarm_hash  TEXT NOT NULL,
+    updated_at  REAL NOT NULL,
+    codec       TEXT,
+    PRIMARY KEY (batch_id, file_name)
+);
+CREATE INDEX IF NOT EXISTS feeds_by_name ON feeds (file_name);
+CREATE INDEX IF NOT EXISTS feeds_by_hash ON feeds (swarm_hash);
+CREATE TABLE IF NOT EXISTS feed_index (
+    owner       TEXT NOT NULL,
+    topic       TEXT NOT NULL,
+    feed_name   TEXT NOT NULL,
+    seq_index   INTEGER NOT NULL,
+    reference   TEXT NOT NULL,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (owner, topic)
+);
+CREATE TABLE IF NOT EXISTS file_index (
+    batch_id     TEXT NOT NULL,
+    root         TEXT NOT NULL,
+    path         TEXT NOT NULL,
+    size         INTEGER NOT NULL,
+    mtime_ns     INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    reference    TEXT NOT NULL,
+    updated_at   REAL NOT NULL,
+    PRIMARY KEY (batch_id, root, path)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_UPSERT_FEED = """
+INSERT INTO feeds (batch_id, file_name, swarm_hash, updated_at, codec) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (batch_id, file_name) DO UPDATE SET
+    swarm_hash = excluded.swarm_hash,
+    updated_at = excluded.updated_at,
+    codec = excluded.codec
+"""
+
+_UPSERT_FILE_INDEX = """
+INSERT INTO file_index (batch_id, root, path, size, mtime_ns, content_hash, reference, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (batch_id, root, path) DO UPDATE SET
+    size = excluded.size,
+    mtime_ns = excluded.mtime_ns,
+    content_hash = excluded.content_hash,
+    reference = excluded.reference,
+    updated_at = excluded.updated_at
+"""
+
+_UPSERT_FEED_INDEX = """
+INSERT INTO feed_index (owner, topic, feed_name, seq_index, reference, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (owner, topic) DO UPDATE SET
+    feed_name = excluded.feed_name,
+    seq_index = excluded.seq_index,
+    reference = excluded.reference,
+    updated_at = excluded.updated_at
+"""
+
+# One connection per thread and database path; SQLite connections are not shared across threads
+_local = threading.local()
+
+
+def _import_legacy_json(conn):
+    """Copies local_feeds.json into the database the first time the database is opened."""
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+        return
+    rows = []
+    if os.path.exists(LOCAL_FEED_FILE):
+        try:
+            with open(LOCAL_FEED_FILE, "r") as f:
+                legacy = json.load(f)
+            now = time.time()
+            rows = [
+                (batch_id, file_name, swarm_hash, now, None)
+                for batch_id, files in legacy.items()
+                for file_name, swarm_hash in files.items()
+            ]
+        except Exception as e:
+            print(f"⚠️ Failed to import {LOCAL_FEED_FILE}: {e}")
+    with conn:
+        conn.executemany(_UPSERT_FEED, rows)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_imported', ?)", (str(len(rows)),))
+
+
+def _migrate(conn):
+    """Adds columns introduced after a database was created."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(feeds)")}
+    if "codec" not in columns:
+        with conn:
+            conn.execute("ALTER TABLE feeds ADD COLUMN codec TEXT")
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(feed_index)")}
+    if "owner" not in columns:
+        # Indexes used to be cached per batch; the cache is dropped and re-seeded from the node
+        with conn:
+            conn.execute("DROP TABLE feed_index")
+        conn.executescript(_SCHEMA)
+
+
+def get_connection():
+    """Returns this thread's connection to LOCAL_FEED_DB, creating the schema on first use."""
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(LOCAL_FEED_DB)
+    if conn is None:
+        conn = sqlite3.connect(LOCAL_FEED_DB, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")    # Concurrent readers while one process writes
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _migrate(conn)
+        _import_legacy_json(conn)
+        conns[LOCAL_FEED_DB] = conn
+    return conn
+
+
+def close_connections():
+    """Closes this thread's database connections; the next call reconnects."""
+    for conn in getattr(_local, "conns", {}).values():
+        conn.close()
+    _local.conns = {}
+
+
 def load_local_feeds():
     """
     Loads locally saved file name -> Swarm hash mappings for each batch.
     Returns:
         dict: A dictionary where keys are batch IDs and values are file name/hash pairs.
     """
-    if os.path.exists(LOCAL_FEED_FILE):
-        try:
-            with open(LOCAL_FEED_FILE, "r") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"⚠️ Failed to load local feeds: {e}")
-    return {}
+    feeds = {}
+    try:
+        for batch_id, file_name, swarm_hash in get_connection().execute(
+            "SELECT batch_id, file_name, swarm_hash FROM feeds ORDER BY batch_id, updated_at"
+        ):
+            feeds.setdefault(batch_id, {})[file_name] = swarm_hash
+    except Exception as e:
+        print(f"⚠️ Failed to load local feeds: {e}")
+    return feeds
+
+
+def get_batch_feeds(batch_id):
+    """
+    Returns:
+        dict: file name -> Swarm hash for one batch (empty if the store cannot be read).
+    """
+    try:
+        rows = get_connection().execute(
+            "SELECT file_name, swarm_hash FROM feeds WHERE batch_id = ? ORDER BY updated_at", (batch_id,)
+        )
+        return dict(rows.fetchall())
+    except Exception as e:
+        print(f"⚠️ Failed to load local feeds: {e}")
+        return {}
 
-def save_local_feed(batch_id, file_name, swarm_hash):
+
+def find_by_name(file_name):
+    """
+    Returns:
+        list: (batch ID, Swarm hash) pairs saved under this file name.
+    """
+    rows = get_connection().execute(
+        "SELECT batch_id, swarm_hash FROM feeds WHERE file_name = ?", (file_name,)
+    )
+    return rows.fetchall()
+
+
+def find_by_reference(swarm_hash):
+    """
+    Returns:
+        list: (batch ID, file name) pairs saved with this Swarm hash.
+    """
+    rows = get_connection().execute(
+        "SELECT batch_id, file_name FROM feeds WHERE swarm_hash = ?", (swarm_hash,)
+    )
+    return rows.fetchall()
+
+
+def get_codec(swarm_hash):
+    """
+    Returns:
+        str | None: Compression codec recorded for a Swarm hash, None if stored uncompressed.
+    """
+    row = get_connection().execute(
+        "SELECT codec FROM feeds WHERE swarm_hash = ? AND codec IS NOT NULL LIMIT 1", (swarm_hash,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def save_local_feed(batch_id, file_name, swarm_hash, codec=None):
     """
     Saves a file name and its Swarm hash under a given batch ID to local storage.
     Creates a new batch entry if it doesn't exist.
@@ -27,15 +214,122 @@ def save_local_feed(batch_id, file_name, swarm_hash):
         batch_id (str): ID of the batch.
         file_name (str): Human-readable file name used as the Swarm Feed name.
         swarm_hash (str): Swarm hash of the uploaded file.
+        codec (str): Compression the content was stored with ("gzip", "zstd"), if any.
     """
-    feeds = load_local_feeds()
-    if batch_id not in feeds:
-        feeds[batch_id] = {}
-    feeds[batch_id][file_name] = swarm_hash
-
     try:
-        with open(LOCAL_FEED_FILE, "w") as f:
-            json.dump(feeds, f, indent=2)
+        conn = get_connection()
+        with conn:
+            conn.execute(_UPSERT_FEED, (batch_id, file_name, swarm_hash, time.time(), codec))
         print(f"🗘️ Saved locally: {file_name} -> {swarm_hash}")
     except Exception as e:
         print(f"❌ Failed to save feed: {e}")
+
+
+def save_local_feeds(entries):
+    """
+    Saves many (batch ID, file name, Swarm hash[, codec]) entries in one atomic transaction.
+
+    Returns:
+        int: Number of entries saved (0 if the transaction failed).
+    """
+    now = time.time()
+    rows = [(entry[0], entry[1], entry[2], now, entry[3] if len(entry) > 3 else None) for entry in entries]
+    try:
+        conn = get_connection()
+        with conn:
+            conn.executemany(_UPSERT_FEED, rows)
+        print(f"🗘️ Saved {len(rows)} entries locally.")
+        return len(rows)
+    except Exception as e:
+        print(f"❌ Failed to save feeds: {e}")
+        return 0
+
+
+def get_feed_index(owner, topic):
+    """
+    Returns:
+        tuple | None: (latest sequence index, reference) cached for a feed, or None if unknown.
+    """
+    row = get_connection().execute(
+        "SELECT seq_index, reference FROM feed_index WHERE owner = ? AND topic = ?", (owner, topic)
+    ).fetchone()
+    return tuple(row) if row else None
+
+
+def get_feed_indexes(owner):
+    """
+    Returns:
+        dict: feed name -> (latest sequence index, reference) for every feed of one owner.
+    """
+    rows = get_connection().execute(
+        "SELECT feed_name, seq_index, reference FROM feed_index WHERE owner = ?", (owner,)
+    )
+    return {name: (index, reference) for name, index, reference in rows}
+
+
+def save_feed_indexes(entries):
+    """
+    Records published feed updates as (owner, topic, feed name, sequence index, reference).
+
+    Only the cached sequence indexes move, never backwards; the feeds table is left to
+    save_local_feed/save_local_feeds.
+
+    Returns:
+        int: Number of entries saved (0 if the transaction failed).
+    """
+    now = time.time()
+    rows = [(owner, topic, name, index, reference, now) for owner, topic, name, index, reference in entries]
+    try:
+        conn = get_connection()
+        with conn:
+            conn.executemany(_UPSERT_FEED_INDEX + " WHERE excluded.seq_index >= feed_index.seq_index", rows)
+        return len(rows)
+    except Exception as e:
+        print(f"❌ Failed to save feed indexes: {e}")
+        return 0
+
+
+def get_file_index(batch_id, root):
+    """
+    Returns:
+        dict: relative path -> {"size", "mtime_ns", "content_hash", "reference"} for a
+            directory last synced to this batch (see sync.py).
+    """
+    rows = get_connection().execute(
+        "SELECT path, size, mtime_ns, content_hash, reference FROM file_index WHERE batch_id = ? AND root = ?",
+        (batch_id, root),
+    )
+    return {
+        path: {"size": size, "mtime_ns": mtime_ns, "content_hash": content_hash, "reference": reference}
+        for path, size, mtime_ns, content_hash, reference in rows
+    }
+
+
+def save_file_index(batch_id, root, entries):
+    """
+    Records synced files as (relative path, size, mtime_ns, content hash, reference) entries.
+
+    Returns:
+        int: Number of entries saved (0 if the transaction failed).
+    """
+    now = time.time()
+    rows = [(batch_id, root, path, size, mtime_ns, content_hash, reference, now)
+            for path, size, mtime_ns, content_hash, reference in entries]
+    try:
+        conn = get_connection()
+        with conn:
+            conn.executemany(_UPSERT_FILE_INDEX, rows)
+        return len(rows)
+    except Exception as e:
+        print(f"❌ Failed to save the file index: {e}")
+        return 0
+
+
+def remove_file_index(batch_id, root, paths):
+    """Forgets files that no longer exist under a synced directory."""
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            "DELETE FROM file_index WHERE batch_id = ? AND root = ? AND path = ?",
+            [(batch_id, root, path) for path in paths],
+        )
@@ -1,11 +1,13 @@
 # main.py
 
+import time
+_STARTUP_T0 = time.perf_counter()  # Taken before project imports so they are included
+
 from config import BEE_API_URL, STORAGE_TIME_SECONDS
 from bee_api import (
     is_connected_to_bee,
     get_wallet_balance,
     get_existing_stamps,
-    get_price_per_block,
     wait_for_stamp_usable
 )
 from storage import (
@@ -13,35 +15,68 @@ from storage import (
     calculate_required_plur,
     purchase_postage_stamp,
     dilute_batch,
-    get_effective_capacity_mb
+    get_effective_capacity_mb,
+    stamp_fill_ratio
 )
+from quote import get_cached_price_per_block
 from upload import upload_file
-from local_store import load_local_feeds, save_local_feed
+from local_store import get_batch_feeds, save_local_feed
+from metrics import start_metrics_export
 import os
+import argparse
 import mimetypes
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 
+_IMPORTS_DONE = time.perf_counter()
+
+# Filled in by probe_node(): seconds spent importing modules and probing the node
+STARTUP_TIMINGS = {}
+
+
+def probe_node():
+    """
+    Runs the independent startup probes (health, wallet, stamps, chainstate) concurrently.
+
+    Returns:
+        tuple: (connected, wallet balance, stamps, price per block)
+    """
+    probe_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        connected = pool.submit(is_connected_to_bee)
+        wallet = pool.submit(get_wallet_balance)
+        stamps = pool.submit(get_existing_stamps)
+        price = pool.submit(get_cached_price_per_block)
+        results = (connected.result(), wallet.result() or 0, stamps.result() or [], price.result() or 0)
+
+    now = time.perf_counter()
+    STARTUP_TIMINGS["imports"] = _IMPORTS_DONE - _STARTUP_T0
+    STARTUP_TIMINGS["probes"] = now - probe_start
+    STARTUP_TIMINGS["total"] = now - _STARTUP_T0
+    return results
+
+
 def main():
-    if not is_connected_to_bee():
+    connected, wallet_balance, stamps, price = probe_node()
+    print(
+        f"⏱️ Startup: {STARTUP_TIMINGS['total']:.2f}s "
+        f"(imports {STARTUP_TIMINGS['imports']:.2f}s, node probes {STARTUP_TIMINGS['probes']:.2f}s)"
+    )
+    if not connected:
         print("❌ Error: Could not connect to Bee node.")
         return
 
     print("✅ Connected to Bee node.\n")
-    wallet_balance = get_wallet_balance()
     print(f"💰 Your xBZZ Balance: {wallet_balance:.6f} xBZZ")
 
-    local_feeds = load_local_feeds()
-    stamps = get_existing_stamps()
-
     if stamps:
         print("\n📦 Available Batches:")
         usable_batches = []
         for i, stamp in enumerate(stamps):
             if stamp.get("usable", False):
                 depth = int(stamp["depth"])
-                utilization = Decimal(stamp.get("utilization", 0))
                 effective_mb = get_effective_capacity_mb(depth)
-                remaining_mb = effective_mb * (1 - utilization)
+                remaining_mb = effective_mb * Decimal(1 - stamp_fill_ratio(stamp))
                 label = stamp.get("label", "N/A")
                 ttl_days = round(stamp['batchTTL'] / 86400, 2)
                 print(f"{i+1}) Label: {label} | TTL: {ttl_days} days | Remaining: {round(remaining_mb,2)} MB")
@@ -56,9 +91,10 @@ def main():
             depth = int(stamp['depth'])
             mutable = not stamp.get("immutable", True)
 
-            if batch_id in local_feeds:
+            saved_files = get_batch_feeds(batch_id)
+            if saved_files:
                 print("\n📚 Saved Files:")
-                for name in local_feeds[batch_id]:
+                for name in saved_files:
                     print(f"- {name}")
 
             use_feed = input("Do you want to update an existing file? (yes/no): ").strip().lower() == 'yes'
@@ -98,7 +134,15 @@ def main():
 
                 if depth < 31:
                     new_depth = depth + 1
-                    price_per_block = get_price_per_block()
+                    if not encrypt:
+                        # Size the dilution from the file's real chunks and the batch's current fill
+                        from capacity import plan_depth_for_file  # numpy is only imported when planning
+                        planned_depth = plan_depth_for_file(file_path, batch_id)["depth"]
+                        if planned_depth is None:
+                            print("⚠️ File does not fit this batch even at maximum depth (31).")
+                            return
+                        new_depth = max(new_depth, planned_depth)
+                    price_per_block = get_cached_price_per_block()
                     _, add_plur, add_xbzz = calculate_required_plur(new_depth, price_per_block)
                     print(f"\n💸 Cost to increase capacity: {add_xbzz:.6f} xBZZ")
 
@@ -134,10 +178,16 @@ def main():
         print("❌ File does not exist.")
         return
 
+    encrypt = input("Should the file be encrypted? (yes/no): ").strip().lower() == 'yes'
+
     file_size = os.path.getsize(file_path)
     file_mb = Decimal(file_size) / (1024 ** 2)
-    depth = calculate_required_depth(file_size)
-    price = get_price_per_block()
+    if encrypt:
+        # Encrypted chunk addresses are random, so fall back to the utilisation table
+        depth = calculate_required_depth(file_size)
+    else:
+        from capacity import plan_depth_for_file  # numpy is only imported when planning
+        depth = plan_depth_for_file(file_path)["depth"] or 31
     amount_per_chunk, plur_cost, xbzz_cost = calculate_required_plur(depth, price)
 
     print(f"\n📄 File size: {round(file_mb,2)} MB")
@@ -156,7 +206,6 @@ def main():
         return
 
     file_name = input("Enter a name for this file: ").strip()
-    encrypt = input("Should the file be encrypted? (yes/no): ").strip().lower() == 'yes'
     immutable = not mutable or input("Should the file be immutable? (yes/no): ").strip().lower() != 'no'
 
     wait_for_stamp_usable(batch_id)
@@ -178,4 +227,39 @@ def main():
             print("⚠️ Be sure to note your file name and Swarm hash.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Upload files to Swarm through a Bee node.")
+    parser.add_argument("--job", help="Run a JSON job spec unattended (resumes from its journal)")
+    parser.add_argument("--collection", metavar="DIR", help="Upload a directory as a collection (needs --batch)")
+    parser.add_argument("--stream", metavar="FILE", help="Upload a large file as chunks over the websocket stream (needs --batch)")
+    parser.add_argument("--sync", metavar="DIR", help="Upload only the files in DIR changed since its last sync (needs --batch)")
+    parser.add_argument("--watch", action="store_true", help="Keep syncing --sync DIR as it changes")
+    parser.add_argument("--batch", help="Postage batch ID for --collection, --stream or --sync")
+    parser.add_argument("--index", help="Index document for --collection, e.g. index.html")
+    parser.add_argument("--error", help="Error document for --collection, e.g. 404.html")
+    parser.add_argument("--encrypt", action="store_true", help="Encrypt the --collection or --sync upload")
+    args = parser.parse_args()
+
+    start_metrics_export()
+    if args.job:
+        from pipeline import run_job  # The CLI modes below import their modules only when used
+        run_job(args.job)
+    elif args.collection:
+        if not args.batch:
+            parser.error("--collection needs --batch")
+        from collection import upload_directory
+        upload_directory(args.collection, args.batch, args.encrypt, args.index, args.error)
+    elif args.stream:
+        if not args.batch:
+            parser.error("--stream needs --batch")
+        from chunk_stream import upload_file_streamed  # aiohttp is only imported when streaming
+        upload_file_streamed(args.stream, args.batch)
+    elif args.sync:
+        if not args.batch:
+            parser.error("--sync needs --batch")
+        from sync import sync_directory, watch
+        if args.watch:
+            watch(args.sync, args.batch, encrypt=args.encrypt)
+        else:
+            sync_directory(args.sync, args.batch, args.encrypt)
+    else:
+        main()
@@ -0,0 +1,214 @@
+# metrics.py
+
+import os
+import json
+import time
+import atexit
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from config import METRICS_FILE, METRICS_PORT, METRICS_TRACE_FILE, METRICS_LATENCY_BUCKETS
+
+
+def endpoint_of(path):
+    """First path segment of a Bee API path, e.g. "/stamps/abc/buckets?x=1" -> "stamps"."""
+    return path.lstrip("/").split("?", 1)[0].split("/", 1)[0]
+
+
+def body_size(data):
+    """Bytes in a request body, or None if it cannot be known without reading it."""
+    if data is None:
+        return 0
+    if isinstance(data, (bytes, bytearray, memoryview, str)):
+        return len(data)
+    if hasattr(data, "fileno"):
+        try:
+            return os.fstat(data.fileno()).st_size - data.tell()
+        except (OSError, ValueError):
+            return None
+    try:
+        return len(data)
+    except TypeError:
+        return None
+
+
+def _labels(**labels):
+    return ",".join(f'{k}="{v}"' for k, v in labels.items())
+
+
+class _Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + ("+Inf",), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class Metrics:
+    """
+    In-process counters and histograms for Bee calls, rendered as Prometheus text.
+
+    Tracked per endpoint (first path segment): request latency, status codes (or
+    exception names for transport failures), bytes sent and received, and retries.
+    Stamp and tag waits are tracked as wait-time histograms by kind and outcome.
+    With a trace path every request is also appended to a JSON-lines log.
+    """
+
+    def __init__(self, buckets=METRICS_LATENCY_BUCKETS, trace_path=METRICS_TRACE_FILE):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._latency = {}     # (method, endpoint) -> _Histogram
+        self._status = {}      # (method, endpoint, status) -> count
+        self._sent = {}        # endpoint -> bytes
+        self._received = {}    # endpoint -> bytes
+        self._retries = {}     # endpoint -> count
+        self._waits = {}       # (kind, outcome) -> _Histogram
+        self._trace = open(trace_path, "a") if trace_path else None
+
+    def observe_request(self, method, path, status, seconds, sent=0, received=0):
+        """Records one finished request. `status` is the HTTP code or an exception name."""
+        endpoint = endpoint_of(path)
+        with self._lock:
+            key = (method, endpoint)
+            if key not in self._latency:
+                self._latency[key] = _Histogram(self.buckets)
+            self._latency[key].observe(seconds)
+            status_key = (method, endpoint, str(status))
+            self._status[status_key] = self._status.get(status_key, 0) + 1
+            self._sent[endpoint] = self._sent.get(endpoint, 0) + (sent or 0)
+            self._received[endpoint] = self._received.get(endpoint, 0) + (received or 0)
+            if self._trace:
+                event = {"ts": time.time(), "method": method, "path": path.split("?", 1)[0],
+                         "status": status, "seconds": round(seconds, 6), "sent": sent, "received": received}
+                self._trace.write(json.dumps(event) + "\n")
+                self._trace.flush()
+
+    def count_retry(self, path):
+        endpoint = endpoint_of(path)
+        with self._lock:
+            self._retries[endpoint] = self._retries.get(endpoint, 0) + 1
+
+    def observe_wait(self, kind, seconds, outcome):
+        """Records time spent blocked on a stamp or tag (`outcome`: "ok", "timeout" or an exception type)."""
+        with self._lock:
+            key = (kind, outcome)
+            if key not in self._waits:
+                self._waits[key] = _Histogram(self.buckets + (600, 1800, 3600))
+            self._waits[key].observe(seconds)
+
+    @contextmanager
+    def waiting(self, kind):
+        """
+        Times a wait. The block sets `outcome["ok"] = False` if it gave up, or
+        `outcome["error"]` to the exception type's name if it failed:
+
+            with get_metrics().waiting("stamp") as outcome:
+                outcome["ok"] = watcher.wait_until_usable(batch_id) is not None
+        """
+        outcome = {"ok": True}
+        start = time.monotonic()
+        try:
+            yield outcome
+        finally:
+            result = outcome.get("error") or ("ok" if outcome["ok"] else "timeout")
+            self.observe_wait(kind, time.monotonic() - start, result)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                "# HELP bee_request_duration_seconds Latency of Bee API requests.",
+                "# TYPE bee_request_duration_seconds histogram",
+            ]
+            for (method, endpoint), histogram in sorted(self._latency.items()):
+                lines += histogram.render("bee_request_duration_seconds", _labels(method=method, endpoint=endpoint))
+            lines += ["# HELP bee_requests_total Bee API requests by status.", "# TYPE bee_requests_total counter"]
+            for (method, endpoint, status), count in sorted(self._status.items()):
+                lines.append(f"bee_requests_total{{{_labels(method=method, endpoint=endpoint, status=status)}}} {count}")
+            for name, help_text, values in (
+                ("bee_request_bytes_sent_total", "Request body bytes sent to Bee.", self._sent),
+                ("bee_response_bytes_total", "Response body bytes received from Bee.", self._received),
+                ("bee_request_retries_total", "Bee API requests retried.", self._retries),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for endpoint, value in sorted(values.items()):
+                    lines.append(f"{name}{{{_labels(endpoint=endpoint)}}} {value}")
+            lines += [
+                "# HELP swarm_wait_seconds Time spent waiting on stamps and tags.",
+                "# TYPE swarm_wait_seconds histogram",
+            ]
+            for (kind, outcome), histogram in sorted(self._waits.items()):
+                lines += histogram.render("swarm_wait_seconds", _labels(kind=kind, outcome=outcome))
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Writes render() to a file atomically (for node_exporter's textfile collector)."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="0.0.0.0"):
+        """Serves render() at http://host:port/metrics from a daemon thread. Returns the server."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        return server
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Return the process-wide Metrics."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
+
+
+def start_metrics_export(path=METRICS_FILE, port=METRICS_PORT):
+    """Starts the configured exports: a /metrics server and/or a file written at exit."""
+    metrics = get_metrics()
+    if port:
+        metrics.serve(port)
+        print(f"📈 Metrics at http://localhost:{port}/metrics")
+    if path:
+        atexit.register(metrics.write, path)
+    return metrics
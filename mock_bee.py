@@ -0,0 +1,455 @@
+# mock_bee.py
+
+import re
+import json
+import base64
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+READ_BLOCK = 64 * 1024
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"  # RFC 6455 handshake constant
+
+
+def _span_payload_address(body):
+    """Chunk address for a /chunks body (span + payload), or a sha256 stand-in without eth_hash."""
+    try:
+        from chunker import chunk_address
+        return chunk_address(int.from_bytes(body[:8], "little"), body[8:]).hex()
+    except ImportError:
+        return hashlib.sha256(body).hexdigest()
+
+
+def _feed_topic(name):
+    """Feed topic for a feed name (keccak256, as bee_api.feed_topic), or a sha256 stand-in without eth_hash."""
+    try:
+        from eth_hash.auto import keccak
+        return keccak(name.encode()).hex()
+    except ImportError:
+        return hashlib.sha256(name.encode()).hexdigest()
+
+
+class MockBee:
+    """
+    Local stand-in for a Bee node's HTTP API, for benchmarks and offline runs.
+
+    Emulates /health, /wallet, /addresses, /chainstate, /stamps (list, buy, dilute, top-up,
+    buckets), /tags, uploads and downloads on /bzz and /bytes, sequence feed lookups on
+    /feeds, /chunks (and the /chunks/stream websocket) and /stewardship. Behaviour is tunable:
+
+        latency             Seconds added before every response.
+        throughput          Request body bytes per second (None = unlimited).
+        stamp_usable_delay  Seconds before a bought batch is usable or a dilution lands.
+        sync_delay          Seconds for an upload's tag to go from split to fully synced.
+        fail_rate           Probability that a request to fail_endpoints returns fail_status.
+
+    Every request is counted per "METHOD endpoint" in stats().
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, throughput=None, stamp_usable_delay=0.0,
+                 sync_delay=0.0, fail_rate=0.0, fail_status=500, fail_endpoints=("bzz", "bytes", "chunks"),
+                 price_per_block=24000, wallet_balance=10 ** 18, seed=None):
+        self.latency = latency
+        self.throughput = throughput
+        self.stamp_usable_delay = stamp_usable_delay
+        self.sync_delay = sync_delay
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.fail_endpoints = set(fail_endpoints)
+        self.price_per_block = price_per_block
+        self.wallet_balance = wallet_balance
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stamps = {}        # batch ID -> stamp record (plus private "_ready_at")
+        self._tags = {}          # uid -> {"split", "uploaded_at"}
+        self._references = set()
+        self._content = {}       # reference -> uploaded body, for /bzz and /bytes downloads
+        self._feeds = {}         # feed topic -> (latest sequence index, reference)
+        self.owner = f"{self._random.getrandbits(160):040x}"  # The node's Ethereum address, feed owner
+        self._next_tag = 1
+        self._counts = Counter()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-bee", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        """Serves on the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def configure(self, **settings):
+        """Changes behaviour settings (latency, throughput, ...) of a running server."""
+        for key, value in settings.items():
+            if not hasattr(self, key) or key.startswith("_"):
+                raise AttributeError(f"Unknown mock setting: {key}")
+            setattr(self, key, set(value) if key == "fail_endpoints" else value)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def reset_stats(self):
+        with self._lock:
+            self._counts.clear()
+
+    def add_stamp(self, depth=20, ttl=7 * 86400, usable=True, immutable=False, utilization=0, label="mock"):
+        """Adds a batch directly (no purchase delay). Returns its batch ID."""
+        with self._lock:
+            return self._new_stamp(depth, ttl, usable, immutable, utilization, label)
+
+    def _new_stamp(self, depth, ttl, usable, immutable=False, utilization=0, label="mock"):
+        batch_id = hashlib.sha256(f"{time.time_ns()}-{self._random.random()}".encode()).hexdigest()
+        self._stamps[batch_id] = {
+            "batchID": batch_id,
+            "depth": depth,
+            "bucketDepth": 16,
+            "amount": str(self.price_per_block * ttl // 5),
+            "label": label,
+            "utilization": utilization,
+            "usable": usable,
+            "immutable": immutable,
+            "batchTTL": ttl,
+            "_ready_at": 0.0,
+            "_pending_depth": None,
+        }
+        return batch_id
+
+    # State transitions -------------------------------------------------------
+
+    def _refresh_stamps(self):
+        now = time.monotonic()
+        for stamp in self._stamps.values():
+            if now >= stamp["_ready_at"]:
+                stamp["usable"] = True
+                if stamp["_pending_depth"] is not None:
+                    stamp["batchTTL"] >>= stamp["_pending_depth"] - stamp["depth"]
+                    stamp["depth"] = stamp["_pending_depth"]
+                    stamp["_pending_depth"] = None
+
+    def _public_stamp(self, stamp):
+        return {k: v for k, v in stamp.items() if not k.startswith("_")}
+
+    def _tag_record(self, uid):
+        tag = self._tags[uid]
+        split = tag["split"]
+        synced = 0
+        if tag["uploaded_at"] is not None:
+            elapsed = time.monotonic() - tag["uploaded_at"]
+            done = 1.0 if self.sync_delay <= 0 else min(1.0, elapsed / self.sync_delay)
+            synced = int(split * done)
+        return {"uid": uid, "split": split, "seen": 0, "stored": split, "sent": synced, "synced": synced}
+
+    # HTTP --------------------------------------------------------------------
+
+    def _handler_class(self):
+        bee = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+            def log_message(self, *args):
+                pass
+
+            def _read_body(self):
+                """Reads a Content-Length or chunked body, throttled to bee.throughput."""
+                parts = []
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    while True:
+                        size = int(self.rfile.readline().split(b";")[0], 16)
+                        if size == 0:
+                            self.rfile.readline()
+                            break
+                        parts.append(self._read_exact(size))
+                        self.rfile.readline()
+                else:
+                    parts.append(self._read_exact(int(self.headers.get("Content-Length") or 0)))
+                return b"".join(parts)
+
+            def _read_exact(self, length):
+                data = bytearray()
+                while len(data) < length:
+                    block = self.rfile.read(min(READ_BLOCK, length - len(data)))
+                    if not block:
+                        break
+                    data += block
+                    if bee.throughput:
+                        time.sleep(len(block) / bee.throughput)
+                return bytes(data)
+
+            def _send(self, status, payload=None, headers=None):
+                if isinstance(payload, bytes):
+                    body, content_type = payload, "application/octet-stream"
+                else:
+                    body, content_type = json.dumps(payload if payload is not None else {}).encode(), "application/json"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self, method):
+                parts = urlsplit(self.path)
+                segments = [s for s in parts.path.split("/") if s]
+                endpoint = segments[0] if segments else ""
+                body = self._read_body() if method in ("POST", "PATCH", "PUT") else b""
+                with bee._lock:
+                    bee._counts[f"{method} {endpoint}"] += 1
+                if bee.latency:
+                    time.sleep(bee.latency)
+                if endpoint in bee.fail_endpoints and bee.fail_rate and bee._random.random() < bee.fail_rate:
+                    return self._send(bee.fail_status, {"message": "injected failure", "code": bee.fail_status})
+                self._send(*bee._route(method, segments, parts.query, self.headers, body))
+
+            def _ws_send(self, opcode, data=b""):
+                length = len(data)
+                if length < 126:
+                    header = bytes([0x80 | opcode, length])
+                elif length < 65536:
+                    header = bytes([0x80 | opcode, 126]) + length.to_bytes(2, "big")
+                else:
+                    header = bytes([0x80 | opcode, 127]) + length.to_bytes(8, "big")
+                self.wfile.write(header + data)
+
+            def _ws_receive(self):
+                """Next client frame as (opcode, payload); opcode None when the connection ends."""
+                head = self.rfile.read(2)
+                if len(head) < 2:
+                    return None, b""
+                opcode, length = head[0] & 0x0F, head[1] & 0x7F
+                if length == 126:
+                    length = int.from_bytes(self.rfile.read(2), "big")
+                elif length == 127:
+                    length = int.from_bytes(self.rfile.read(8), "big")
+                mask = self.rfile.read(4) if head[1] & 0x80 else None
+                data = self._read_exact(length)
+                if mask and data:
+                    key = (mask * (length // 4 + 1))[:length]
+                    data = (int.from_bytes(data, "little") ^ int.from_bytes(key, "little")).to_bytes(length, "little")
+                return opcode, data
+
+            def _stream_chunks(self):
+                """/chunks/stream: one binary message per chunk, each acknowledged with an empty one."""
+                with bee._lock:
+                    bee._counts["GET chunks"] += 1
+                    status, error = bee._check_batch(self.headers.get("Swarm-Postage-Batch-Id", ""))
+                if error:
+                    return self._send(status, error)
+                if bee.latency:
+                    time.sleep(bee.latency)
+                key = self.headers.get("Sec-WebSocket-Key", "")
+                self.send_response(101)
+                self.send_header("Upgrade", "websocket")
+                self.send_header("Connection", "Upgrade")
+                self.send_header("Sec-WebSocket-Accept",
+                                 base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode())
+                self.end_headers()
+                self.close_connection = True
+                tag_uid = self.headers.get("Swarm-Tag")
+                while True:
+                    opcode, data = self._ws_receive()
+                    if opcode is None or opcode == 0x8:
+                        self._ws_send(0x8, (1000).to_bytes(2, "big"))
+                        return
+                    if opcode == 0x9:
+                        self._ws_send(0xA, data)
+                        continue
+                    if "chunks" in bee.fail_endpoints and bee.fail_rate and bee._random.random() < bee.fail_rate:
+                        self._ws_send(0x8, (1011).to_bytes(2, "big") + b"injected failure")
+                        return
+                    bee._store_chunk(data, tag_uid)
+                    self._ws_send(0x2)
+
+            def do_GET(self):
+                if self.path.startswith("/chunks/stream") and self.headers.get("Upgrade", "").lower() == "websocket":
+                    return self._stream_chunks()
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PATCH(self):
+                self._handle("PATCH")
+
+        return Handler
+
+    def _route(self, method, segments, query, headers, body):
+        endpoint = segments[0] if segments else ""
+        with self._lock:
+            if method == "GET" and endpoint == "health":
+                return 200, {"status": "ok", "version": "mock"}
+            if method == "GET" and endpoint == "wallet":
+                return 200, {"bzzBalance": str(self.wallet_balance)}
+            if method == "GET" and endpoint == "addresses":
+                return 200, {"overlay": "0" * 64, "ethereum": "0x" + self.owner}
+            if method == "GET" and endpoint == "feeds" and len(segments) == 3:
+                latest = self._feeds.get(segments[2]) if segments[1].lower() == self.owner else None
+                if latest is None:
+                    return 404, {"message": "feed not found"}
+                index, reference = latest
+                return 200, {"reference": reference}, {"Swarm-Feed-Index": f"{index:016x}",
+                                                       "Swarm-Feed-Index-Next": f"{index + 1:016x}"}
+            if method == "GET" and endpoint == "chainstate":
+                return 200, {"currentPrice": str(self.price_per_block), "block": int(time.time() / 5)}
+            if endpoint == "stamps":
+                return self._route_stamps(method, segments)
+            if endpoint == "tags":
+                if method == "POST":
+                    uid = self._next_tag
+                    self._next_tag += 1
+                    self._tags[uid] = {"split": 0, "uploaded_at": None}
+                    return 201, {"uid": uid}
+                if method == "GET" and len(segments) == 2 and int(segments[1]) in self._tags:
+                    return 200, self._tag_record(int(segments[1]))
+                return 404, {"message": "tag not found"}
+            if method == "POST" and endpoint in ("bzz", "bytes", "chunks"):
+                batch_id = headers.get("Swarm-Postage-Batch-Id", "")
+                status, error = self._check_batch(batch_id)
+                if error:
+                    return status, error
+                if endpoint == "chunks":
+                    reference = _span_payload_address(body)
+                else:
+                    reference = hashlib.sha256(body).hexdigest()
+                self._references.add(reference)
+                if endpoint != "chunks":
+                    self._content[reference] = body
+                tag_uid = headers.get("Swarm-Tag") or parse_qs(query).get("tag", [None])[0]
+                if tag_uid and int(tag_uid) in self._tags:
+                    tag = self._tags[int(tag_uid)]
+                    tag["split"] += max(1, -(-len(body) // 4096))
+                    tag["uploaded_at"] = time.monotonic()
+                feed_name = headers.get("Swarm-Feed-Name")
+                if endpoint == "bzz" and feed_name:
+                    # Sequence feeds: honour a client-supplied index, else look up the next one
+                    topic = _feed_topic(feed_name)
+                    index = headers.get("Swarm-Feed-Index")
+                    index = int(index) if index is not None else self._feeds.get(topic, (-1, None))[0] + 1
+                    self._feeds[topic] = (index, reference)
+                return 201, {"reference": reference}
+            if method == "GET" and endpoint in ("bzz", "bytes") and len(segments) >= 2:
+                return self._download(segments[1], headers.get("Range"))
+            if method == "GET" and endpoint == "stewardship" and len(segments) == 2:
+                return 200, {"isRetrievable": segments[1] in self._references}
+        return 404, {"message": "not found"}
+
+    def _check_batch(self, batch_id):
+        """(status, error payload) if uploads cannot use this batch, else (None, None). Call with the lock held."""
+        self._refresh_stamps()
+        stamp = self._stamps.get(batch_id)
+        if stamp is None or not stamp["usable"]:
+            return 400 if stamp is None else 422, {"message": "batch not usable"}
+        return None, None
+
+    def _store_chunk(self, body, tag_uid=None):
+        """Stores one streamed chunk (span + payload) and counts it on its tag."""
+        reference = _span_payload_address(body)
+        with self._lock:
+            self._references.add(reference)
+            if tag_uid and int(tag_uid) in self._tags:
+                tag = self._tags[int(tag_uid)]
+                tag["split"] += 1
+                tag["uploaded_at"] = time.monotonic()
+        return reference
+
+    def _download(self, reference, range_header):
+        content = self._content.get(reference)
+        if content is None:
+            return 404, {"message": "not found"}
+        match = re.match(r"bytes=(\d+)-(\d*)$", range_header or "")
+        if not match:
+            return 200, content
+        start = int(match.group(1))
+        end = min(int(match.group(2) or len(content) - 1), len(content) - 1)
+        if start >= len(content):
+            return 416, {"message": "range not satisfiable"}
+        return 206, content[start:end + 1], {"Content-Range": f"bytes {start}-{end}/{len(content)}"}
+
+    def _route_stamps(self, method, segments):
+        self._refresh_stamps()
+        if method == "GET" and len(segments) == 1:
+            return 200, {"stamps": [self._public_stamp(s) for s in self._stamps.values()]}
+        if method == "GET" and len(segments) == 2:
+            stamp = self._stamps.get(segments[1])
+            return (200, self._public_stamp(stamp)) if stamp else (404, {"message": "batch not found"})
+        if method == "GET" and len(segments) == 3 and segments[2] == "buckets":
+            stamp = self._stamps.get(segments[1])
+            if stamp is None:
+                return 404, {"message": "batch not found"}
+            return 200, {"depth": stamp["depth"], "bucketDepth": 16,
+                         "bucketUpperBound": 2 ** (stamp["depth"] - 16),
+                         "buckets": [{"bucketID": i, "collisions": 0} for i in range(2 ** 16)]}
+        if method == "POST" and len(segments) == 3:
+            amount, depth = int(segments[1]), int(segments[2])
+            ttl = amount * 5 // max(1, self.price_per_block)
+            batch_id = self._new_stamp(depth, ttl, usable=False)
+            self._stamps[batch_id]["_ready_at"] = time.monotonic() + self.stamp_usable_delay
+            return 201, {"batchID": batch_id, "txHash": "0x" + hashlib.sha256(batch_id.encode()).hexdigest()}
+        if method == "PATCH" and len(segments) == 4 and segments[1] == "dilute":
+            stamp = self._stamps.get(segments[2])
+            if stamp is None or int(segments[3]) <= stamp["depth"]:
+                return 400, {"message": "invalid dilution"}
+            stamp["_pending_depth"] = int(segments[3])
+            stamp["_ready_at"] = time.monotonic() + self.stamp_usable_delay
+            return 202, {"batchID": stamp["batchID"], "txHash": "0x" + "0" * 64}
+        if method == "PATCH" and len(segments) >= 3 and segments[1] == "topup":
+            stamp = self._stamps.get(segments[2])
+            if stamp is None:
+                return 404, {"message": "batch not found"}
+            amount = int(segments[3]) if len(segments) == 4 else int(stamp["amount"])
+            stamp["amount"] = str(int(stamp["amount"]) + amount)
+            stamp["batchTTL"] += amount * 5 // max(1, self.price_per_block)
+            return 202, {"batchID": stamp["batchID"], "txHash": "0x" + "0" * 64}
+        return 404, {"message": "not found"}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local mock Bee node.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1633)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--throughput", type=float, default=None, help="Upload bytes per second")
+    parser.add_argument("--stamp-usable-delay", type=float, default=0.0)
+    parser.add_argument("--sync-delay", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--fail-status", type=int, default=500)
+    parser.add_argument("--stamps", type=int, default=1, help="Usable batches to start with")
+    args = parser.parse_args()
+
+    bee = MockBee(args.host, args.port, args.latency, args.throughput, args.stamp_usable_delay,
+                  args.sync_delay, args.fail_rate, args.fail_status)
+    for _ in range(args.stamps):
+        print(f"📦 Batch {bee.add_stamp()}")
+    print(f"✅ Mock Bee listening on {bee.url} (set BEE_API_URL={bee.url})")
+    bee.serve_forever()
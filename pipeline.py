@@ -0,0 +1,280 @@
+# pipeline.py
+
+import os
+import json
+import time
+import threading
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from bee_api import wait_for_stamp_usable
+from capacity_manager import CapacityManager
+from config import PLUR_PER_xBZZ, STORAGE_TIME_SECONDS, UPLOAD_WORKERS, VERIFY_WORKERS
+from local_store import save_local_feeds
+from scheduler import check_funds, plan_uploads, prepare_dilution, prepare_purchase, print_plan, wait_for_dilution
+from upload_engine import collect_files, upload_many
+from verify import verify_references
+
+
+class Journal:
+    """
+    Append-only JSON-lines checkpoint journal.
+
+    Every finished unit of work is appended as {"stage", "ts", ...}. A resumed run
+    replays the journal to skip work already done.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.events = []
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        self.events.append(json.loads(line))
+                    except ValueError:
+                        continue  # A torn line from a killed run
+        self._file = open(path, "a")
+        if self._file.tell() > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")  # Terminate a torn line before appending
+
+    def append(self, stage, **data):
+        event = {"stage": stage, "ts": time.time(), **data}
+        with self._lock:
+            self.events.append(event)
+            self._file.write(json.dumps(event) + "\n")
+            self._file.flush()
+
+    def sync(self):
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def of(self, stage):
+        return [e for e in self.events if e["stage"] == stage]
+
+    def close(self):
+        self.sync()
+        self._file.close()
+
+
+def load_job(job_path):
+    with open(job_path, "r") as f:
+        job = json.load(f)
+    if not job.get("sources"):
+        raise ValueError("Job spec needs a non-empty 'sources' list.")
+    job.setdefault("batch", {})
+    job["batch"].setdefault("policy", "auto")
+    if job["batch"]["policy"] == "existing" and not job["batch"].get("batch_id"):
+        raise ValueError("Batch policy 'existing' needs a 'batch_id'.")
+    return job
+
+
+def _feed_names(job, files):
+    feeds = job.get("feeds") or {}
+    if feeds == "basename":
+        return {path: os.path.basename(path) for path in files}
+    return {path: feeds[path] for path in files if path in feeds}
+
+
+def _make_plan(job, files, feeds):
+    batch = job["batch"]
+    days = 86400
+    min_ttl = int(batch.get("min_ttl_days", STORAGE_TIME_SECONDS / days) * days)
+    purchase_ttl = int(batch.get("ttl_days", STORAGE_TIME_SECONDS / days) * days)
+    if batch["policy"] == "existing":
+        return {"assignments": [{"batch_id": batch["batch_id"], "files": files}],
+                "dilutions": [], "purchases": [], "unplaced": []}
+    stamps = [] if batch["policy"] == "new" else None
+    return plan_uploads(files, stamps, min_ttl=min_ttl, encrypt=job.get("encrypt", False),
+                        require_mutable=bool(feeds), purchase_ttl=purchase_ttl)
+
+
+def _stage_stamp(job, plan, journal):
+    """
+    Prepares every target batch concurrently. Returns {plan key: batch ID}.
+
+    A purchase or dilution is journaled as "stamp_sent" as soon as Bee accepts it, and
+    as "stamp" once the batch is ready. A run resumed in between only waits for it.
+    Nothing is bought unless the wallet covers every purchase still to send; otherwise
+    their files are journaled as "upload_failed".
+    """
+    ready = {e["key"]: e["batch_id"] for e in journal.of("stamp")}
+    sent = {e["key"]: e["batch_id"] for e in journal.of("stamp_sent")}
+    batch = job["batch"]
+    dilution_for = {d["batch_id"]: d for d in plan["dilutions"]}
+
+    def journal_sent(key):
+        def on_sent(batch_id):
+            journal.append("stamp_sent", key=key, batch_id=batch_id)
+            journal.sync()  # Before the wait, so a killed run never sends it twice
+        return on_sent
+
+    tasks = {}
+    for a in plan["assignments"]:
+        key = a["batch_id"]
+        if key in ready:
+            continue
+        if key in dilution_for:
+            d = dilution_for[key]
+            if key in sent:
+                tasks[key] = lambda b=sent[key], d=d: wait_for_dilution(b, d["to_depth"])
+            else:
+                tasks[key] = lambda d=d, key=key: prepare_dilution(d, journal_sent(key))
+        else:
+            ready[key] = key
+    to_buy = [p for p in plan["purchases"] if p["key"] not in ready and p["key"] not in sent]
+    funded = check_funds({"purchases": to_buy})
+    for p in plan["purchases"]:
+        key = p["key"]
+        if key in ready:
+            continue
+        if key in sent:
+            tasks[key] = lambda b=sent[key]: b if wait_for_stamp_usable(b) else None
+        elif not funded:
+            for path in p["files"]:
+                journal.append("upload_failed", file=path, error="Not enough xBZZ for a new batch")
+        else:
+            label = f"{batch.get('label', 'Job')}-{key}"
+            tasks[key] = lambda p=p, label=label, key=key: prepare_purchase(
+                p, label, batch.get("mutable", False), journal_sent(key))
+
+    if tasks:
+        print(f"🛠️ Preparing {len(tasks)} batches...")
+        with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+            futures = {key: pool.submit(task) for key, task in tasks.items()}
+            for key, future in futures.items():
+                try:
+                    batch_id = future.result()
+                except Exception as e:
+                    print(f"❌ Error while preparing batch {key}: {e}")
+                    batch_id = None
+                if batch_id:
+                    ready[key] = batch_id
+                    journal.append("stamp", key=key, batch_id=batch_id)
+                else:
+                    print(f"❌ Batch {key} could not be prepared; its files are skipped this run.")
+    journal.sync()
+    return ready
+
+
+def _stage_upload(job, plan, ready, feeds, journal):
+    """Uploads every file not already journaled. Returns {file: upload event}."""
+    uploaded = {e["file"]: e for e in journal.of("upload")}
+    targets = [(a["batch_id"], a["files"]) for a in plan["assignments"]]
+    targets += [(p["key"], p["files"]) for p in plan["purchases"]]
+
+    for key, files in targets:
+        batch_id = ready.get(key)
+        pending = [f for f in files if f not in uploaded]
+        if not batch_id or not pending:
+            continue
+
+        def on_result(result, batch_id=batch_id):
+            if result["error"]:
+                journal.append("upload_failed", file=result["file"], error=result["error"])
+                return
+            event = {"file": result["file"], "batch_id": batch_id, "reference": result["reference"],
+                     "bytes": result["bytes"], "codec": result["codec"]}
+            journal.append("upload", **event)
+            uploaded[result["file"]] = event
+
+        upload_many(pending, batch_id, job.get("encrypt", False), feeds,
+                    max_workers=job.get("workers", UPLOAD_WORKERS), on_result=on_result,
+                    compress=job.get("compress"), adaptive=job.get("adaptive", False))
+        journal.sync()
+    return uploaded
+
+
+def _stage_verify(job, uploaded, journal):
+    """Checks retrievability of every upload not yet verified. Returns {file: ok}."""
+    verified = {e["file"]: e["ok"] for e in journal.of("verify") if e["ok"]}
+    pending = [event for path, event in uploaded.items() if path not in verified]
+    if not pending:
+        return verified
+    print(f"🔎 Verifying {len(pending)} uploads...")
+    checks = verify_references([e["reference"] for e in pending], job.get("verify_method", "stewardship"),
+                               max_workers=job.get("verify_workers", VERIFY_WORKERS))
+    for event in pending:
+        check = checks[event["reference"]]
+        verified[event["file"]] = check["ok"]
+        journal.append("verify", file=event["file"], ok=check["ok"])
+        if not check["ok"]:
+            print(f"⚠️ Not retrievable yet: {event['file']} ({event['reference']}) {check['error'] or ''}")
+    journal.sync()
+    return verified
+
+
+def _stage_record(uploaded, feeds, journal):
+    recorded = {path for e in journal.of("record") for path in e["files"]}
+    pending = [(path, event) for path, event in uploaded.items() if path not in recorded]
+    if not pending:
+        return
+    entries = [(e["batch_id"], feeds.get(path, os.path.basename(path)), e["reference"], e.get("codec"))
+               for path, e in pending]
+    if save_local_feeds(entries):
+        journal.append("record", files=[path for path, _ in pending])
+        journal.sync()
+
+
+def run_job(job_path, journal_path=None):
+    """
+    Runs a job spec unattended as plan -> stamp -> upload -> verify -> record.
+
+    Every stage appends to a journal (default: <job>.journal.jsonl). Running the same
+    job again resumes from the journal: the plan is reused, prepared or bought batches
+    are not prepared again, and uploaded files are not re-uploaded.
+
+    Returns:
+        dict: Counts of planned, uploaded, failed, verified and unplaced files.
+    """
+    job = load_job(job_path)
+    journal = Journal(journal_path or os.path.splitext(job_path)[0] + ".journal.jsonl")
+    try:
+        # Plan
+        plans = journal.of("plan")
+        if plans:
+            plan = plans[-1]["plan"]
+            files = plans[-1]["files"]
+            print(f"🔁 Resuming job with {len(files)} files from {journal.path}")
+        else:
+            files = collect_files(job["sources"])
+            plan = _make_plan(job, files, _feed_names(job, files))
+            journal.append("plan", files=files, plan=plan)
+            journal.sync()
+        feeds = _feed_names(job, files)
+        print_plan(plan)
+
+        # Stamp, upload, verify, record
+        ready = _stage_stamp(job, plan, journal)
+        manager = None
+        if job.get("capacity_budget_xbzz"):
+            # Keeps the job's batches ahead of their fill/TTL while files upload
+            budget = int(Decimal(str(job["capacity_budget_xbzz"])) * PLUR_PER_xBZZ)
+            manager = CapacityManager(budget, batch_ids=ready.values()).start()
+        try:
+            uploaded = _stage_upload(job, plan, ready, feeds, journal)
+        finally:
+            if manager:
+                manager.stop()
+        verified = _stage_verify(job, uploaded, journal) if job.get("verify", True) else {}
+        _stage_record(uploaded, feeds, journal)
+
+        summary = {
+            "planned": len(files),
+            "uploaded": len(uploaded),
+            "failed": len(files) - len(uploaded) - len(plan["unplaced"]),
+            "verified": sum(1 for ok in verified.values() if ok),
+            "unplaced": len(plan["unplaced"]),
+        }
+        journal.append("done", **summary)
+        print(f"📦 Job finished: {summary}")
+        return summary
+    finally:
+        journal.close()
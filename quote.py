@@ -0,0 +1,123 @@
+# quote.py
+
+import time
+import bisect
+import threading
+from decimal import Decimal
+from bee_api import get_price_per_block
+from config import BLOCK_TIME_SECONDS, PLUR_PER_xBZZ, CHAINSTATE_CACHE_TTL
+from storage import EFFECTIVE_CAPACITY_MB, MIN_DEPTH, MAX_DEPTH
+
+BLOCK_TIME = int(BLOCK_TIME_SECONDS)
+DEPTHS = list(range(MIN_DEPTH, MAX_DEPTH + 1))
+
+# Sorted effective capacities (bytes) for bisecting a file size to its depth
+_CAPACITY_DEPTHS = sorted(EFFECTIVE_CAPACITY_MB)
+_CAPACITY_BYTES = [int(EFFECTIVE_CAPACITY_MB[d] * 1024 ** 2) for d in _CAPACITY_DEPTHS]
+
+
+class PriceCache:
+    """Caches the /chainstate price per block for `ttl` seconds."""
+
+    def __init__(self, ttl=CHAINSTATE_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._price = 0
+        self._fetched_at = None
+
+    def get(self):
+        with self._lock:
+            fresh = self._fetched_at is not None and time.monotonic() - self._fetched_at < self.ttl
+            if not fresh:
+                price = get_price_per_block() or 0
+                if price:
+                    self._price = price
+                    self._fetched_at = time.monotonic()
+                # On a failed refresh keep serving the last known price
+            return self._price
+
+    def invalidate(self):
+        with self._lock:
+            self._fetched_at = None
+
+
+_price_cache = PriceCache()
+
+
+def get_cached_price_per_block():
+    """Price per block from /chainstate, refreshed at most every CHAINSTATE_CACHE_TTL seconds."""
+    return _price_cache.get()
+
+
+def amount_per_chunk(price_per_block, ttl_seconds):
+    """PLUR per chunk to keep a batch alive for ttl_seconds (integer maths, rounded down)."""
+    return int(price_per_block) * int(ttl_seconds) // BLOCK_TIME
+
+
+def depth_for_size(size_bytes):
+    """Smallest depth whose effective capacity holds size_bytes, or None if none does."""
+    i = bisect.bisect_left(_CAPACITY_BYTES, size_bytes)
+    return _CAPACITY_DEPTHS[i] if i < len(_CAPACITY_DEPTHS) else None
+
+
+def quote_matrix(ttls, sizes=(), depths=DEPTHS, price_per_block=None):
+    """
+    Prices every depth and every file size against every TTL in one call.
+
+    Args:
+        ttls (list): TTLs in seconds.
+        sizes (list): Optional file sizes in bytes; each is mapped to its depth.
+        depths (list): Depths to price (default 17-31).
+        price_per_block (int): Price to use; defaults to the cached /chainstate price.
+    Returns:
+        dict: {
+            "price_per_block": int,
+            "ttls": list, "depths": list, "sizes": list,
+            "amount_per_chunk": [PLUR per chunk for each TTL],
+            "batch_plur": [[PLUR for each depth] for each TTL],
+            "size_depths": [depth for each size, None if too large],
+            "size_plur": [[PLUR for each TTL, None if too large] for each size],
+        }
+    """
+    if price_per_block is None:
+        price_per_block = get_cached_price_per_block()
+    ttls = list(ttls)
+    depths = list(depths)
+    sizes = list(sizes)
+
+    amounts = [amount_per_chunk(price_per_block, ttl) for ttl in ttls]
+    batch_plur = [[amount << depth for depth in depths] for amount in amounts]
+
+    # Per-depth cost columns for every TTL, looked up once per size
+    by_depth = {depth: [amount << depth for amount in amounts] for depth in _CAPACITY_DEPTHS}
+    size_depths = [depth_for_size(size) for size in sizes]
+    none_row = [None] * len(ttls)
+    size_plur = [by_depth[depth] if depth is not None else none_row for depth in size_depths]
+
+    return {
+        "price_per_block": price_per_block,
+        "ttls": ttls,
+        "depths": depths,
+        "sizes": sizes,
+        "amount_per_chunk": amounts,
+        "batch_plur": batch_plur,
+        "size_depths": size_depths,
+        "size_plur": size_plur,
+    }
+
+
+def quote(size_bytes, ttl_seconds, price_per_block=None):
+    """
+    Quotes one upload.
+
+    Returns:
+        dict | None: {"depth", "amount_per_chunk", "plur", "xbzz"} or None if too large.
+    """
+    depth = depth_for_size(size_bytes)
+    if depth is None:
+        return None
+    if price_per_block is None:
+        price_per_block = get_cached_price_per_block()
+    amount = amount_per_chunk(price_per_block, ttl_seconds)
+    plur = amount << depth
+    return {"depth": depth, "amount_per_chunk": amount, "plur": plur, "xbzz": Decimal(plur) / PLUR_PER_xBZZ}
@@ -0,0 +1,265 @@
+# scheduler.py
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from bee_api import get_existing_stamps, get_wallet_balance, wait_for_stamp_usable
+from config import STORAGE_TIME_SECONDS, UPLOAD_WORKERS, PLUR_PER_xBZZ
+from quote import depth_for_size, get_cached_price_per_block, amount_per_chunk
+from stamp_watcher import get_stamp_watcher
+from storage import (
+    MAX_DEPTH,
+    get_effective_capacity_mb,
+    get_remaining_capacity_bytes,
+    purchase_postage_stamp,
+    request_dilution,
+)
+from upload_engine import upload_many
+
+
+def _capacity_bytes(depth):
+    return int(get_effective_capacity_mb(depth) * 1024 ** 2)
+
+
+def _best_fit(files, bins):
+    """
+    Best-fit decreasing: each file (largest first) goes into the bin whose free space
+    it fills most tightly.
+
+    Args:
+        files (list): (path, size) pairs.
+        bins (list): dicts with a mutable "free" byte count and a "files" list.
+    Returns:
+        list: (path, size) pairs that fit nowhere.
+    """
+    leftover = []
+    for path, size in sorted(files, key=lambda f: f[1], reverse=True):
+        fitting = [b for b in bins if b["free"] >= size]
+        if not fitting:
+            leftover.append((path, size))
+            continue
+        target = min(fitting, key=lambda b: b["free"])
+        target["free"] -= size
+        target["files"].append(path)
+    return leftover
+
+
+def plan_uploads(files, stamps=None, min_ttl=STORAGE_TIME_SECONDS, encrypt=False, require_mutable=False,
+                 purchase_ttl=STORAGE_TIME_SECONDS):
+    """
+    Assigns a queue of files to postage batches with the fewest on-chain operations.
+
+    1. Files are packed best-fit-decreasing into the remaining capacity of usable
+       batches whose TTL is at least min_ttl.
+    2. What is left is packed into dilutions of those batches, one batch at a time,
+       choosing the dilution that places the most bytes with the fewest extra depth.
+       A dilution must keep the halved TTL at or above min_ttl.
+    3. Anything still left goes into as few new batches as possible.
+
+    Args:
+        files (list): File paths.
+        stamps (list): Stamp records as returned by /stamps (fetched if None).
+        min_ttl (int): Minimum remaining TTL in seconds for a batch to be used.
+        encrypt (bool): Encrypted uploads are sized at twice their length.
+        require_mutable (bool): Only use mutable batches (needed for feed updates).
+        purchase_ttl (int): TTL in seconds to buy new batches for.
+    Returns:
+        dict: {"assignments": [{"batch_id", "files"}], "dilutions": [{"batch_id",
+            "from_depth", "to_depth", "ttl_after"}], "purchases": [{"key", "depth",
+            "amount_per_chunk", "plur", "files"}], "unplaced": [paths]}
+            Files headed for a purchase are listed under the purchase; its "key" stands
+            in for the batch ID until execute_plan buys it.
+    """
+    if stamps is None:
+        stamps = get_existing_stamps() or []
+    min_ttl = int(min_ttl)
+    factor = 2 if encrypt else 1
+    queue = [(path, os.path.getsize(path) * factor) for path in files]
+
+    bins = []
+    for stamp in stamps:
+        if not stamp.get("usable", False) or int(stamp.get("batchTTL", 0)) < min_ttl:
+            continue
+        if require_mutable and stamp.get("immutable", True):
+            continue
+        depth = int(stamp["depth"])
+        free = get_remaining_capacity_bytes(stamp)
+        bins.append({
+            "batch_id": stamp["batchID"],
+            "depth": depth,
+            "ttl": int(stamp.get("batchTTL", 0)),
+            "free": free,
+            "files": [],
+        })
+
+    # 1. Existing free capacity
+    overflow = _best_fit(queue, bins)
+
+    # 2. Dilutions, one batch at a time
+    dilutions = []
+    diluted = set()
+    while overflow:
+        best = None
+        for b in bins:
+            if b["batch_id"] in diluted:
+                continue
+            for new_depth in range(b["depth"] + 1, MAX_DEPTH + 1):
+                ttl_after = b["ttl"] >> (new_depth - b["depth"])
+                if ttl_after < min_ttl:
+                    break
+                used = _capacity_bytes(b["depth"]) - b["free"]  # Includes files already assigned
+                trial = {"free": _capacity_bytes(new_depth) - used, "files": []}
+                left = _best_fit(overflow, [trial])
+                placed = sum(size for _, size in overflow) - sum(size for _, size in left)
+                if placed and (best is None or placed > best[0]
+                               or (placed == best[0] and new_depth - b["depth"] < best[2])):
+                    best = (placed, b, new_depth - b["depth"], new_depth, ttl_after, trial, left)
+                if not left:
+                    break  # A deeper dilution of this batch cannot place more
+        if best is None:
+            break
+        _, b, _, new_depth, ttl_after, trial, overflow = best
+        diluted.add(b["batch_id"])
+        dilutions.append({"batch_id": b["batch_id"], "from_depth": b["depth"], "to_depth": new_depth,
+                          "ttl_after": ttl_after})
+        b["files"].extend(trial["files"])
+        b["depth"], b["free"], b["ttl"] = new_depth, trial["free"], ttl_after
+
+    # 3. New batches: fill each one up to the largest depth, then size the last one
+    purchases = []
+    unplaced = []
+    price = get_cached_price_per_block() if overflow else 0
+    amount = amount_per_chunk(price, purchase_ttl) if overflow else 0
+    while overflow:
+        total = sum(size for _, size in overflow)
+        depth = depth_for_size(total) or MAX_DEPTH
+        batch = {"free": _capacity_bytes(depth), "files": []}
+        left = _best_fit(overflow, [batch])
+        if not batch["files"]:
+            unplaced.extend(path for path, _ in left)  # Larger than any batch
+            break
+        purchases.append({
+            "key": f"new-{len(purchases) + 1}",
+            "depth": depth,
+            "amount_per_chunk": amount,
+            "plur": amount << depth,
+            "files": batch["files"],
+        })
+        overflow = left
+
+    assignments = [{"batch_id": b["batch_id"], "files": b["files"]} for b in bins if b["files"]]
+    return {"assignments": assignments, "dilutions": dilutions, "purchases": purchases, "unplaced": unplaced}
+
+
+def print_plan(plan):
+    for a in plan["assignments"]:
+        print(f"📦 {a['batch_id'][:12]}… ← {len(a['files'])} files")
+    for d in plan["dilutions"]:
+        print(f"🛠️ Dilute {d['batch_id'][:12]}… depth {d['from_depth']} → {d['to_depth']} "
+              f"(TTL after: {d['ttl_after'] / 86400:.2f} days)")
+    for p in plan["purchases"]:
+        print(f"🆕 New batch depth {p['depth']} ({p['plur']} PLUR) ← {len(p['files'])} files")
+    if plan["unplaced"]:
+        print(f"⚠️ {len(plan['unplaced'])} files are too large for any batch.")
+
+
+def check_funds(plan):
+    """
+    Checks the wallet against the cost of the plan's purchases (dilutions only cost gas).
+
+    Returns:
+        bool: True if there is nothing to buy or the balance covers it.
+    """
+    if not plan["purchases"]:
+        return True
+    cost = Decimal(sum(p["plur"] for p in plan["purchases"])) / PLUR_PER_xBZZ
+    balance = get_wallet_balance()
+    if balance < cost:
+        print(f"❌ Not enough xBZZ for {len(plan['purchases'])} new batches: need {cost:.6f}, have {balance:.6f}.")
+        return False
+    return True
+
+
+def _error_results(files, error):
+    return [{"file": f, "reference": None, "bytes": 0, "codec": None, "chunks_saved": 0, "feed_index": None,
+             "duration": 0.0, "error": error} for f in files]
+
+
+def wait_for_dilution(batch_id, depth):
+    """Waits for a dilution that was already sent to reach its depth. Returns the batch ID or None."""
+    if get_stamp_watcher().wait_until_depth(batch_id, depth) is None:
+        print(f"⚠️ Dilution of {batch_id} did not reach depth {depth}.")
+        return None
+    return batch_id
+
+
+def prepare_dilution(dilution, on_sent=None):
+    """
+    Sends a planned dilution and waits for the new depth. Returns the batch ID or None.
+    on_sent(batch_id) is called as soon as Bee accepts the transaction, before the wait.
+    """
+    result = request_dilution(dilution["batch_id"], dilution["to_depth"])
+    if result is None:
+        return None
+    if on_sent:
+        on_sent(result["batchID"])
+    return wait_for_dilution(result["batchID"], dilution["to_depth"])
+
+
+def prepare_purchase(purchase, label, mutable, on_sent=None):
+    """
+    Buys a planned batch and waits until it is usable. Returns the batch ID or None.
+    on_sent(batch_id) is called as soon as Bee accepts the purchase, before the wait.
+    """
+    batch_id = purchase_postage_stamp(purchase["amount_per_chunk"], purchase["depth"], label, mutable)
+    if not batch_id:
+        return None
+    if on_sent:
+        on_sent(batch_id)
+    return batch_id if wait_for_stamp_usable(batch_id) else None
+
+
+def execute_plan(plan, encrypt=False, topic_names=None, label="ScheduledBatch", mutable=False,
+                 max_workers=UPLOAD_WORKERS):
+    """
+    Runs a plan from plan_uploads.
+
+    Uploads to existing batches start immediately. Dilutions and purchases are sent
+    together and each batch's files are uploaded as soon as that batch is ready, so
+    on-chain waits overlap instead of queuing. Nothing is bought unless the wallet
+    covers every planned purchase (see check_funds).
+
+    Returns:
+        list: Upload results (see upload_engine.upload_many), plus an error result for
+            every file whose batch could not be prepared.
+    """
+    results = []
+    dilution_for = {d["batch_id"]: d for d in plan["dilutions"]}
+    jobs = []
+    for a in plan["assignments"]:
+        dilution = dilution_for.get(a["batch_id"])
+        prepare = (lambda d=dilution: prepare_dilution(d)) if dilution else (lambda b=a["batch_id"]: b)
+        jobs.append((prepare, a["files"]))
+    if check_funds(plan):
+        for p in plan["purchases"]:
+            jobs.append((lambda p=p: prepare_purchase(p, f"{label}-{p['key']}", mutable), p["files"]))
+    else:
+        for p in plan["purchases"]:
+            results.extend(_error_results(p["files"], "Not enough xBZZ for a new batch"))
+
+    def run(job):
+        prepare, files = job
+        try:
+            batch_id = prepare()
+        except Exception as e:
+            print(f"❌ Batch could not be prepared: {e}")
+            batch_id = None
+        if not batch_id:
+            return _error_results(files, "Batch could not be prepared")
+        return upload_many(files, batch_id, encrypt, topic_names, max_workers=max_workers)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(jobs))) as pool:
+        for batch_results in pool.map(run, jobs):
+            results.extend(batch_results)
+    results.extend(_error_results(plan["unplaced"], "Too large for any batch"))
+    return results
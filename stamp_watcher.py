@@ -0,0 +1,119 @@
+# stamp_watcher.py
+
+import time
+import threading
+from bee_client import get_bee_client
+from metrics import get_metrics
+from config import WAIT_FOR_BATCH_TIMEOUT, WAIT_FOR_BATCH_RETRY, STAMP_POLL_MIN_INTERVAL, STAMP_POLL_BACKOFF
+
+
+class StampWatcher:
+    """
+    Shared background poller for postage stamp state.
+
+    One thread fetches the whole /stamps list per poll and wakes every waiter, so N
+    pending batches cost one request stream instead of N. Polling starts every
+    STAMP_POLL_MIN_INTERVAL seconds and backs off by STAMP_POLL_BACKOFF up to
+    WAIT_FOR_BATCH_RETRY. A new waiter resets it to the fast interval, and the thread
+    exits when nobody is waiting.
+    """
+
+    def __init__(self, min_interval=STAMP_POLL_MIN_INTERVAL, max_interval=WAIT_FOR_BATCH_RETRY,
+                 backoff=STAMP_POLL_BACKOFF):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self._cond = threading.Condition()
+        self._stamps = {}       # batch ID -> latest stamp record
+        self._polls = 0         # Completed polls, so waiters only trust fresh snapshots
+        self._waiters = 0
+        self._interval = min_interval
+        self._wake = False
+        self._thread = None
+
+    def _poll(self):
+        response = get_bee_client().get("/stamps")
+        if response.status_code != 200:
+            print(f"⚠️ Unexpected status while checking stamps: {response.status_code}")
+            return
+        stamps = {s["batchID"]: s for s in response.json().get("stamps", [])}
+        with self._cond:
+            self._stamps = stamps
+            self._polls += 1
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._waiters:
+                    self._thread = None
+                    return
+                self._wake = False
+            try:
+                self._poll()
+            except Exception as e:
+                print(f"❌ Connection error while checking stamps: {e}")
+            with self._cond:
+                self._cond.wait_for(lambda: self._wake, timeout=self._interval)
+                if not self._wake:
+                    self._interval = min(self._interval * self.backoff, self.max_interval)
+
+    def get_stamp(self, batch_id):
+        """Latest known record for a batch, or None if it has not been seen."""
+        with self._cond:
+            return self._stamps.get(batch_id)
+
+    def wait_for(self, batch_id, predicate, timeout=WAIT_FOR_BATCH_TIMEOUT):
+        """
+        Blocks until the batch's stamp record satisfies `predicate`.
+
+        Returns:
+            dict | None: The matching stamp record, or None on timeout.
+        """
+        with get_metrics().waiting("stamp") as outcome:
+            stamp = self._wait_for(batch_id, predicate, timeout)
+            outcome["ok"] = stamp is not None
+        return stamp
+
+    def _wait_for(self, batch_id, predicate, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._waiters += 1
+            self._interval = self.min_interval
+            self._wake = True
+            registered_at = self._polls
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stamp-watcher", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+            try:
+                while True:
+                    stamp = self._stamps.get(batch_id)
+                    if self._polls > registered_at and stamp is not None and predicate(stamp):
+                        return stamp
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters -= 1
+
+    def wait_until_usable(self, batch_id, timeout=WAIT_FOR_BATCH_TIMEOUT):
+        return self.wait_for(batch_id, lambda s: s.get("usable", False), timeout)
+
+    def wait_until_depth(self, batch_id, depth, timeout=WAIT_FOR_BATCH_TIMEOUT):
+        return self.wait_for(batch_id, lambda s: int(s.get("depth", 0)) >= depth, timeout)
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_stamp_watcher():
+    """Return the process-wide StampWatcher."""
+    global _watcher
+    if _watcher is None:
+        with _watcher_lock:
+            if _watcher is None:
+                _watcher = StampWatcher()
+    return _watcher
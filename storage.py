@@ -1,12 +1,13 @@
 # storage.py
 
 import os
-import time
 import mimetypes
-import requests
 from decimal import Decimal
-from bee_api import get_price_per_block, get_tag_progress, create_tag, wait_for_stamp_usable
-from config import BEE_API_URL, CHUNK_SIZE_BYTES, BLOCK_TIME_SECONDS, STORAGE_TIME_SECONDS, DILUTION_TOPUP_TTL, PLUR_PER_xBZZ
+from bee_api import get_price_per_block, create_tag, wait_for_stamp_usable
+from bee_client import get_bee_client
+from config import CHUNK_SIZE_BYTES, BLOCK_TIME_SECONDS, STORAGE_TIME_SECONDS, DILUTION_TOPUP_TTL, PLUR_PER_xBZZ, WAIT_FOR_BATCH_TIMEOUT, BEE_TRANSACTION_TIMEOUT
+from stamp_watcher import get_stamp_watcher
+from tag_monitor import get_tag_monitor, format_tag_stats
 from utils import play_notification_sound
 import urllib.parse
 
@@ -18,17 +19,27 @@ EFFECTIVE_UTILISATION = {
 }
 
 BUCKET_DEPTH = 16  # Always 16 in Swarm
+MIN_DEPTH = 17
+MAX_DEPTH = 31
 
 
-def get_effective_capacity_mb(batch_depth):
-    theoretical_chunks_per_bucket = Decimal(2) ** Decimal(batch_depth - BUCKET_DEPTH)
-    total_buckets = Decimal(2) ** Decimal(BUCKET_DEPTH)
-    total_chunks = theoretical_chunks_per_bucket * total_buckets
+def _effective_capacity_mb(batch_depth):
+    total_chunks = Decimal(2 ** batch_depth)
     utilisation = Decimal(EFFECTIVE_UTILISATION.get(batch_depth, 0.5))
     effective_chunks = total_chunks * utilisation
     return (effective_chunks * CHUNK_SIZE_BYTES) / (1024 ** 2)  # Return in MB
 
 
+# Computed once; depth lookups are on every sizing and listing path
+EFFECTIVE_CAPACITY_MB = {depth: _effective_capacity_mb(depth) for depth in range(MIN_DEPTH, MAX_DEPTH + 1)}
+_EFFECTIVE_CAPACITY_BYTES = [(depth, mb * 1024 ** 2) for depth, mb in EFFECTIVE_CAPACITY_MB.items()]
+
+
+def get_effective_capacity_mb(batch_depth):
+    capacity = EFFECTIVE_CAPACITY_MB.get(batch_depth)
+    return capacity if capacity is not None else _effective_capacity_mb(batch_depth)
+
+
 def format_storage_size(mb_value):
     if mb_value >= 1024 * 1024:
         return f"{mb_value / (1024 * 1024):.2f} TB"
@@ -39,10 +50,14 @@ def format_storage_size(mb_value):
 
 
 def calculate_required_depth(file_size):
-    for depth in range(17, 32):
-        if file_size <= get_effective_capacity_mb(depth) * 1024 ** 2:
+    """
+    Estimate a depth from file size alone using the utilisation table.
+    Use capacity.plan_depth_for_file for the exact depth from the file's chunk addresses.
+    """
+    for depth, capacity_bytes in _EFFECTIVE_CAPACITY_BYTES:
+        if file_size <= capacity_bytes:
             return depth
-    return 31
+    return MAX_DEPTH
 
 
 def calculate_required_plur_for_chunks(num_chunks, price_per_block, ttl_seconds):
@@ -56,38 +71,85 @@ def calculate_required_plur(depth, price_per_block):
     return calculate_required_plur_for_chunks(total_chunks, price_per_block, STORAGE_TIME_SECONDS)
 
 
-def dilute_batch(batch_id, bucket_depth, new_depth):
+def stamp_fill_ratio(stamp):
+    """
+    Fraction of a batch already used, from the stamp record's "utilization".
+
+    Bee reports utilization as the fill of the fullest bucket, out of
+    2^(depth - bucketDepth) slots per bucket.
+    """
+    depth = int(stamp.get("depth", MIN_DEPTH))
+    bucket_depth = int(stamp.get("bucketDepth", BUCKET_DEPTH))
+    slots = 2 ** (depth - bucket_depth)
+    return min(1.0, int(stamp.get("utilization", 0)) / slots)
+
+
+def get_remaining_capacity_bytes(stamp):
+    """Effective capacity of a batch not yet used, in bytes."""
+    capacity = get_effective_capacity_mb(int(stamp["depth"])) * 1024 ** 2
+    return int(capacity * Decimal(1 - stamp_fill_ratio(stamp)))
+
+
+def request_dilution(batch_id, new_depth):
+    """
+    Sends the dilution transaction without waiting for it to land.
+
+    Returns:
+        dict | None: {"batchID", "txHash"} on success, None if the node refused.
+    """
+    batch_id = batch_id.replace(" ", "")
+    response = get_bee_client().patch(f"/stamps/dilute/{batch_id}/{new_depth}", timeout=BEE_TRANSACTION_TIMEOUT)
+    print(f"🛠️ Dilution response: {response.status_code} - {response.text}")
+    if response.status_code != 202:
+        return None
+
+    parsed = {}
     try:
-        batch_id = batch_id.replace(" ", "")
+        parsed = response.json()
+    except Exception as e:
+        print(f"⚠️ Could not re-parse batch ID from response: {e}")
+    return {
+        "batchID": (parsed.get("batchID") or batch_id).replace(" ", ""),
+        "txHash": parsed.get("txHash", ""),
+    }
 
-        response = requests.patch(f"{BEE_API_URL}/stamps/dilute/{batch_id}/{new_depth}")
-        print(f"🛠️ Dilution response: {response.status_code} - {response.text}")
-        if response.status_code != 202:
-            return False
 
-        try:
-            parsed = response.json()
-            batch_id = parsed.get("batchID", batch_id).replace(" ", "")
-        except Exception as e:
-            print(f"⚠️ Could not re-parse batch ID from response: {e}")
+def request_topup(batch_id, amount):
+    """
+    Sends a top-up of `amount` PLUR per chunk without waiting for it to land.
+
+    Returns:
+        dict | None: {"batchID", "txHash"} on success, None if the node refused.
+    """
+    batch_id = batch_id.replace(" ", "")
+    response = get_bee_client().patch(f"/stamps/topup/{batch_id}/{int(amount)}", timeout=BEE_TRANSACTION_TIMEOUT)
+    print(f"🛠️ TTL Top-Up response: {response.status_code} - {response.text}")
+    if response.status_code not in (200, 202):
+        return None
+
+    parsed = {}
+    try:
+        parsed = response.json()
+    except Exception as e:
+        print(f"⚠️ Could not parse top-up response: {e}")
+    return {
+        "batchID": (parsed.get("batchID") or batch_id).replace(" ", ""),
+        "txHash": parsed.get("txHash", ""),
+    }
+
 
-        start_time = time.time()
-        print(f"🔍 Waiting for depth update... View txn: https://gnosisscan.io/tx/{parsed.get('txHash', '')}")
+def dilute_batch(batch_id, bucket_depth, new_depth):
+    try:
+        dilution = request_dilution(batch_id, new_depth)
+        if dilution is None:
+            return False
+        batch_id = dilution["batchID"]
+
+        print(f"🔍 Waiting for depth update... View txn: https://gnosisscan.io/tx/{dilution['txHash']}")
         print("⏳ Waiting for diluted batch to reflect updated depth...")
 
-        while time.time() - start_time < 3600:
-            time.sleep(15)
-            stamp_check = requests.get(f"{BEE_API_URL}/stamps/{batch_id}")
-            if stamp_check.status_code != 200:
-                print("❌ Failed to verify updated stamp.")
-                return False
-
-            data = stamp_check.json()
-            actual_depth = int(data.get("depth", 0))
-            if actual_depth >= new_depth:
-                break
-            print(f"...still waiting... current depth: {actual_depth}")
-        else:
+        data = get_stamp_watcher().wait_until_depth(batch_id, new_depth, WAIT_FOR_BATCH_TIMEOUT)
+        if data is None:
             print("⚠️ Dilution did not increase depth after timeout.")
             return False
 
@@ -99,9 +161,8 @@ def dilute_batch(batch_id, bucket_depth, new_depth):
 
         choice = input("Would you like to top up TTL to match original amount? (yes/no): ").strip().lower()
         if choice == "yes":
-            topup_response = requests.patch(f"{BEE_API_URL}/stamps/topup/{batch_id}")
-            print(f"🛠️ TTL Top-Up response: {topup_response.status_code} - {topup_response.text}")
-            if topup_response.status_code == 200:
+            amount = int(Decimal(get_price_per_block() or 0) * DILUTION_TOPUP_TTL / BLOCK_TIME_SECONDS)
+            if amount and request_topup(batch_id, amount):
                 play_notification_sound()
         return True
 
@@ -121,10 +182,10 @@ def purchase_postage_stamp(amount, depth, label, mutable, quoted_xbzz=None):
 
         encoded_label = urllib.parse.quote(clean_label)
         immutable_flag = "false" if mutable else "true"
-        url = f"{BEE_API_URL}/stamps/{int(amount)}/{depth}?label={encoded_label}&immutable={immutable_flag}"
+        url = f"/stamps/{int(amount)}/{depth}?label={encoded_label}&immutable={immutable_flag}"
 
         print(f"📦 Creating batch with label: '{clean_label}'")
-        response = requests.post(url)
+        response = get_bee_client().post(url, timeout=BEE_TRANSACTION_TIMEOUT)
         print(f"📦 Stamp creation response: {response.status_code} - {response.text}")
 
         if response.status_code == 201:
@@ -135,7 +196,7 @@ def purchase_postage_stamp(amount, depth, label, mutable, quoted_xbzz=None):
 
 
 def upload_file(file_path, batch_id, encrypt, topic_name=None):
-    tag_uid = create_tag()
+    tag_uid = create_tag(batch_id)
     if not tag_uid:
         print("❌ Failed to create tag.")
         return
@@ -152,15 +213,13 @@ def upload_file(file_path, batch_id, encrypt, topic_name=None):
         headers["Swarm-Feed-Type"] = "sequence"
 
     with open(file_path, 'rb') as file:
-        response = requests.post(f"{BEE_API_URL}/bzz?tag={tag_uid}", headers=headers, data=file)
+        response = get_bee_client(batch_id).post(f"/bzz?tag={tag_uid}", headers=headers, data=file)
         if response.status_code == 201:
-            while True:
-                percent = get_tag_progress(tag_uid)
-                if percent is not None:
-                    print(f"Uploading... [{percent}%]", end='\r')
-                    if percent >= 100:
-                        break
-                time.sleep(1)
+            stats = get_tag_monitor().wait(
+                tag_uid, on_progress=lambda s: print(format_tag_stats(s), end='\r')
+            )
+            if not stats["done"]:
+                print("\n⚠️ Timed out waiting for the upload to sync.")
             swarm_hash = response.json().get("reference")
             print(f"\n✅ File uploaded. Swarm Hash: {swarm_hash}")
             return swarm_hash
@@ -0,0 +1,179 @@
+# stream_upload.py
+
+import os
+import json
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from bee_api import create_tag, get_tag
+from bee_client import get_bee_client
+from chunker import CHUNK_SIZE, SPAN_SIZE, iter_chunks
+from config import STREAM_CHECKPOINT_DIR, STREAM_CHECKPOINT_EVERY, STREAM_IN_FLIGHT
+from upload import UploadError
+from utils import play_notification_sound
+
+
+def _checkpoint_path(file_path, batch_id):
+    key = hashlib.sha256(f"{os.path.abspath(file_path)}|{batch_id}".encode()).hexdigest()[:32]
+    return os.path.join(STREAM_CHECKPOINT_DIR, f"{key}.json")
+
+
+def load_checkpoint(file_path, batch_id):
+    """
+    Returns the saved checkpoint for this file and batch, or None.
+    A checkpoint is discarded if the file changed size or mtime since it was written.
+    """
+    path = _checkpoint_path(file_path, batch_id)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            checkpoint = json.load(f)
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable checkpoint {path}: {e}")
+        return None
+    stat = os.stat(file_path)
+    if checkpoint.get("size") != stat.st_size or checkpoint.get("mtime") != stat.st_mtime_ns:
+        print("⚠️ File changed since the last attempt. Starting over.")
+        return None
+    return checkpoint
+
+
+def _save_checkpoint(path, checkpoint):
+    os.makedirs(STREAM_CHECKPOINT_DIR, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def _put_chunk(batch_id, tag_uid, address, span, payload):
+    headers = {
+        "Swarm-Postage-Batch-Id": batch_id,
+        "Swarm-Tag": str(tag_uid),
+        "Content-Type": "application/octet-stream",
+    }
+    body = span.to_bytes(SPAN_SIZE, "little") + payload
+    response = get_bee_client(batch_id).post("/chunks", headers=headers, data=body)
+    if response.status_code != 201:
+        raise UploadError(f"Chunk upload failed: {response.status_code} {response.text}",
+                          status_code=response.status_code)
+    reference = response.json().get("reference")
+    if reference != address.hex():
+        raise UploadError(f"Chunk reference mismatch: expected {address.hex()}, node returned {reference}")
+
+
+def _confirmed_position(checkpoint):
+    """Position to resume from: the checkpoint, capped by what the node's tag has seen."""
+    position = checkpoint["position"]
+    tag = get_tag(checkpoint["tag"])
+    if tag is None:
+        return position
+    node_count = max(tag.get("stored", 0) or 0, tag.get("split", 0) or 0)
+    return min(position, node_count) if node_count else position
+
+
+def send_file_resumable(file_path, batch_id, in_flight=STREAM_IN_FLIGHT):
+    """
+    Uploads a file as a stream of chunks through POST /chunks, checkpointing progress.
+
+    The file is chunked locally (see chunker.iter_chunks) and the chunks are sent in
+    order, at most `in_flight` at a time, with the root chunk sent last once everything
+    under it is stored. Every STREAM_CHECKPOINT_EVERY confirmed chunks the position and
+    tag are written to STREAM_CHECKPOINT_DIR. Calling this again after a crash or network
+    drop re-hashes the confirmed part locally and only sends the rest. Memory use is
+    bounded by the tree depth and the in-flight window, not the file size.
+
+    The result is a /bytes reference (no manifest), retrievable with GET /bytes/{reference}.
+    Unencrypted uploads only.
+
+    Returns:
+        dict: {"reference", "tag", "bytes", "chunks", "resumed_from"}
+    Raises:
+        UploadError: If a chunk is rejected. Progress up to that point is checkpointed.
+    """
+    stat = os.stat(file_path)
+    checkpoint_path = _checkpoint_path(file_path, batch_id)
+    checkpoint = load_checkpoint(file_path, batch_id)
+
+    position = 0
+    tag_uid = None
+    if checkpoint:
+        tag_uid = checkpoint["tag"]
+        position = _confirmed_position(checkpoint)
+        print(f"🔁 Resuming upload from chunk {position} (tag {tag_uid}).")
+    if not tag_uid:
+        tag_uid = create_tag(batch_id)
+        if not tag_uid:
+            raise UploadError("Failed to create a tag.")
+
+    checkpoint = {
+        "file": os.path.abspath(file_path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "batch_id": batch_id,
+        "tag": tag_uid,
+        "position": position,
+    }
+    expected_chunks = max(1, -(-stat.st_size // CHUNK_SIZE))
+    window = deque()
+    confirmed = position
+    count = 0
+    held = None  # Each chunk is held back one step so the root (always last) goes alone
+
+    def confirm_oldest():
+        nonlocal confirmed
+        window.popleft().result()
+        confirmed += 1
+        if confirmed % STREAM_CHECKPOINT_EVERY == 0:
+            checkpoint["position"] = confirmed
+            _save_checkpoint(checkpoint_path, checkpoint)
+            percent = min(99, round(confirmed / expected_chunks * 100))
+            print(f"Uploading... [{percent}%]", end='\r')
+
+    try:
+        with open(file_path, "rb") as f, ThreadPoolExecutor(max_workers=in_flight) as pool:
+            for index, chunk in enumerate(iter_chunks(f)):
+                count = index + 1
+                if index < position:
+                    continue  # Already stored; hashed again only to rebuild the tree
+                if held is not None:
+                    if len(window) >= in_flight:
+                        confirm_oldest()
+                    window.append(pool.submit(_put_chunk, batch_id, tag_uid, *held))
+                held = chunk
+
+            while window:
+                confirm_oldest()
+            if held is not None:
+                _put_chunk(batch_id, tag_uid, *held)
+    except BaseException:
+        checkpoint["position"] = confirmed
+        _save_checkpoint(checkpoint_path, checkpoint)
+        raise
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    return {
+        "reference": held[0].hex(),  # The last chunk of the stream is the root
+        "tag": tag_uid,
+        "bytes": stat.st_size,
+        "chunks": count,
+        "resumed_from": position,
+    }
+
+
+def upload_file_resumable(file_path, batch_id, notify=True):
+    try:
+        print("\n📤 Attempting resumable upload...")
+        result = send_file_resumable(file_path, batch_id)
+        print(f"\n✅ File uploaded successfully. Swarm Hash: {result['reference']}")
+        print(f"ℹ️ Retrieve with /bytes/{result['reference']} ({result['chunks']} chunks).")
+        if notify:
+            play_notification_sound()
+        return result["reference"]
+    except Exception as e:
+        print(f"\n❌ Upload interrupted: {e}")
+        print("ℹ️ Progress was saved. Run the same upload again to resume.")
+        return None
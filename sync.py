@@ -0,0 +1,204 @@
+# sync.py
+
+import os
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from config import UPLOAD_WORKERS, SYNC_POLL_INTERVAL, SYNC_DEBOUNCE, SYNC_HASH_WORKERS
+from local_store import get_file_index, save_file_index, remove_file_index, save_local_feeds
+from upload_engine import upload_many
+
+HASH_BLOCK = 1024 * 1024
+
+
+def _content_hash(path):
+    """SHA-256 of a file's content, or None if it vanished while being read."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK), b""):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def scan(root):
+    """
+    Returns:
+        dict: Path relative to root ("/"-separated) -> (size, mtime_ns) for every file under root.
+    """
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Deleted while scanning
+            files[os.path.relpath(path, root).replace(os.sep, "/")] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def plan_sync(root, batch_id):
+    """
+    Compares a directory with its file index for one batch.
+
+    Files whose size and mtime match the index are taken as unchanged without being
+    read. The others are hashed: the ones whose content still matches are "touched"
+    (only their index entry is refreshed), the rest need uploading.
+
+    Returns:
+        dict: {"root" (absolute), "scanned", "unchanged", "upload" (path -> (size, mtime_ns,
+            content hash)), "touched" (index entries), "deleted" (paths gone since the last sync)}
+    """
+    root = os.path.abspath(root)
+    index = get_file_index(batch_id, root)
+    files = scan(root)
+    candidates = [
+        path for path, stat in files.items()
+        if path not in index or (index[path]["size"], index[path]["mtime_ns"]) != stat
+    ]
+    with ThreadPoolExecutor(max_workers=SYNC_HASH_WORKERS) as pool:
+        hashes = pool.map(lambda path: _content_hash(os.path.join(root, *path.split("/"))), candidates)
+
+    upload, touched = {}, []
+    for path, content_hash in zip(candidates, hashes):
+        if content_hash is None:
+            continue
+        size, mtime_ns = files[path]
+        entry = index.get(path)
+        if entry and entry["content_hash"] == content_hash:
+            touched.append((path, size, mtime_ns, content_hash, entry["reference"]))
+        else:
+            upload[path] = (size, mtime_ns, content_hash)
+    return {
+        "root": root,
+        "scanned": len(files),
+        "unchanged": len(files) - len(candidates),
+        "upload": upload,
+        "touched": touched,
+        "deleted": sorted(set(index) - set(files)),
+    }
+
+
+def sync_directory(root, batch_id, encrypt=False, feeds=True, max_workers=UPLOAD_WORKERS, compress=None,
+                   adaptive=False, quiet=False):
+    """
+    Uploads only the files under `root` that are new or changed since its last sync to this batch.
+
+    Each file is compared with its (size, mtime, content hash, reference) entry in the
+    local store's file index (see plan_sync). Changed files go through upload_many;
+    with feeds, each is published as a feed update named by its path relative to root.
+    A file's index entry is written as soon as it is uploaded, so an interrupted sync
+    picks up where it stopped.
+
+    Args:
+        quiet (bool): Print nothing when nothing changed (used by watch).
+    Returns:
+        dict: {"scanned", "unchanged", "uploaded", "failed", "deleted", "bytes", "results"}
+    """
+    plan = plan_sync(root, batch_id)
+    root = plan["root"]
+    if plan["touched"]:
+        save_file_index(batch_id, root, plan["touched"])
+    if plan["deleted"]:
+        remove_file_index(batch_id, root, plan["deleted"])
+
+    summary = {
+        "scanned": plan["scanned"],
+        "unchanged": plan["unchanged"] + len(plan["touched"]),
+        "uploaded": 0,
+        "failed": 0,
+        "deleted": len(plan["deleted"]),
+        "bytes": 0,
+        "results": [],
+    }
+    pending = plan["upload"]
+    if not pending:
+        if not quiet or plan["deleted"]:
+            print(f"✅ {root}: {plan['scanned']} files, nothing to upload"
+                  + (f", {len(plan['deleted'])} removed from the index." if plan["deleted"] else "."))
+        return summary
+
+    paths = {os.path.join(root, *rel.split("/")): rel for rel in pending}
+    records = []
+
+    def on_result(result):
+        if result["error"]:
+            return
+        rel = paths[result["file"]]
+        size, mtime_ns, content_hash = pending[rel]
+        save_file_index(batch_id, root, [(rel, size, mtime_ns, content_hash, result["reference"])])
+        records.append((batch_id, rel, result["reference"], result["codec"]))
+
+    print(f"🔁 {root}: {len(pending)} of {plan['scanned']} files new or changed.")
+    try:
+        results = upload_many(list(paths), batch_id, encrypt, paths if feeds else None, max_workers=max_workers,
+                              on_result=on_result, compress=compress, adaptive=adaptive)
+    finally:
+        if records:
+            save_local_feeds(records)  # Each upload saved its feed index; this records references and codecs
+
+    summary["results"] = results
+    summary["uploaded"] = sum(1 for r in results if not r["error"])
+    summary["failed"] = len(results) - summary["uploaded"]
+    summary["bytes"] = sum(r["bytes"] for r in results if not r["error"])
+    print(f"🔁 Synced {summary['uploaded']} files ({summary['bytes'] / 1024 ** 2:.1f} MB), "
+          f"{summary['unchanged']} unchanged, {summary['deleted']} removed from the index"
+          + (f", {summary['failed']} failed" if summary["failed"] else "") + ".")
+    return summary
+
+
+def _inotify(root):
+    """An inotify_simple.INotify watching every directory under root, or None if unavailable."""
+    try:
+        from inotify_simple import INotify, flags
+    except ImportError:
+        return None
+    mask = flags.CLOSE_WRITE | flags.CREATE | flags.DELETE | flags.MOVED_FROM | flags.MOVED_TO
+    try:
+        notifier = INotify()
+        for directory, _, _ in os.walk(root):
+            notifier.add_watch(directory, mask)
+    except OSError as e:
+        print(f"⚠️ inotify unavailable ({e}); falling back to polling.")
+        return None
+    notifier.mask = mask
+    return notifier
+
+
+def watch(root, batch_id, interval=SYNC_POLL_INTERVAL, debounce=SYNC_DEBOUNCE, **options):
+    """
+    Syncs `root` now, then again after every change, until interrupted.
+
+    With the optional `inotify_simple` package (Linux) a sync runs once the tree has
+    been quiet for `debounce` seconds after an inotify event; otherwise the tree is
+    rescanned every `interval` seconds. A rescan only stats unchanged files, so a
+    large, quiet tree costs little either way.
+
+    Args:
+        options: Passed on to sync_directory (encrypt, feeds, max_workers, compress, adaptive).
+    """
+    sync_directory(root, batch_id, **options)
+    notifier = _inotify(root)
+    if notifier is None:
+        print(f"👀 Rescanning {root} every {interval:.0f}s (install inotify_simple for instant syncs).")
+    else:
+        print(f"👀 Watching {root} for changes.")
+    try:
+        while True:
+            if notifier is None:
+                time.sleep(interval)
+            else:
+                notifier.read()
+                while notifier.read(timeout=int(debounce * 1000)):
+                    pass  # Wait until the burst of changes is over
+                for directory, _, _ in os.walk(root):
+                    notifier.add_watch(directory, notifier.mask)  # Directories created since
+            sync_directory(root, batch_id, quiet=True, **options)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching.")
+    finally:
+        if notifier is not None:
+            notifier.close()
@@ -0,0 +1,179 @@
+# tag_monitor.py
+
+import time
+import threading
+from bee_api import get_tag, tag_percent
+from chunker import CHUNK_SIZE
+from config import TAG_POLL_INTERVAL, TAG_POLL_RATE, WAIT_FOR_BATCH_TIMEOUT
+from metrics import get_metrics
+
+RATE_SMOOTHING = 0.3  # Weight of the newest sample in the chunks-per-second average
+
+
+def _new_stats(tag_uid):
+    return {
+        "tag": tag_uid,
+        "split": 0,
+        "seen": 0,
+        "stored": 0,
+        "sent": 0,
+        "synced": 0,
+        "percent": None,
+        "chunks_per_second": 0.0,
+        "bytes_per_second": 0.0,
+        "eta_seconds": None,
+        "started": time.monotonic(),
+        "updated": None,
+        "done": False,
+    }
+
+
+class TagMonitor:
+    """
+    Tracks the progress of many upload tags from one background thread.
+
+    Tags are polled round-robin, each at most every TAG_POLL_INTERVAL seconds and all
+    together at most TAG_POLL_RATE requests per second. Each tracked tag exposes its
+    split/seen/stored/sent/synced counts, chunks and bytes per second, and an ETA.
+    Tracking is reference-counted, so several callers can track or wait on the same
+    tag. The thread exits when nothing is tracked.
+    """
+
+    def __init__(self, interval=TAG_POLL_INTERVAL, rate=TAG_POLL_RATE):
+        self.interval = interval
+        self.min_gap = 1.0 / rate
+        self._cond = threading.Condition()
+        self._tags = {}        # tag uid -> stats dict
+        self._refs = {}        # tag uid -> number of track() calls not yet untracked
+        self._next_poll = {}   # tag uid -> monotonic time it is due
+        self._thread = None
+
+    def track(self, tag_uid):
+        with self._cond:
+            if tag_uid not in self._tags:
+                self._tags[tag_uid] = _new_stats(tag_uid)
+                self._next_poll[tag_uid] = time.monotonic()
+            self._refs[tag_uid] = self._refs.get(tag_uid, 0) + 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="tag-monitor", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def untrack(self, tag_uid):
+        with self._cond:
+            refs = self._refs.get(tag_uid, 0) - 1
+            if refs > 0:
+                self._refs[tag_uid] = refs
+                return
+            self._refs.pop(tag_uid, None)
+            self._tags.pop(tag_uid, None)
+            self._next_poll.pop(tag_uid, None)
+
+    def get(self, tag_uid):
+        """A copy of the latest stats for one tag, or None if it is not tracked."""
+        with self._cond:
+            stats = self._tags.get(tag_uid)
+            return dict(stats) if stats else None
+
+    def snapshot(self):
+        """Copies of the latest stats for every tracked tag."""
+        with self._cond:
+            return {uid: dict(stats) for uid, stats in self._tags.items()}
+
+    def _update(self, tag_uid, tag):
+        now = time.monotonic()
+        with self._cond:
+            stats = self._tags.get(tag_uid)
+            if stats is None:
+                return
+            processed_before = stats["synced"] + stats["seen"]
+            for key in ("split", "seen", "stored", "sent", "synced"):
+                stats[key] = tag.get(key) or 0
+            processed = stats["synced"] + stats["seen"]
+
+            if stats["updated"] is not None and now > stats["updated"]:
+                rate = (processed - processed_before) / (now - stats["updated"])
+                stats["chunks_per_second"] += RATE_SMOOTHING * (rate - stats["chunks_per_second"])
+                stats["bytes_per_second"] = stats["chunks_per_second"] * CHUNK_SIZE
+            remaining = max(0, stats["split"] - processed)
+            if stats["chunks_per_second"] > 0:
+                stats["eta_seconds"] = remaining / stats["chunks_per_second"]
+            stats["percent"] = tag_percent(tag)
+            stats["done"] = stats["percent"] is not None and stats["percent"] >= 100
+            stats["updated"] = now
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._tags:
+                    self._thread = None
+                    return
+                tag_uid = min(self._next_poll, key=self._next_poll.get)
+                delay = self._next_poll[tag_uid] - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                self._next_poll[tag_uid] = time.monotonic() + self.interval
+
+            tag = get_tag(tag_uid)
+            if tag is not None:
+                self._update(tag_uid, tag)
+            time.sleep(self.min_gap)
+
+    def wait(self, tag_uid, timeout=WAIT_FOR_BATCH_TIMEOUT, on_progress=None):
+        """
+        Blocks until the tag is done or the timeout passes, then stops tracking it.
+
+        Args:
+            on_progress (callable): Optional callback invoked with each new stats copy,
+                outside the monitor's lock.
+        Returns:
+            dict: The final stats; "done" is False on timeout.
+        """
+        self.track(tag_uid)
+        deadline = time.monotonic() + timeout
+        last_update = None
+        try:
+            with get_metrics().waiting("tag") as outcome:
+                while True:
+                    with self._cond:
+                        stats = dict(self._tags[tag_uid])
+                        remaining = deadline - time.monotonic()
+                        if stats["updated"] == last_update and not stats["done"] and remaining > 0:
+                            self._cond.wait(remaining)
+                            continue
+                    if stats["updated"] != last_update:
+                        last_update = stats["updated"]
+                        if on_progress:
+                            on_progress(stats)
+                    if stats["done"] or remaining <= 0:
+                        outcome["ok"] = stats["done"]
+                        return stats
+        finally:
+            self.untrack(tag_uid)
+
+
+def format_tag_stats(stats):
+    """One-line progress string, e.g. for print(..., end='\\r')."""
+    eta = f"{stats['eta_seconds']:.0f}s" if stats["eta_seconds"] is not None else "?"
+    return (
+        f"Uploading... [{stats['percent'] or 0}%] "
+        f"split {stats['split']} | stored {stats['stored']} | synced {stats['synced']} | "
+        f"{stats['chunks_per_second']:.1f} chunks/s ({stats['bytes_per_second'] / 1024 ** 2:.2f} MB/s) | "
+        f"ETA {eta}"
+    )
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_tag_monitor():
+    """Return the process-wide TagMonitor."""
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                _monitor = TagMonitor()
+    return _monitor
@@ -2,52 +2,263 @@
 
 import os
 import mimetypes
-import requests
-from config import BEE_API_URL
+from bee_api import feed_topic, get_feed_owner, lookup_feed_index
+from bee_client import get_bee_client
+from chunker import chunk_count
+from compression import CODEC_CONTENT_TYPES, CompressedStream, is_compressible
+from local_store import get_feed_index, save_feed_indexes
 from utils import play_notification_sound
 
-def upload_file(file_path, batch_id, encrypt, topic_name=None):
-    try:
-        # Step 1: Create a new tag
-        tag_response = requests.post(f"{BEE_API_URL}/tags")
-        tag_response.raise_for_status()
-        tag_uid = tag_response.json().get("uid")
-        if not tag_uid:
-            print("❌ Failed to create a tag.")
-            return None
-
-        # Step 2: Prepare headers
-        content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
-        headers = {
-            "Swarm-Postage-Batch-Id": batch_id,
-            "Swarm-Tag": str(tag_uid),
-            "Content-Type": content_type,
-            "Swarm-Encrypt": "true" if encrypt else "false"
-        }
-
-        if topic_name:
-            headers["Swarm-Feed-Name"] = topic_name
-            headers["Swarm-Feed-Type"] = "sequence"
-
-        # Step 3: Upload the file
-        print("\n📤 Attempting upload...")
 
-        with open(file_path, "rb") as f:
-            upload_response = requests.post(f"{BEE_API_URL}/bzz?tag=" + str(tag_uid), headers=headers, data=f)
+class UploadError(Exception):
+    """Raised by send_file/send_bytes/send_iter when Bee rejects an upload or returns no reference."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _feed_key(batch_id, topic_name):
+    """(owner, topic) a feed's sequence index is cached under: one feed per signing key and name."""
+    owner = get_feed_owner(batch_id)
+    if owner is None:
+        raise UploadError(f"Could not read the owner of feed {topic_name}.")
+    return owner, feed_topic(topic_name)
+
+
+def next_feed_index(batch_id, topic_name):
+    """
+    Next sequence index for a feed: one past the index cached in the local store, or
+    the node's next index (GET /feeds, 0 for a new feed) when nothing is cached.
+
+    Raises:
+        UploadError: If the owner cannot be read, or nothing is cached and the node
+            cannot be asked.
+    """
+    cached = get_feed_index(*_feed_key(batch_id, topic_name))
+    if cached:
+        return cached[0] + 1
+    index = lookup_feed_index(topic_name, batch_id)
+    if index is None:
+        raise UploadError(f"Could not look up the next index of feed {topic_name}.")
+    return index
+
+
+def record_feed_index(batch_id, topic_name, feed_index, reference):
+    """Moves a feed's cached sequence index forward after an update was stored."""
+    owner, topic = _feed_key(batch_id, topic_name)
+    save_feed_indexes([(owner, topic, topic_name, feed_index, reference)])
+
+
+def _send_body(body, batch_id, encrypt, content_type, topic_name=None, feed_index=None):
+    """
+    Creates a tag on the node holding the batch and POSTs `body` to /bzz.
+
+    `body` is passed to requests as-is: an open file or a sized object is sent with a
+    Content-Length, any other iterable with chunked transfer encoding. A feed update
+    goes out with `feed_index` (default: next_feed_index) and, once stored, moves the
+    local store's cached index forward; saving the reference itself is up to the caller.
+
+    Returns:
+        tuple: (reference, tag UID, feed index used; None for non-feed uploads)
+    """
+    if topic_name and feed_index is None:
+        feed_index = next_feed_index(batch_id, topic_name)
+
+    # Step 1: Create a new tag on the node holding the batch
+    client = get_bee_client(batch_id)
+    tag_response = client.post("/tags")
+    tag_response.raise_for_status()
+    tag_uid = tag_response.json().get("uid")
+    if not tag_uid:
+        raise UploadError("Failed to create a tag.")
+
+    # Step 2: Prepare headers
+    headers = {
+        "Swarm-Postage-Batch-Id": batch_id,
+        "Swarm-Tag": str(tag_uid),
+        "Content-Type": content_type,
+        "Swarm-Encrypt": "true" if encrypt else "false"
+    }
+
+    if topic_name:
+        headers["Swarm-Feed-Name"] = topic_name
+        headers["Swarm-Feed-Type"] = "sequence"
+        headers["Swarm-Feed-Index"] = str(feed_index)
+
+    # Step 3: Upload the body
+    upload_response = client.post(f"/bzz?tag={tag_uid}", headers=headers, data=body)
+    if upload_response.status_code != 201:
+        raise UploadError(
+            f"Upload failed: {upload_response.status_code} {upload_response.text}",
+            status_code=upload_response.status_code,
+        )
+
+    swarm_hash = upload_response.json().get("reference")
+    if not swarm_hash:
+        raise UploadError("Upload finished but no swarm hash found!", status_code=upload_response.status_code)
+
+    if not topic_name:
+        return swarm_hash, tag_uid, None
+    record_feed_index(batch_id, topic_name, feed_index, swarm_hash)
+    return swarm_hash, tag_uid, feed_index
+
+
+def _result(reference, tag_uid, feed_index, size, codec=None, stored=None):
+    stored = size if stored is None else stored
+    return {
+        "reference": reference,
+        "tag": tag_uid,
+        "bytes": size,
+        "feed_index": feed_index,
+        "codec": codec,
+        "stored_bytes": stored,
+        "chunks_saved": chunk_count(size) - chunk_count(stored),
+    }
+
+
+def send_file(file_path, batch_id, encrypt, topic_name=None, feed_index=None, compress=None):
+    """
+    Uploads a single file to /bzz without printing anything.
+
+    With a topic name the upload is a sequence feed update at `feed_index`, by default
+    the next index after the one cached in the local store (see next_feed_index).
+    With compress="gzip" or "zstd" the file is compressed while it is sent, unless its
+    type is already compressed (see compression.is_compressible), and stored with the
+    codec's own Content-Type (application/gzip or application/zstd).
+
+    Returns:
+        dict: {"reference", "tag", "bytes", "feed_index", "codec", "stored_bytes", "chunks_saved"}
+            for the uploaded file; "feed_index" is the index published, None for non-feed
+            uploads; "codec" is None when stored uncompressed.
+    Raises:
+        UploadError: If the tag cannot be created or the upload is rejected.
+    """
+    size = os.path.getsize(file_path)
+    codec = compress if compress and is_compressible(file_path) else None
+    if codec:
+        stream = CompressedStream(file_path, codec)
+        reference, tag_uid, feed_index = _send_body(
+            stream, batch_id, encrypt, CODEC_CONTENT_TYPES[codec], topic_name, feed_index)
+        return _result(reference, tag_uid, feed_index, size, codec, stream.size)
 
-        if upload_response.status_code == 201:
-            swarm_hash = upload_response.json().get("reference")
-            if not swarm_hash:
-                print("❌ Upload finished but no swarm hash found!")
-                return None
+    content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+    with open(file_path, "rb") as f:
+        reference, tag_uid, feed_index = _send_body(f, batch_id, encrypt, content_type, topic_name, feed_index)
+    return _result(reference, tag_uid, feed_index, size)
 
-            print(f"\n✅ File uploaded successfully. Swarm Hash: {swarm_hash}")
+
+def _as_buffer(data):
+    """A flat byte view of a bytes-like object, without copying it where possible."""
+    if isinstance(data, bytes):
+        return data
+    view = memoryview(data)
+    if not view.nbytes:
+        return b""  # requests would send an empty view chunked
+    if not view.c_contiguous:
+        return view.tobytes()  # Strided views have to be copied once
+    return view if view.format == "B" and view.ndim == 1 else view.cast("B")
+
+
+class _IterBody:
+    """
+    Request body over an iterator of byte blocks, counting what goes out.
+
+    Blocks are passed on as views of the caller's objects, not copied. With a known
+    size it has a len(), so requests sends a Content-Length instead of chunking; a
+    source that yields a different total fails the upload instead of hanging it.
+    """
+
+    def __init__(self, blocks, size=None):
+        self.blocks = blocks
+        self.size = size
+        self.sent = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for block in self.blocks:
+            block = _as_buffer(block)
+            if not len(block):
+                continue  # An empty chunk would end a chunked body early
+            self.sent += len(block)
+            if self.size is not None and self.sent > self.size:
+                raise ValueError(f"Iterator yielded more than the declared {self.size} bytes.")
+            yield block
+        if self.size is not None and self.sent != self.size:
+            raise ValueError(f"Iterator yielded {self.sent} of the declared {self.size} bytes.")
+
+
+def send_bytes(data, batch_id, encrypt, topic_name=None, feed_index=None, content_type="application/octet-stream"):
+    """
+    Uploads an in-memory object to /bzz, like send_file but without a file on disk.
+
+    Args:
+        data (bytes | bytearray | memoryview): Content; sent straight from the caller's
+            buffer (any contiguous buffer-protocol object works).
+        content_type (str): Content-Type stored with the upload.
+    Returns:
+        dict: Same as send_file ("codec" is always None).
+    Raises:
+        UploadError: If the tag cannot be created or the upload is rejected.
+    """
+    body = _as_buffer(data)
+    reference, tag_uid, feed_index = _send_body(body, batch_id, encrypt, content_type, topic_name, feed_index)
+    return _result(reference, tag_uid, feed_index, len(body))
+
+
+def send_iter(blocks, batch_id, encrypt, topic_name=None, feed_index=None, content_type="application/octet-stream",
+              size=None):
+    """
+    Uploads content produced by an iterator or generator of byte blocks, as it is produced.
+
+    Args:
+        blocks (iterable): bytes/bytearray/memoryview blocks; nothing is buffered here.
+        size (int): Total bytes, if known. Sent as Content-Length; otherwise the body is chunked.
+    Returns:
+        dict: Same as send_file, with "bytes" counted as the blocks were sent.
+    Raises:
+        UploadError: If the tag cannot be created or the upload is rejected.
+        ValueError: If the blocks do not add up to `size`.
+    """
+    body = _IterBody(blocks, size)
+    reference, tag_uid, feed_index = _send_body(body if size is not None else iter(body), batch_id, encrypt,
+                                                content_type, topic_name, feed_index)
+    return _result(reference, tag_uid, feed_index, body.sent)
+
+
+def _upload_and_report(send, notify, what=None):
+    """Runs send() with the printing of the upload_* wrappers. Returns the Swarm hash or None."""
+    try:
+        print("\n📤 Attempting upload...")
+        result = send()
+        swarm_hash = result["reference"]
+
+        what = what or f"{result['bytes']} bytes"
+        print(f"\n✅ {what} uploaded successfully. Swarm Hash: {swarm_hash}")
+        if notify:
             play_notification_sound()
-            return swarm_hash
-        else:
-            print(f"❌ Upload failed: {upload_response.status_code} {upload_response.text}")
-            return None
+        return swarm_hash
 
+    except UploadError as e:
+        print(f"❌ {e}")
+        return None
     except Exception as e:
         print(f"❌ Exception during upload: {e}")
         return None
+
+
+def upload_file(file_path, batch_id, encrypt, topic_name=None, notify=True):
+    return _upload_and_report(lambda: send_file(file_path, batch_id, encrypt, topic_name), notify, "File")
+
+
+def upload_bytes(data, batch_id, encrypt, topic_name=None, content_type="application/octet-stream", notify=True):
+    return _upload_and_report(
+        lambda: send_bytes(data, batch_id, encrypt, topic_name, content_type=content_type), notify)
+
+
+def upload_iter(blocks, batch_id, encrypt, topic_name=None, content_type="application/octet-stream", size=None,
+                notify=True):
+    return _upload_and_report(
+        lambda: send_iter(blocks, batch_id, encrypt, topic_name, content_type=content_type, size=size), notify)
@@ -0,0 +1,139 @@
+# upload_engine.py
+
+import os
+import glob
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrency import AdaptiveLimiter
+from config import UPLOAD_WORKERS
+from upload import send_file
+
+
+def collect_files(sources):
+    """
+    Expands upload sources into a sorted list of file paths.
+
+    Args:
+        sources (str | list): A file path, glob pattern or directory, or a list of them.
+            Directories are walked recursively.
+    Returns:
+        list: Unique file paths, in a stable order.
+    """
+    if isinstance(sources, (str, os.PathLike)):
+        sources = [sources]
+
+    files = []
+    for source in sources:
+        source = os.fspath(source)
+        if os.path.isdir(source):
+            for root, _, names in os.walk(source):
+                files.extend(os.path.join(root, name) for name in names)
+        elif os.path.isfile(source):
+            files.append(source)
+        else:
+            files.extend(p for p in glob.glob(source, recursive=True) if os.path.isfile(p))
+
+    seen = set()
+    unique = []
+    for path in sorted(files):
+        if path not in seen:
+            seen.add(path)
+            unique.append(path)
+    return unique
+
+
+def _upload_one(file_path, batch_id, encrypt, topic_name, compress=None, limiter=None):
+    if limiter:
+        limiter.acquire()
+    start = time.perf_counter()
+    result = {
+        "file": file_path,
+        "reference": None,
+        "bytes": 0,
+        "codec": None,
+        "chunks_saved": 0,
+        "feed_index": None,
+        "duration": 0.0,
+        "error": None,
+    }
+    status, tag_uid = None, None
+    try:
+        sent = send_file(file_path, batch_id, encrypt, topic_name, compress=compress)
+        result["reference"] = sent["reference"]
+        result["bytes"] = sent["bytes"]
+        result["codec"] = sent["codec"]
+        result["chunks_saved"] = sent["chunks_saved"]
+        result["feed_index"] = sent["feed_index"]
+        tag_uid = sent["tag"]
+    except Exception as e:
+        result["error"] = str(e)
+        status = getattr(e, "status_code", None)
+    result["duration"] = time.perf_counter() - start
+    if limiter:
+        limiter.release(result["duration"], result["bytes"], status=status, error=bool(result["error"]),
+                        tag_uid=tag_uid)
+    return result
+
+
+def upload_many(sources, batch_id, encrypt=False, topic_names=None, max_workers=UPLOAD_WORKERS, on_result=None,
+                compress=None, adaptive=False):
+    """
+    Uploads many files to the same batch through a bounded worker pool.
+
+    A failed or slow file never blocks the others: each file is uploaded independently
+    and its outcome is recorded in its own result.
+
+    Args:
+        sources (str | list): Files, glob patterns or directories (see collect_files).
+        batch_id (str): Postage batch used for every upload.
+        encrypt (bool): Whether to upload encrypted.
+        topic_names (dict): Optional file path -> feed name mapping for mutable uploads.
+        max_workers (int): Maximum number of uploads in flight.
+        on_result (callable): Optional callback invoked with each result as it completes.
+        compress (str): Optional "gzip" or "zstd" for compressible files (see upload.send_file).
+        adaptive (bool): Start at max_workers uploads in flight and let an AdaptiveLimiter
+            raise or lower that with the node's latency, 429/503s and sync lag.
+    Returns:
+        list: One dict per file with "file", "reference", "bytes", "codec", "chunks_saved",
+            "feed_index", "duration" and "error", in the same order as the collected files.
+    """
+    files = collect_files(sources)
+    topic_names = topic_names or {}
+    results = {}
+
+    if not files:
+        print("⚠️ No files matched the given sources.")
+        return []
+
+    limiter = None
+    if adaptive:
+        limiter = AdaptiveLimiter(initial=max_workers)
+        print(f"📤 Uploading {len(files)} files, starting at {max_workers} in flight (adaptive)...")
+    else:
+        print(f"📤 Uploading {len(files)} files with {max_workers} workers...")
+    with ThreadPoolExecutor(max_workers=limiter.max_limit if limiter else max_workers) as pool:
+        futures = {
+            pool.submit(_upload_one, path, batch_id, encrypt, topic_names.get(path), compress, limiter): path
+            for path in files
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if result["error"]:
+                print(f"❌ {result['file']}: {result['error']}")
+            else:
+                saved = f", {result['codec']} saved {result['chunks_saved']} chunks" if result["codec"] else ""
+                print(f"✅ {result['file']} -> {result['reference']} ({result['duration']:.2f}s{saved})")
+            if on_result:
+                on_result(result)
+
+    ordered = [results[path] for path in files]
+    failed = sum(1 for r in ordered if r["error"])
+    print(f"📦 Done: {len(ordered) - failed} uploaded, {failed} failed.")
+    if compress:
+        print(f"🗜️ Compression saved {sum(r['chunks_saved'] for r in ordered)} chunks.")
+    if limiter:
+        stats = limiter.stats()
+        pace = f", paced to {stats['rate']:.1f}/s" if stats["rate"] else ""
+        print(f"🎚️ Settled at {stats['limit']} uploads in flight{pace} after {stats['decreases']} backoffs.")
+    return ordered
@@ -31,57 +31,40 @@ def round_decimal(val, places=2):
 # --- Storage Calculation Utilities ---
 def calculate_required_depth(file_size_bytes, encrypt=False):
     """
-    Return the minimum depth needed for a file size, using Swarm's real effective volumes (unencrypted by default).
-    
-    Effective volume (Swarm April 2024): https://docs.ethswarm.org/docs/concepts/incentives/postage-stamps/
+    Return the minimum depth needed for a file size.
+
+    Uses the same effective-capacity table as storage.calculate_required_depth.
+    Encrypted uploads get half the effective capacity (sized at twice their length).
     """
-    effective_volumes = {
-        17: 3.48 * 1024**2,
-        18: 6.97 * 1024**2,
-        19: 13.93 * 1024**2,
-        20: 27.86 * 1024**2,
-        21: 55.73 * 1024**2,
-        22: 111.47 * 1024**2,
-        23: 222.95 * 1024**2,
-        24: 445.90 * 1024**2,
-        25: 891.80 * 1024**2,
-        26: 1.78 * 1024**3,
-        27: 3.56 * 1024**3,
-        28: 7.13 * 1024**3,
-    }
+    from storage import calculate_required_depth as _storage_required_depth  # storage imports utils
 
     if encrypt:
-        # Reduce effective capacity by 50% for encrypted batches
-        effective_volumes = {k: v * 0.5 for k, v in effective_volumes.items()}
-
-    for depth in range(17, 29):
-        if file_size_bytes <= effective_volumes[depth]:
-            return depth
-
-    return 28  # max fallback
+        file_size_bytes *= 2
+    return _storage_required_depth(file_size_bytes)
 
-def calculate_required_plur(depth, price_per_block):
+def calculate_required_plur(depth, price_per_block, ttl_seconds=None):
     """
     Calculate:
     - price per chunk
     - total cost in PLUR
     - total cost in xBZZ (converted)
     for storing data at a given depth based on current price.
+    Uses config.STORAGE_TIME_SECONDS unless ttl_seconds is given.
     """
-    total_chunks = Decimal(2) ** Decimal(depth)
-    amount_per_chunk = (price_per_block / BLOCK_TIME_SECONDS) * (7 * 24 * 60 * 60)  # 1 week TTL default
-    total_plur = total_chunks * amount_per_chunk
-    total_xbzz = total_plur / PLUR_PER_xBZZ
-    return amount_per_chunk, total_plur, total_xbzz
+    from storage import calculate_required_plur_for_chunks  # storage imports utils
+    from config import STORAGE_TIME_SECONDS
 
-# --- Notifications ---
-from playsound import playsound
+    ttl = Decimal(ttl_seconds) if ttl_seconds is not None else STORAGE_TIME_SECONDS
+    return calculate_required_plur_for_chunks(Decimal(2) ** depth, price_per_block, ttl)
 
+# --- Notifications ---
 def play_notification_sound():
     """Play a notification sound when a batch becomes usable."""
     sound_path = os.path.join(os.path.dirname(__file__), "Bee.mp3")
     if os.path.exists(sound_path):
         try:
+            from playsound import playsound  # Imported on first use; audio stack is slow to load
+
             playsound(sound_path)
         except Exception as e:
             print(f"⚠️ Could not play sound: {e}")
@@ -0,0 +1,293 @@
+# verify.py
+
+import os
+import re
+import time
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from bee_client import get_bee_client
+from compression import decompress_stream
+from config import (
+    VERIFY_WORKERS,
+    DOWNLOAD_WORKERS,
+    DOWNLOAD_RANGE_SIZE,
+    CONTENT_CACHE_DIR,
+    CONTENT_CACHE_MAX_BYTES,
+    CONTENT_CACHE_STALE_PART,
+)
+from local_store import get_codec
+
+_REFERENCE = re.compile(r"[0-9a-fA-F]{64}([0-9a-fA-F]{64})?")  # Plain or encrypted reference
+
+VERIFY_METHODS = ("stewardship", "range")
+
+
+def check_reference(reference, method="stewardship"):
+    """
+    Checks that one reference can be retrieved.
+
+    "stewardship" asks the node whether every chunk is retrievable from the network;
+    "range" fetches the first byte through /bzz, which also proves the manifest resolves.
+
+    Returns:
+        dict: {"reference", "ok", "seconds", "error"}
+    """
+    if method not in VERIFY_METHODS:
+        raise ValueError(f"Unknown verify method: {method}")
+    result = {"reference": reference, "ok": False, "seconds": 0.0, "error": None}
+    start = time.perf_counter()
+    try:
+        if method == "stewardship":
+            response = get_bee_client().get(f"/stewardship/{reference}")
+            result["ok"] = response.status_code == 200 and bool(response.json().get("isRetrievable"))
+        else:
+            response = get_bee_client().get(f"/bzz/{reference}", headers={"Range": "bytes=0-0"})
+            result["ok"] = response.status_code in (200, 206)
+        if not result["ok"]:
+            result["error"] = f"{response.status_code} {response.text[:200]}"
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def verify_references(references, method="stewardship", max_workers=VERIFY_WORKERS, on_result=None):
+    """
+    Checks many references concurrently; duplicates are checked once.
+
+    Args:
+        references (list): Swarm references.
+        method (str): "stewardship" or "range" (see check_reference).
+        on_result (callable): Optional callback invoked with each result as it completes.
+    Returns:
+        dict: reference -> result dict from check_reference.
+    """
+    unique = list(dict.fromkeys(references))
+    results = {}
+    if not unique:
+        return results
+
+    def check(reference):
+        result = check_reference(reference, method)
+        if on_result:
+            on_result(result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique))) as pool:
+        for result in pool.map(check, unique):
+            results[result["reference"]] = result
+    return results
+
+
+class ContentCache:
+    """
+    On-disk LRU cache of downloaded content, one file per reference.
+
+    A file's mtime is its last use; when the cache grows past max_bytes the least
+    recently used files are deleted. Sizes are tracked in memory after one scan of
+    the directory, so lookups and inserts never walk it again. The directory may be
+    shared by several processes: only .part files older than CONTENT_CACHE_STALE_PART
+    are taken as abandoned downloads.
+    """
+
+    def __init__(self, directory=CONTENT_CACHE_DIR, max_bytes=CONTENT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._entries = {}   # reference -> (last use, size)
+        now = time.time()
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+                if name.endswith(".part"):
+                    if now - stat.st_mtime > CONTENT_CACHE_STALE_PART:
+                        os.remove(path)  # Left behind by an interrupted download
+                elif _REFERENCE.fullmatch(name) and os.path.isfile(path):
+                    self._entries[name] = (stat.st_mtime, stat.st_size)
+            except FileNotFoundError:
+                continue  # Finished or cleaned up by another process meanwhile
+        self.size = sum(size for _, size in self._entries.values())
+
+    def path_for(self, reference):
+        """
+        Raises:
+            ValueError: If `reference` is not a 64 or 128 character hex Swarm reference.
+        """
+        if not _REFERENCE.fullmatch(reference):
+            raise ValueError(f"Not a Swarm reference: {reference!r}")
+        return os.path.join(self.directory, reference)
+
+    def get(self, reference):
+        """Path of the cached content, or None. Marks it as recently used."""
+        with self._lock:
+            entry = self._entries.get(reference)
+            if entry is None:
+                return None
+            now = time.time()
+            self._entries[reference] = (now, entry[1])
+        path = self.path_for(reference)
+        try:
+            os.utime(path, (now, now))
+        except FileNotFoundError:
+            self._forget(reference)
+            return None
+        return path
+
+    def open(self, reference):
+        """
+        The cached content opened for reading, or None. Marks it as recently used.
+
+        The file is opened under the cache lock, so eviction cannot delete it first, and
+        stays readable after that even if it is evicted.
+        """
+        with self._lock:
+            entry = self._entries.get(reference)
+            if entry is None:
+                return None
+            try:
+                f = open(self.path_for(reference), "rb")
+            except FileNotFoundError:
+                f = None
+            else:
+                now = time.time()
+                self._entries[reference] = (now, entry[1])
+        if f is None:
+            self._forget(reference)
+            return None
+        try:
+            os.utime(f.fileno(), (now, now))
+        except (OSError, NotImplementedError):
+            pass  # Platforms without utime on descriptors: the LRU order is kept in memory anyway
+        return f
+
+    def _forget(self, reference):
+        """Drops an entry whose file disappeared."""
+        with self._lock:
+            entry = self._entries.pop(reference, None)
+            if entry is not None:
+                self.size -= entry[1]
+
+    def new_part_file(self):
+        """A temporary path inside the cache directory, so put() can rename it in."""
+        fd, path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        os.close(fd)
+        return path
+
+    def put(self, reference, source_path):
+        """Moves a downloaded file into the cache and evicts down to max_bytes. Returns its path."""
+        path = self.path_for(reference)
+        os.replace(source_path, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            previous = self._entries.get(reference)
+            self.size += size - (previous[1] if previous else 0)
+            self._entries[reference] = (time.time(), size)
+            victims = []
+            if self.size > self.max_bytes:
+                for ref, (_, ref_size) in sorted(self._entries.items(), key=lambda item: item[1][0]):
+                    if self.size <= self.max_bytes or ref == reference:
+                        break
+                    victims.append(ref)
+                    self.size -= ref_size
+                for ref in victims:
+                    del self._entries[ref]
+        for ref in victims:
+            try:
+                os.remove(self.path_for(ref))
+            except FileNotFoundError:
+                pass
+        return path
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_content_cache():
+    """Return the process-wide ContentCache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ContentCache()
+    return _cache
+
+
+def _fetch_range(reference, path, start, end):
+    response = get_bee_client().get(f"/bzz/{reference}", headers={"Range": f"bytes={start}-{end}"})
+    if response.status_code != 206:
+        raise IOError(f"Range {start}-{end} of {reference} failed: {response.status_code}")
+    with open(path, "r+b") as f:
+        f.seek(start)
+        f.write(response.content)
+    return len(response.content)
+
+
+def _download_to(reference, path, workers, range_size):
+    """Downloads into `path`: the first range reveals the size, the rest are fetched in parallel."""
+    response = get_bee_client().get(f"/bzz/{reference}", headers={"Range": f"bytes=0-{range_size - 1}"})
+    if response.status_code == 200:
+        # The node ignored the range; the whole body is already here
+        with open(path, "wb") as f:
+            f.write(response.content)
+        return len(response.content)
+    if response.status_code != 206:
+        raise IOError(f"Download of {reference} failed: {response.status_code} {response.text[:200]}")
+
+    match = re.match(r"bytes \d+-\d+/(\d+)", response.headers.get("Content-Range", ""))
+    total = int(match.group(1)) if match else len(response.content)
+    with open(path, "wb") as f:
+        f.truncate(total)
+        f.write(response.content)
+    ranges = [(start, min(start + range_size, total) - 1) for start in range(range_size, total, range_size)]
+    if ranges:
+        with ThreadPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+            list(pool.map(lambda r: _fetch_range(reference, path, *r), ranges))
+    return total
+
+
+def download(reference, dest_path=None, cache=None, workers=DOWNLOAD_WORKERS, range_size=DOWNLOAD_RANGE_SIZE,
+             decompress=True):
+    """
+    Downloads content through /bzz with parallel range requests, via the content cache.
+
+    Args:
+        reference (str): Swarm reference of a file upload.
+        dest_path (str): Where to copy the content; None returns the cached file's path.
+        cache (ContentCache): Cache to use (default: the process-wide one).
+        decompress (bool): Restore content the local store records as compressed when
+            copying it to dest_path. The cache always keeps the stored bytes.
+    Returns:
+        str: Path of the content (dest_path, or the cached file).
+    Raises:
+        IOError: If the node refuses the download or a range fails.
+    """
+    cache = cache or get_content_cache()
+    path = cache.path_for(reference)
+    source = cache.open(reference)
+    if source is None:
+        part = cache.new_part_file()
+        try:
+            _download_to(reference, part, workers, range_size)
+            source = open(part, "rb")  # Opened before put() may evict, so it stays readable
+            cache.put(reference, part)
+        except BaseException:
+            if source is not None:
+                source.close()
+            if os.path.exists(part):
+                os.remove(part)
+            raise
+    with source:
+        if dest_path is None:
+            return path
+        codec = get_codec(reference) if decompress else None
+        with open(dest_path, "wb") as dst:
+            if codec:
+                decompress_stream(source, dst, codec)
+            else:
+                shutil.copyfileobj(source, dst)
+    return dest_path